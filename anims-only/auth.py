@@ -0,0 +1,339 @@
+# Stdlib modules
+import base64
+import binascii
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+
+
+# Environment variable the access token can be read from.
+TOKEN_ENV = "MIXAMO_TOKEN"
+
+# File where the last access token is kept, so that it can be reused by
+# later runs (from the UI or the command line) until it expires.
+TOKEN_FILE = "mixamo_token.json"
+
+# Tokens are considered expired this many seconds before they really are,
+# so that they don't expire halfway through a request.
+EXPIRY_MARGIN = 60
+
+
+class AuthenticationError(Exception):
+    """Raised when Mixamo rejects the access token and no new one can be got."""
+
+
+def get_token_claims(token):
+    """Read the payload of an access token.
+
+    Mixamo tokens are JWTs issued by Adobe. Their payload is not verified
+    here, it's only used to know when they expire and whose they are.
+
+    :param token: Access token
+    :type token: str
+
+    :return: Token claims (empty if it's not a JWT)
+    :rtype: dict
+    """
+    parts = (token or "").split(".")
+    if len(parts) != 3:
+        return {}
+
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+    except (binascii.Error, ValueError):
+        return {}
+    return claims if isinstance(claims, dict) else {}
+
+
+def get_token_expiry(token):
+    """Get the time an access token expires at.
+
+    Its payload has either an 'exp' claim (in seconds) or 'created_at' and
+    'expires_in' (both in milliseconds).
+
+    :param token: Access token
+    :type token: str
+
+    :return: Expiry time (as a timestamp), or None if it can't be read
+    :rtype: float
+    """
+    claims = get_token_claims(token)
+
+    try:
+        if "exp" in claims:
+            return float(claims["exp"])
+        return (int(claims["created_at"]) + int(claims["expires_in"])) / 1000
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def get_account_key(token):
+    """Get a key identifying the account an access token belongs to.
+
+    That's the user ID of the token if it has one, so that it doesn't
+    change when the token is refreshed, or a hash of the token otherwise.
+
+    :param token: Access token
+    :type token: str
+
+    :return: Account key
+    :rtype: str
+    """
+    user_id = get_token_claims(token).get("user_id")
+    if user_id:
+        return str(user_id)
+    return hashlib.sha256((token or "").encode()).hexdigest()[:16]
+
+
+def is_expired(token, margin=EXPIRY_MARGIN):
+    """Tell whether an access token has expired (or is about to).
+
+    Tokens whose expiry can't be read are assumed to be valid, and will be
+    refreshed if Mixamo rejects them.
+
+    :param token: Access token
+    :type token: str
+
+    :param margin: Seconds before the expiry at which it's considered expired
+    :type margin: float
+
+    :return: True if the token shouldn't be used anymore
+    :rtype: bool
+    """
+    expiry = get_token_expiry(token)
+    return expiry is not None and expiry - margin <= time.time()
+
+
+class TokenProvider:
+    """Somewhere to get Mixamo access tokens from."""
+    def get_token(self):
+        """Get the current access token.
+
+        :return: Access token, or None if there's none
+        :rtype: str
+        """
+        raise NotImplementedError
+
+    def refresh(self, expired_token):
+        """Get a new access token after the current one has been rejected.
+
+        By default, the token is just read again, which works for sources
+        that are updated from the outside (e.g. a file rewritten by another
+        process).
+
+        :param expired_token: Token that has been rejected
+        :type expired_token: str
+
+        :return: New access token, or None if there's no new one
+        :rtype: str
+        """
+        token = self.get_token()
+        return token if token != expired_token else None
+
+
+class StaticTokenProvider(TokenProvider):
+    """A token given once (e.g. on the command line), that can't be renewed."""
+    def __init__(self, token):
+        self.token = token
+
+    def get_token(self):
+        return self.token
+
+
+class EnvTokenProvider(TokenProvider):
+    """Read the token from an environment variable."""
+    def __init__(self, name=TOKEN_ENV):
+        self.name = name
+
+    def get_token(self):
+        return os.environ.get(self.name) or None
+
+
+class FileTokenProvider(TokenProvider):
+    """Read the token from a file, either as plain text or as saved by
+    CachedTokenProvider. The file is read again on every refresh."""
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def get_token(self):
+        try:
+            with open(self.file_path, "r") as file:
+                content = file.read().strip()
+        except OSError:
+            return None
+
+        if content.startswith("{"):
+            try:
+                return json.loads(content).get("token")
+            except ValueError:
+                return None
+        return content or None
+
+
+class CachedTokenProvider(TokenProvider):
+    """Keep the last token on disk, along with its expiry.
+
+    The cached token is used until it expires, and only then is the source
+    provider (if any) asked for a new one, which is cached in turn.
+    """
+    def __init__(self, source=None, file_path=TOKEN_FILE):
+        """Initialize the provider.
+
+        :param source: Provider of new tokens
+        :type source: TokenProvider
+
+        :param file_path: File where the token is cached
+        :type file_path: str
+        """
+        self.source = source
+        self.file_path = file_path
+
+    def get_token(self):
+        token = FileTokenProvider(self.file_path).get_token()
+        if token and not is_expired(token):
+            return token
+
+        if self.source is None:
+            return None
+
+        token = self.source.get_token()
+        if token:
+            self.save(token)
+        return token
+
+    def refresh(self, expired_token):
+        if self.source is None:
+            return super().refresh(expired_token)
+
+        token = self.source.refresh(expired_token)
+        if token:
+            self.save(token)
+        return token
+
+    def save(self, token):
+        """Cache a token.
+
+        :param token: Access token
+        :type token: str
+        """
+        data = {"token": token, "expires_at": get_token_expiry(token), "saved_at": time.time()}
+
+        try:
+            # The token gives access to the Mixamo account: keep it private.
+            descriptor = os.open(self.file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, "w") as file:
+                json.dump(data, file)
+        except OSError as e:
+            print(f"WARNING: Couldnt cache the access token: {e}")
+
+
+class TokenManager:
+    """Share the access token between every request of a run.
+
+    The token is kept in the 'Authorization' header of the headers sent
+    with every request. When Mixamo rejects it (401), every other request
+    is paused ('wait_ready') while a new one is got from the provider. This
+    is only done once, however many requests were rejected at the same
+    time, and if no new token can be got, every request fails from then on
+    instead of going through its retries.
+    """
+    def __init__(self, headers, provider=None):
+        """Initialize the manager.
+
+        :param headers: Headers sent with every API request
+        :type headers: dict
+
+        :param provider: Provider of new tokens. If not set, the token
+          already in the headers is used and can't be refreshed.
+        :type provider: TokenProvider
+        """
+        self.headers = headers
+        self.provider = provider
+        self.condition = threading.Condition()
+        self.refreshing = False
+        self.failed = False
+
+    def get_token(self):
+        """Get the token currently in use.
+
+        :return: Access token, or None if there's none
+        :rtype: str
+        """
+        authorization = self.headers.get("Authorization", "")
+        return authorization[len("Bearer "):] or None
+
+    def set_token(self, token):
+        self.headers["Authorization"] = f"Bearer {token}"
+
+    def ensure_token(self):
+        """Get a token from the provider before starting, renewing it if it
+        has already expired."""
+        if self.provider is None:
+            return
+
+        token = self.provider.get_token()
+        if not token or is_expired(token):
+            token = self.provider.refresh(token)
+
+        if token:
+            self.set_token(token)
+        else:
+            print("WARNING: No valid access token available")
+
+    def wait_ready(self):
+        """Wait while the token is being refreshed.
+
+        :raises AuthenticationError: If it couldn't be refreshed
+        """
+        with self.condition:
+            while self.refreshing:
+                self.condition.wait()
+            if self.failed:
+                raise AuthenticationError("The access token has expired, please log in again.")
+
+    def handle_unauthorized(self, rejected_token):
+        """Refresh the token after a request has been rejected with it.
+
+        :param rejected_token: Token the request was sent with
+        :type rejected_token: str
+
+        :return: True if the request can be retried with a new token
+        :rtype: bool
+        """
+        with self.condition:
+            while self.refreshing:
+                self.condition.wait()
+
+            if self.failed:
+                return False
+            # Another request has already refreshed it.
+            if self.get_token() != rejected_token:
+                return True
+            if self.provider is None:
+                self.failed = True
+                return False
+
+            self.refreshing = True
+
+        token = None
+        try:
+            print("Access token rejected, refreshing it...")
+            token = self.provider.refresh(rejected_token)
+        except AuthenticationError as e:
+            print(f"WARNING: Couldnt refresh the access token: {e}")
+        except Exception:
+            print("WARNING: Couldnt refresh the access token:")
+            traceback.print_exc()
+        finally:
+            with self.condition:
+                if token and token != rejected_token:
+                    self.set_token(token)
+                else:
+                    self.failed = True
+                self.refreshing = False
+                self.condition.notify_all()
+
+        return not self.failed
@@ -0,0 +1,197 @@
+# Stdlib modules
+import json
+import os
+import threading
+import zipfile
+
+# Local modules
+from fileio import CHUNK_SIZE, write_stream
+
+
+# Type of the export of several motions at once, like a pack.
+BATCH_TYPE = "MotionPack"
+
+
+def build_gms_hash(gms_hash, name=None):
+    """Build the 'gms_hash' Mixamo needs to export a motion.
+
+    The original is left untouched: product details are cached and hashed
+    to get the key of their payload, so they must stay as Mixamo returned
+    them.
+
+    :param gms_hash: 'gms_hash' of the motion in its product details
+    :type gms_hash: dict
+
+    :param name: Name of the motion (only needed for motions of a pack)
+    :type name: str
+
+    :return: New 'gms_hash' of the motion
+    :rtype: dict
+    """
+    gms_hash = dict(gms_hash)
+    if name is not None:
+        gms_hash["name"] = name
+    gms_hash["overdrive"] = 0
+
+    # Build a 'params' string depending on how many params the animation has.
+    # For example, if there are two params (Overdrive and Emotion), and their
+    # values are 1 and 0, the string will be "1,0".
+    gms_hash["params"] = ",".join(str(int(param[-1])) for param in gms_hash["params"])
+
+    return gms_hash
+
+
+def get_gms_hash_key(gms_hash):
+    """Get the key of a motion, telling it apart from its variants.
+
+    Packs list their motions with the 'gms_hash' of their product details,
+    while single animations are exported with a built one: both are
+    normalized, so that a motion has the same key whichever it comes from.
+    Variants of the same 'model-id' (e.g: mirrored, trimmed or in place)
+    have different keys.
+
+    :param gms_hash: 'gms_hash' of the motion, built or not
+    :type gms_hash: dict
+
+    :return: Key of the motion
+    :rtype: str
+    """
+    params = gms_hash.get("params") or []
+    if not isinstance(params, str):
+        params = ",".join(str(int(param[-1])) for param in params)
+
+    return json.dumps([
+        gms_hash.get("model-id"),
+        bool(gms_hash.get("mirror")),
+        [float(value) for value in gms_hash.get("trim") or []],
+        bool(gms_hash.get("inplace")),
+        int(gms_hash.get("arm-space") or 0),
+        params])
+
+
+def build_motion_gms_hash(motion):
+    """Build the 'gms_hash' Mixamo needs to export a motion of a pack.
+
+    :param motion: Motion listed in the details of a pack
+    :type motion: dict
+
+    :return: New 'gms_hash' of the motion
+    :rtype: dict
+    """
+    return build_gms_hash(motion["gms_hash"], motion["name"])
+
+
+def build_batch_payload(character_id, payloads, names):
+    """Build the payload exporting several motions at once.
+
+    Mixamo exports every motion of the 'gms_hash' list to its own file of
+    a single archive, named after the motion, the same way it exports
+    packs.
+
+    :param character_id: Character ID
+    :type character_id: str
+
+    :param payloads: Export payloads of the motions (see
+      'MixamoEngine.build_payload_from_product')
+    :type payloads: list
+
+    :param names: Name of the file of every motion in the archive (without
+      its extension). They must be unique.
+    :type names: list
+
+    :return: Payload that will be used to export the motions
+    :rtype: str
+    """
+    payloads = [json.loads(payload) for payload in payloads]
+
+    gms_hash = []
+    for payload, name in zip(payloads, names):
+        motion = dict(payload["gms_hash"][0])
+        motion["name"] = name
+        gms_hash.append(motion)
+
+    payload = {
+        "character_id": character_id,
+        "product_name": f"{len(gms_hash)} motions",
+        "type": BATCH_TYPE,
+        "preferences": payloads[0]["preferences"],
+        "gms_hash": gms_hash,
+    }
+
+    return json.dumps(payload)
+
+
+class BatchArchive:
+    """Archive of several motions exported at once, shared by their items.
+
+    Every item extracting a motion from it must 'retain' it first, and
+    'release' it when done. The archive is removed once all of them have.
+    """
+    def __init__(self, path):
+        """Open the archive.
+
+        :param path: Archive path
+        :type path: str
+
+        :raises zipfile.BadZipFile: If it's not an archive
+        """
+        self.path = path
+        self.users = 0
+        self.lock = threading.Lock()
+
+        # Motions are looked up by file name, wherever they are in the
+        # archive, and whatever their extension.
+        with zipfile.ZipFile(path) as archive:
+            self.members = {
+                os.path.splitext(os.path.basename(info.filename))[0]: info
+                for info in archive.infolist() if not info.is_dir()}
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def extract(self, name, path, fsync=True):
+        """Extract a motion to a file, atomically.
+
+        :param name: Name of the motion in the archive
+        :type name: str
+
+        :param path: Path of the file
+        :type path: str
+
+        :param fsync: Whether to flush the file to disk before renaming it
+        :type fsync: bool
+
+        :return: Written file (with its 'path', 'size' and 'sha256')
+        :rtype: fileio.AtomicFile
+        """
+        info = self.members[name]
+
+        # Every thread reads the archive through its own handle.
+        with zipfile.ZipFile(self.path) as archive, archive.open(info) as member:
+            return write_stream(
+                path, iter(lambda: member.read(CHUNK_SIZE), b""), info.file_size, fsync)
+
+    def retain(self, count=1):
+        """Let the archive know that items need it.
+
+        :param count: Number of items
+        :type count: int
+        """
+        with self.lock:
+            self.users += count
+
+    def release(self):
+        """Let the archive know that an item doesn't need it anymore."""
+        with self.lock:
+            self.users -= 1
+            if self.users > 0:
+                return
+
+        self.remove()
+
+    def remove(self):
+        """Remove the archive from disk."""
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            print(f"WARNING: Couldnt remove {self.path}: {e}")
@@ -0,0 +1,274 @@
+# Stdlib modules
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+# Entries older than this many seconds are considered stale.
+CACHE_TTL = 7 * 24 * 60 * 60
+
+# Maximum number of entries kept per table. The least recently used
+# entries are evicted first.
+CACHE_MAX_ENTRIES = 20000
+
+# Run the eviction every this many writes.
+EVICT_EVERY = 500
+
+
+class ProductCache:
+    """On-disk cache of product details, export payloads and exported files.
+
+    Mixamo returns the same product details for a given animation and
+    character, and the export payload built from them is deterministic, so
+    both are stored in a SQLite database to skip the products endpoint on
+    re-runs and retries.
+
+    - Product details are keyed by animation ID and character ID.
+    - Payloads are keyed by a hash of the character ID and the product
+      details they were built from (see 'payload_key').
+    - Exported files are keyed by a hash of their payload (see
+      'exports.export_key'), and point to where they were downloaded.
+
+    The cache can be shared by several threads.
+    """
+    def __init__(self, file_path, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        """Open (or create) the cache database.
+
+        :param file_path: Path of the SQLite database
+        :type file_path: str
+
+        :param ttl: Seconds after which an entry is stale
+        :type ttl: float
+
+        :param max_entries: Maximum number of entries per table
+        :type max_entries: int
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(file_path, check_same_thread=False)
+
+        with self.db:
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS products (
+                    anim_id TEXT,
+                    character_id TEXT,
+                    body TEXT,
+                    created REAL,
+                    accessed REAL,
+                    PRIMARY KEY (anim_id, character_id))""")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS payloads (
+                    key TEXT PRIMARY KEY,
+                    character_id TEXT,
+                    payload TEXT,
+                    created REAL,
+                    accessed REAL)""")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS exports (
+                    key TEXT PRIMARY KEY,
+                    character_id TEXT,
+                    body TEXT,
+                    created REAL,
+                    accessed REAL)""")
+
+    def get_product(self, character_id, anim_id):
+        """Get the cached product details of an animation.
+
+        :param character_id: Character ID
+        :type character_id: str
+
+        :param anim_id: Animation ID
+        :type anim_id: str
+
+        :return: Product details, or None if they're not cached
+        :rtype: dict
+        """
+        body = self._get("products", "body",
+                         "anim_id = ? AND character_id = ?", (anim_id, character_id))
+        return None if body is None else json.loads(body)
+
+    def put_product(self, character_id, anim_id, product):
+        """Store the product details of an animation.
+
+        :param character_id: Character ID
+        :type character_id: str
+
+        :param anim_id: Animation ID
+        :type anim_id: str
+
+        :param product: Product details
+        :type product: dict
+        """
+        now = time.time()
+        self._put("""INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?)""",
+                  (anim_id, character_id, json.dumps(product), now, now))
+
+    def get_payload(self, key):
+        """Get a cached export payload.
+
+        :param key: Payload key (see 'payload_key')
+        :type key: str
+
+        :return: Export payload, or None if it's not cached
+        :rtype: str
+        """
+        return self._get("payloads", "payload", "key = ?", (key,))
+
+    def put_payload(self, key, character_id, payload):
+        """Store an export payload.
+
+        :param key: Payload key (see 'payload_key')
+        :type key: str
+
+        :param character_id: Character ID the payload was built for
+        :type character_id: str
+
+        :param payload: Export payload
+        :type payload: str
+        """
+        now = time.time()
+        self._put("""INSERT OR REPLACE INTO payloads VALUES (?, ?, ?, ?, ?)""",
+                  (key, character_id, payload, now, now))
+
+    def get_export(self, key):
+        """Get the file an export has been downloaded to.
+
+        :param key: Export key (see 'exports.export_key')
+        :type key: str
+
+        :return: File 'path', 'size' and 'sha256', or None if not cached
+        :rtype: dict
+        """
+        body = self._get("exports", "body", "key = ?", (key,))
+        return None if body is None else json.loads(body)
+
+    def put_export(self, key, character_id, artifact):
+        """Store the file an export has been downloaded to.
+
+        :param key: Export key (see 'exports.export_key')
+        :type key: str
+
+        :param character_id: Character ID the export was done for
+        :type character_id: str
+
+        :param artifact: File 'path', 'size' and 'sha256'
+        :type artifact: dict
+        """
+        now = time.time()
+        self._put("""INSERT OR REPLACE INTO exports VALUES (?, ?, ?, ?, ?)""",
+                  (key, character_id, json.dumps(artifact), now, now))
+
+    def remove_export(self, key):
+        """Forget an exported file (e.g: after it's been modified).
+
+        :param key: Export key
+        :type key: str
+        """
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM exports WHERE key = ?", (key,))
+
+    def clear_exports(self, character_id=None):
+        """Forget every exported file, or the ones of a character.
+
+        :param character_id: Character ID (None for every character)
+        :type character_id: str
+
+        :return: Number of exports forgotten
+        :rtype: int
+        """
+        with self.lock, self.db:
+            if character_id is None:
+                cursor = self.db.execute("DELETE FROM exports")
+            else:
+                cursor = self.db.execute(
+                    "DELETE FROM exports WHERE character_id = ?", (character_id,))
+            return cursor.rowcount
+
+    def invalidate_character(self, character_id):
+        """Remove every entry of a character (e.g: after it's been re-uploaded).
+
+        :param character_id: Character ID
+        :type character_id: str
+        """
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM products WHERE character_id = ?", (character_id,))
+            self.db.execute("DELETE FROM payloads WHERE character_id = ?", (character_id,))
+            self.db.execute("DELETE FROM exports WHERE character_id = ?", (character_id,))
+
+    def evict(self):
+        """Remove stale entries and keep every table under its size limit."""
+        with self.lock, self.db:
+            self._evict()
+
+    def stats(self):
+        """Get the hit and miss counts of this run.
+
+        :return: Cache statistics
+        :rtype: dict
+        """
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def _get(self, table, column, where, args):
+        with self.lock, self.db:
+            row = self.db.execute(
+                f"SELECT {column}, created FROM {table} WHERE {where}", args).fetchone()
+
+            # Stale entries are treated as misses. They'll be replaced as
+            # soon as the fresh value is stored.
+            if row is None or time.time() - row[1] > self.ttl:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.db.execute(
+                f"UPDATE {table} SET accessed = ? WHERE {where}", (time.time(),) + args)
+            return row[0]
+
+    def _put(self, query, args):
+        with self.lock, self.db:
+            self.db.execute(query, args)
+
+            self.writes += 1
+            if self.writes % EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self):
+        for table in ("products", "payloads", "exports"):
+            self.db.execute(
+                f"DELETE FROM {table} WHERE created < ?", (time.time() - self.ttl,))
+            self.db.execute(f"""
+                DELETE FROM {table} WHERE rowid IN (
+                    SELECT rowid FROM {table} ORDER BY accessed DESC
+                    LIMIT -1 OFFSET ?)""", (self.max_entries,))
+
+
+def payload_key(character_id, product):
+    """Get the key of the payload built from some product details.
+
+    The key is a hash of the content the payload depends on, so it changes
+    as soon as Mixamo returns different product details.
+
+    :param character_id: Character ID
+    :type character_id: str
+
+    :param product: Product details
+    :type product: dict
+
+    :return: Payload key
+    :rtype: str
+    """
+    content = json.dumps([character_id, product], sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
@@ -0,0 +1,273 @@
+# Stdlib modules
+import bisect
+import hashlib
+import json
+import os
+import re
+
+
+# Suffix of the index file, saved next to the catalog it's built from.
+INDEX_SUFFIX = ".index.json"
+
+# Bump this whenever the layout of the index file changes.
+INDEX_VERSION = 1
+
+# State written by 'getids.py --incremental', which has the full products
+# (descriptions and categories included) and not just their names.
+STATE_FILE = "mixamo_catalog_state.json"
+
+# Product fields that are searchable.
+FIELDS = ("name", "description", "category")
+
+# Words are runs of letters and digits, compared in lower case.
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Split a text into searchable tokens.
+
+    :param text: Text to split
+    :type text: str
+
+    :return: Lower case tokens
+    :rtype: list
+    """
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class CatalogIndex:
+    """Inverted token index over a product catalog.
+
+    Every token found in the name, description or category of a product
+    points to the IDs of the products that contain it, so a query is just a
+    few set operations and never has to go through the whole catalog.
+
+    Queries are made of words separated by spaces:
+
+    - Every word must match (AND): "walk back" finds "Female Walk Back".
+    - "OR" separates alternatives: "jump OR leap".
+    - A word matches any token starting with it, like Mixamo's search
+      does: "walk" finds "Walk", "Walking" and "Walker". A "*" at the end
+      of a word (e.g: "walk*") is accepted, but changes nothing.
+    """
+    def __init__(self, names, tokens):
+        """Initialize the index.
+
+        :param names: Product IDs mapped to the names the files are saved as
+        :type names: dict
+
+        :param tokens: Tokens mapped to the IDs of the products having them
+        :type tokens: dict
+        """
+        self.names = names
+        self.tokens = {token: set(ids) for token, ids in tokens.items()}
+        # Sorted tokens, used to find the ones matching a prefix.
+        self.sorted_tokens = sorted(self.tokens)
+
+    @classmethod
+    def build(cls, products):
+        """Build the index of a list of products.
+
+        :param products: Product IDs mapped to their name, or to the product
+          itself (a dictionary with some of the FIELDS)
+        :type products: dict
+
+        :return: Catalog index
+        :rtype: CatalogIndex
+        """
+        names, tokens = {}, {}
+
+        for product_id, product in products.items():
+            if isinstance(product, str):
+                product = {"name": product}
+
+            names[product_id] = product.get("label") or product.get("name")
+
+            for field in FIELDS:
+                for token in tokenize(product.get(field)):
+                    tokens.setdefault(token, set()).add(product_id)
+
+        return cls(names, tokens)
+
+    @classmethod
+    def load(cls, catalog_path, product_key="name", state_path=STATE_FILE):
+        """Load the index of a catalog file, building it if needed.
+
+        The index is saved next to the catalog, along with the checksum of
+        the catalog and the version of the state file it was built from,
+        and rebuilt whenever either of them changes.
+
+        :param catalog_path: Catalog JSON file (product IDs mapped to names)
+        :type catalog_path: str
+
+        :param product_key: Product field the catalog names come from
+        :type product_key: str
+
+        :param state_path: State file of 'getids.py' (see 'load_state_products')
+        :type state_path: str
+
+        :return: Catalog index
+        :rtype: CatalogIndex
+        """
+        with open(catalog_path, "rb") as file:
+            content = file.read()
+        checksum = hashlib.sha256(content).hexdigest() + get_file_version(state_path)
+
+        index_path = os.path.splitext(catalog_path)[0] + INDEX_SUFFIX
+
+        try:
+            with open(index_path, "r") as file:
+                data = json.load(file)
+            if data["version"] == INDEX_VERSION and data["source"] == checksum:
+                return cls(data["names"], data["tokens"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        products = {
+            product_id: {"label": name, product_key: name}
+            for product_id, name in json.loads(content).items()}
+
+        # Add whatever else the last catalog refresh knows about them.
+        for product_id, product in load_state_products(state_path).items():
+            if product_id in products:
+                products[product_id].update(
+                    {field: product.get(field) for field in FIELDS
+                     if product.get(field)})
+
+        index = cls.build(products)
+
+        try:
+            index.save(index_path, checksum)
+        except OSError as e:
+            print(f"WARNING: Couldn't save the catalog index: {e}")
+
+        return index
+
+    def save(self, index_path, checksum):
+        """Save the index to disk.
+
+        :param index_path: Index JSON file
+        :type index_path: str
+
+        :param checksum: Checksum of the catalog (and state file) it was
+          built from
+        :type checksum: str
+        """
+        data = {
+            "version": INDEX_VERSION,
+            "source": checksum,
+            "names": self.names,
+            "tokens": {token: sorted(ids) for token, ids in self.tokens.items()}}
+
+        with open(index_path, "w") as file:
+            json.dump(data, file)
+
+    def match(self, word):
+        """Get the IDs of the products matching a single query word.
+
+        :param word: Prefix of the tokens to match (a "*" may follow it)
+        :type word: str
+
+        :return: Product IDs
+        :rtype: set
+        """
+        prefix = word.rstrip("*")
+        ids = set()
+
+        start = bisect.bisect_left(self.sorted_tokens, prefix)
+        for token in self.sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            ids |= self.tokens[token]
+
+        return ids
+
+    def search(self, query):
+        """Get the products matching a query.
+
+        :param query: Words to look for (see the class docstring)
+        :type query: str
+
+        :return: Product IDs mapped to their names, in catalog order
+        :rtype: dict
+        """
+        found = set()
+
+        for alternative in re.split(r"\s+OR\s+", query.strip()):
+            # Split words like the catalog (which drops any "*").
+            words = tokenize(alternative)
+
+            if not words:
+                continue
+
+            ids = self.match(words[0])
+            for word in words[1:]:
+                ids = ids & self.match(word)
+            found |= ids
+
+        return {
+            product_id: name for product_id, name in self.names.items()
+            if product_id in found}
+
+
+def get_remote_queries(query):
+    """Get the queries to send to Mixamo's search for a local query.
+
+    Mixamo knows nothing of "OR" and "*", so every alternative is searched
+    on its own, with its plain words only.
+
+    :param query: Words to look for (see 'CatalogIndex')
+    :type query: str
+
+    :return: Queries Mixamo understands, one per alternative
+    :rtype: list
+    """
+    queries = []
+
+    for alternative in re.split(r"\s+OR\s+", query.strip()):
+        remote_query = " ".join(tokenize(alternative))
+        if remote_query and remote_query not in queries:
+            queries.append(remote_query)
+
+    return queries
+
+
+def get_file_version(file_path):
+    """Get a string that changes whenever a file is modified.
+
+    :param file_path: File path
+    :type file_path: str
+
+    :return: Modification time and size of the file, or "" if it's missing
+    :rtype: str
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return ""
+    return f":{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def load_state_products(file_path=STATE_FILE):
+    """Get every product saved by the last incremental catalog refresh.
+
+    :param file_path: State file of 'getids.py'
+    :type file_path: str
+
+    :return: Product IDs mapped to products
+    :rtype: dict
+    """
+    if not os.path.exists(file_path):
+        return {}
+
+    try:
+        with open(file_path, "r") as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+    products = {}
+    for product_type in state.values():
+        products.update(product_type.get("products", {}))
+
+    return products
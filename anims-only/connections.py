@@ -0,0 +1,138 @@
+# Stdlib modules
+import importlib.util
+from urllib.parse import urlsplit
+
+# Third-party modules
+import requests
+from requests.adapters import HTTPAdapter
+
+# httpx is optional: the default backend only needs requests.
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Local modules
+from ratelimit import LIMITS
+
+
+# Connections kept open to the API host. The rate limiter never lets more
+# API requests than that run at the same time, so no request ever has to
+# open a connection only to throw it away afterwards (requests only keeps
+# 10 per host by default).
+API_POOL_SIZE = sum(limit for endpoint, (_, limit) in LIMITS.items() if endpoint != "download")
+
+# Connections kept open to every download host (i.e: the CDN serving the
+# exported files, which isn't the API host).
+DOWNLOAD_POOL_SIZE = LIMITS["download"][1]
+
+# Seconds an idle connection is kept open by the asyncio backend.
+KEEPALIVE_EXPIRY = 60
+
+# Send every API request over a single HTTP/2 connection in the asyncio
+# backend, if the 'h2' package is installed (pip install httpx[http2]).
+HTTP2 = True
+
+
+def get_origin(url):
+    """Get the origin of a URL (i.e: what connections are pooled by).
+
+    :param url: URL
+    :type url: str
+
+    :return: Scheme, host and port, e.g. 'https://www.mixamo.com'
+    :rtype: str
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def is_http2_available():
+    """Tell whether HTTP/2 can be used (i.e: 'h2' is installed).
+
+    :rtype: bool
+    """
+    return httpx is not None and importlib.util.find_spec("h2") is not None
+
+
+def create_session(api_url=None, api_pool_size=API_POOL_SIZE,
+                   download_pool_size=DOWNLOAD_POOL_SIZE):
+    """Create a requests session with a connection pool per host.
+
+    :param api_url: Base URL of the API. It can also be set later with
+      'mount_api' (e.g. when it's pointed to a mock server).
+    :type api_url: str
+
+    :param api_pool_size: Connections kept open to the API host
+    :type api_pool_size: int
+
+    :param download_pool_size: Connections kept open to any other host
+    :type download_pool_size: int
+
+    :rtype: requests.Session
+    """
+    session = requests.Session()
+
+    # Anything but the API is a download. Connections are never blocked on:
+    # once the pool is full, extra ones are opened (and closed when done).
+    adapter = HTTPAdapter(pool_maxsize=download_pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    if api_url:
+        mount_api(session, api_url, api_pool_size)
+    return session
+
+
+def mount_api(session, api_url, pool_size=API_POOL_SIZE):
+    """Give the API host its own connection pool, unless it already has one.
+
+    :param session: Session created by 'create_session'
+    :type session: requests.Session
+
+    :param api_url: Base URL of the API
+    :type api_url: str
+
+    :param pool_size: Connections kept open to the API host
+    :type pool_size: int
+    """
+    origin = get_origin(api_url)
+    if origin not in session.adapters:
+        session.mount(origin, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+
+def create_async_client(api_url, api_pool_size=API_POOL_SIZE,
+                        download_pool_size=DOWNLOAD_POOL_SIZE, http2=HTTP2):
+    """Create an httpx client with a connection pool per host.
+
+    :param api_url: Base URL of the API
+    :type api_url: str
+
+    :param api_pool_size: Connections kept open to the API host
+    :type api_pool_size: int
+
+    :param download_pool_size: Connections kept open to the download hosts
+    :type download_pool_size: int
+
+    :param http2: Use HTTP/2 for the API host (if 'h2' is installed).
+      Downloads stay on HTTP/1.1: large bodies are faster on connections
+      of their own than multiplexed on a single one.
+    :type http2: bool
+
+    :rtype: httpx.AsyncClient
+    """
+    # Like with requests, connections are never waited for: the limits only
+    # set how many are kept open once done.
+    api_limits = httpx.Limits(
+        max_connections=None, max_keepalive_connections=api_pool_size,
+        keepalive_expiry=KEEPALIVE_EXPIRY)
+    download_limits = httpx.Limits(
+        max_connections=None, max_keepalive_connections=download_pool_size,
+        keepalive_expiry=KEEPALIVE_EXPIRY)
+
+    api_transport = httpx.AsyncHTTPTransport(
+        http2=http2 and is_http2_available(), limits=api_limits)
+
+    return httpx.AsyncClient(
+        timeout=10, limits=download_limits,
+        mounts={get_origin(api_url): api_transport})
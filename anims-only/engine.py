@@ -0,0 +1,1850 @@
+# Stdlib modules
+import json
+import os
+import requests
+import time
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+# Local modules
+from auth import AuthenticationError, TokenManager, get_account_key
+from batching import BatchArchive, build_batch_payload, build_gms_hash, build_motion_gms_hash
+from batching import get_gms_hash_key
+from cache import ProductCache, payload_key
+from catalog_index import CatalogIndex, get_remote_queries
+from characters import CharacterStore
+from connections import create_session, mount_api
+from exports import ExportStore, export_key, get_job_id, is_export_job
+from fileio import CHUNK_SIZE, copy_file, get_expected_size
+from journal import COMPLETED, FAILED, STARTED, RunJournal
+from library import LIBRARY_FILE, ContentIndex
+from pipeline import DOWNLOAD_WORKERS, LOOKUP_WORKERS, DownloadPipeline
+from planner import plan_exports
+from polling import AdaptivePoller
+from ratelimit import MAX_RETRIES, RETRY_STATUSES, RateLimiter, classify, get_retry_wait
+from tracing import MAX_TRACES, TRACE_FOLDER, Tracer, get_trace_path
+from writer import OutputWriter
+
+
+HEADERS = {
+"Accept": "application/json",
+"Accept-Encoding":"gzip, deflate, br, zstd",
+"Content-Type": "application/json",
+"X-Api-Key": "mixamo2",
+"X-Requested-With": "XMLHttpRequest",
+}
+
+# File where export latencies are stored, so that the time to wait
+# between checks of the export status can be learned across runs.
+POLL_STATS_FILE = "export_latency.json"
+
+# SQLite database where product details and payloads are cached.
+CACHE_FILE = "mixamo_cache.sqlite"
+
+# Type of the products downloaded by this tool.
+PRODUCT_TYPE = "Motion"
+
+# Catalog changes found by 'getids.py --incremental'.
+DIFF_FILE = "mixamo_catalog_diff.json"
+
+# Catalog of every product, shipped with the tool and searched locally.
+CATALOG_FILE = "mixamo_anims.json"
+
+# Extension of the files saved to disk.
+FILE_EXTENSION = "fbx"
+
+# Base URL of the Mixamo API (can be pointed to a mock server to benchmark).
+API_URL = "https://www.mixamo.com/api/v1"
+
+# Number of characters whose animations are downloaded at the same time
+# in batch mode.
+CHARACTER_WORKERS = 4
+
+# Number of search result pages fetched at the same time.
+SEARCH_WORKERS = 8
+
+# Number of animations exported at once, in a single archive (1 to export
+# them one by one). Only used by the threaded backend.
+EXPORT_BATCH_SIZE = 1
+
+# Export the animations that are part of packs as packs, when that needs
+# fewer exports (see 'planner.plan_exports'). Only used by the threaded
+# backend.
+USE_PACKS = False
+
+# Catalog of the packs (the same as the packs downloader's, refreshed by
+# 'getids.py --incremental').
+PACK_CATALOG_FILE = "mixamo_animsPack.json"
+
+# Number of threads writing the downloaded files to the output folder, so
+# that a slow one (e.g: a NAS) doesn't slow the downloads and exports down
+# (0 to write them as they're received). Only used by the threaded backend.
+WRITE_WORKERS = 0
+
+# When the downloaded files are flushed to disk ("always", "end" or
+# "never", see 'writer.FSYNC_POLICIES').
+FSYNC_POLICY = "always"
+
+# All requests will be done through a session to improve performance,
+# with a pool of connections for the API and another for the downloads.
+session = create_session(API_URL)
+
+# Every request to Mixamo (from any thread) shares the same rate limiter.
+limiter = RateLimiter()
+
+# Primary character of every account, shared by every run of the process.
+# The UI invalidates it when another character is selected in the browser
+# (see 'invalidate_characters').
+character_store = CharacterStore()
+
+
+def load_characters(file_path):
+  """Read the characters to be used in batch mode from a JSON file.
+
+  The file can be the 'mixamo_chars.json' written by 'get_characters.py'
+  (character IDs mapped to their product details), a dictionary of
+  character IDs and names, or just a list of character IDs.
+
+  :param file_path: JSON file path
+  :type file_path: str
+
+  :return: Character IDs and names
+  :rtype: dict
+  """
+  with open(file_path, "r") as file:
+    data = json.load(file)
+
+  if isinstance(data, list):
+    return {character_id: character_id for character_id in data}
+
+  return {
+    character_id: value.get("name", character_id) if isinstance(value, dict) else value
+    for character_id, value in data.items()}
+
+
+def invalidate_characters(account=None):
+  """Forget the primary character of an account (or of all of them), and
+  everything cached for it: its product details, payloads and exports.
+
+  This is to be called whenever the user selects, uploads or re-uploads a
+  character. It can be called from any thread.
+
+  :param account: Account key. If not set, every account is forgotten.
+  :type account: str
+  """
+  character_ids = character_store.invalidate(account)
+  if not character_ids:
+    return
+
+  cache = ProductCache(CACHE_FILE)
+  try:
+    for character_id in character_ids:
+      cache.invalidate_character(character_id)
+  finally:
+    cache.close()
+
+
+class Event:
+  """Callbacks to be run when something happens in the engine.
+
+  It has the same interface as a Qt signal ('connect' and 'emit'), so the
+  engine can report its progress without depending on Qt. Callbacks are
+  run on the thread that emits the event.
+  """
+  def __init__(self):
+    self.callbacks = []
+
+  def connect(self, callback):
+    """Run a callback whenever the event is emitted.
+
+    :param callback: Callable receiving the arguments of 'emit'
+    :type callback: callable
+    """
+    self.callbacks.append(callback)
+
+  def emit(self, *args):
+    """Run every callback connected to the event."""
+    for callback in self.callbacks:
+      callback(*args)
+
+
+class MixamoEngine:
+  """Bulk download animations from Mixamo.
+
+  Users can choose to download all animations in Mixamo (quite slow),
+  only those that contain a specific word (faster), or just the T-Pose.
+
+  The download mode is to be passed onto this class as an argument
+  when creating an instance.
+
+  The first step is to get the primary character ID and name. In batch
+  mode, animations are downloaded for a list of characters instead,
+  each of them to its own subfolder.
+
+  The engine doesn't depend on Qt, so it can be run from scripts (see
+  'cli.py'). Its progress is reported through events: 'total_tasks' and
+  'current_task' (with the number of tasks), and 'finished'. The Qt UI
+  forwards them to signals (see 'downloader.py').
+  """
+  # Initialize a counter for the progress bar.
+  task = 1
+  
+  # Initialize a flag that tells the code to stop.
+  stop = False
+
+  def __init__(self, path, mode, query=None, is_retry=False, characters=None,
+               token_provider=None):
+    """Initialize the Mixamo download engine.
+
+    :param path: Output folder path
+    :type path: str
+
+    :param mode: Download mode ("all", "query", "new" or "tpose")
+    :type mode: str
+
+    :param query: Keyword to be used as query when searching animations
+    :type query: str
+
+    :param is_retry: Whether to skip the animations already downloaded
+    :type is_retry: bool
+
+    :param characters: Character IDs and names for batch mode (see
+      'load_characters'). If not set, the primary character is used.
+    :type characters: dict
+
+    :param token_provider: Where to get a new access token from when it
+      expires (see 'auth.py'). If not set, the token already in HEADERS is
+      used until Mixamo rejects it.
+    :type token_provider: auth.TokenProvider
+    """
+    # Events that will be used to report progress to the UI.
+    self.finished = Event()
+    self.total_tasks = Event()
+    self.current_task = Event()
+
+    self.path = path
+    self.mode = mode
+    self.query = query
+    self.is_retry = is_retry
+    self.characters = characters
+    self.task_lock = threading.Lock()
+    self.poller = AdaptivePoller.load(POLL_STATS_FILE)
+    # The product cache, the exports and the library of the output folder
+    # are opened on first use (see 'cache', 'exports' and 'library'), and
+    # closed at the end of 'run'.
+    self.state_lock = threading.Lock()
+    self._cache = None
+    self._exports = None
+    self._library = None
+    # Every request, payload, export and download of the run is traced,
+    # and saved to TRACE_FOLDER unless it's empty.
+    self.tracer = Tracer(get_trace_path(TRACE_FOLDER, MAX_TRACES) if TRACE_FOLDER else None)
+    # Keeps the access token in HEADERS up to date.
+    self.tokens = TokenManager(HEADERS, token_provider)
+    # Writes the files downloaded by the pipelines (see 'runImpl').
+    self.writer = None
+
+    # The API URL can be changed after import (e.g. to a mock server).
+    mount_api(session, API_URL)
+
+  @property
+  def cache(self):
+    """Product cache (see 'CACHE_FILE'), opened on first use."""
+    with self.state_lock:
+      if self._cache is None:
+        self._cache = ProductCache(CACHE_FILE)
+      return self._cache
+
+  @property
+  def exports(self):
+    """Exports already done, so that identical ones are only done once,
+    across runs."""
+    cache = self.cache
+    with self.state_lock:
+      if self._exports is None:
+        self._exports = ExportStore(cache)
+      return self._exports
+
+  @property
+  def library(self):
+    """Motions already in the output folder (e.g: downloaded by the packs
+    downloader), linked or extracted rather than exported. The index is
+    kept in the output folder, which is only created when it's first used."""
+    with self.state_lock:
+      if self._library is None:
+        self._library = ContentIndex(os.path.join(self.path, LIBRARY_FILE))
+      return self._library
+
+  def run(self):
+    try:
+      self.tokens.ensure_token()
+      self.runImpl()
+    except Exception as e:
+      # Print the full exception and traceback to the console
+      import traceback
+      print("An error occurred:")
+      traceback.print_exc()
+    finally:
+      try:
+        self.print_stats()
+      finally:
+        self.close()
+
+  def close(self):
+    """Close the trace, and the product cache and the library if they've
+    been opened."""
+    self.tracer.close()
+
+    with self.state_lock:
+      cache, self._cache, self._exports = self._cache, None, None
+      library, self._library = self._library, None
+
+    for database in (cache, library):
+      if database is not None:
+        database.close()
+
+  def print_stats(self):
+    """Print a summary of the run, and store its export latencies."""
+    self.save_poll_stats()
+
+    if self._cache is not None:
+      cache_stats = self._cache.stats()
+      print(f"Product cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
+    if self._exports is not None:
+      export_stats = self._exports.stats()
+      print(f"Exports saved: {export_stats['reused']} reused from disk, "
+            f"{export_stats['coalesced']} coalesced")
+
+    if self._library is not None:
+      library_stats = self._library.stats()
+      print(f"Library: {library_stats['linked']} linked, {library_stats['extracted']} "
+            f"extracted from packs, {library_stats['kept']} already there")
+
+    limiter_stats = limiter.stats()
+    limits = ", ".join(
+      f"{endpoint}={state['limit']}"
+      for endpoint, state in limiter_stats["endpoints"].items())
+    print(f"Rate limiter: {limiter_stats['requests']} requests, "
+          f"{limiter_stats['throttled']} throttled, {limiter_stats['errors']} errors "
+          f"(concurrency: {limits})")
+
+    self.tracer.print_summary()
+
+  def save_poll_stats(self):
+    """Store the export latencies of this run and print a summary."""
+    if not self.poller.polls:
+      return
+
+    try:
+      stats = self.poller.save(POLL_STATS_FILE)
+      print(f"Export latency: {stats}")
+    except OSError as e:
+      print(f"WARNING: Couldnt save export latencies: {e}")
+
+  def runImpl(self):
+    # Get the characters to download animations for, with the folder
+    # each of them will be saved to.
+    characters = self.get_characters()
+
+    # If there's no character ID, it means that there was some problem
+    # with the access token, so we better stop the code at this point. 
+    if not characters:
+      print("No character_id. Exiting")
+      return
+
+    # DOWNLOAD MODE: TPOSE
+    if self.mode == "tpose":
+      # The total amount of tasks to process is 1 per character.
+      self.total_tasks.emit(len(characters))
+
+      for character_id, character_name, folder in characters:
+        # Build the T-Pose payload.
+        tpose_payload = self.build_tpose_payload(character_id, character_name)
+
+        # Export and download the T-Pose (unless it's been done already).
+        #print(f"Downloading T-Pose (with skin) for {character_name}...")
+        self.fetch_export(character_id, tpose_payload, 0, character_name, folder)
+        self.task_done()
+        #print(f"T-Pose successfully downloaded.")
+
+      # Emit the 'finished' signal to let the UI know that worker is done.
+      self.finished.emit()
+      return
+
+    # DOWNLOAD MODE: ALL
+    if self.mode == "all":
+      # Get animation IDs from the JSON file on disk.
+      anim_data = self.get_all_animations_data()
+
+    # DOWNLOAD MODE: QUERY
+    elif self.mode == "query":
+      # Search for animation IDs according to the query entered by the user,
+      # in the local catalog first. Mixamo's search is only used if there's
+      # no catalog, or nothing is found in it. Its results are streamed, so
+      # that downloads start before the search is over (see
+      # 'get_character_items' for the cases where they can't).
+      anim_data = self.search_catalog(self.query)
+      if anim_data is None:
+        anim_data = self.iter_queried_animations(self.query)
+
+    # DOWNLOAD MODE: NEW
+    elif self.mode == "new":
+      # Get the animations added since the last catalog refresh.
+      anim_data = self.get_new_animations_data()
+
+    # In batch mode, every animation is downloaded once per character, so
+    # the animations must be read in full before starting.
+    if len(characters) > 1:
+      anim_data = dict(anim_data)
+      self.total_tasks.emit(len(anim_data) * len(characters))
+
+    # The following code will be run for both the "all" and "query" modes.
+    # Every animation goes through a pipeline where product lookups and
+    # downloads run in parallel, and only the exports are serialized.
+    # Exports only need to be serialized per character, so each character
+    # gets its own pipeline and several of them run at the same time.
+    item_lists = [
+      self.get_character_items(character_id, folder, anim_data)
+      for character_id, _, folder in characters]
+
+    self.writer = OutputWriter(self.tracer, WRITE_WORKERS, FSYNC_POLICY)
+
+    try:
+      with ThreadPoolExecutor(CHARACTER_WORKERS) as pool:
+        # Consume the results so that exceptions aren't silently dropped.
+        list(pool.map(self.run_pipeline, item_lists))
+    finally:
+      # Every file handed over to the writer is written before finishing.
+      stats = self.writer.close()
+      self.writer = None
+      if WRITE_WORKERS:
+        print(f"Writer: {stats['files']} files written, downloads waited "
+              f"{stats['waited']:.2f}s for the spool")
+
+    if not self.stop:
+      print("DOWNLOAD COMPLETE.")
+    # Emit the 'finished' signal to let the UI know that worker is done.
+    self.finished.emit()
+    return
+
+  def get_characters(self):
+    """Get the characters to download animations for.
+
+    That's the primary character (i.e: the one selected by the user),
+    unless a list of characters has been given (batch mode).
+
+    :return: List of (character ID, character name, output folder)
+    :rtype: list
+    """
+    if not self.characters:
+      # Get the primary character ID and name (with a single request).
+      character = self.get_primary_character()
+      character_id = character.get("primary_character_id")
+      character_name = character.get("primary_character_name")
+
+      if not character_id:
+        return []
+      return [(character_id, character_name, self.path)]
+
+    # In batch mode, every character is saved to its own subfolder.
+    return [
+      (character_id, character_name,
+       self.get_character_folder(character_id, character_name))
+      for character_id, character_name in self.characters.items()]
+
+  def get_character_folder(self, character_id, character_name):
+    """Get the output folder of a character in batch mode.
+
+    The ID is part of the folder name because several characters can
+    have the same name.
+
+    :param character_id: Character ID
+    :type character_id: str
+
+    :param character_name: Character name
+    :type character_name: str
+
+    :return: Output folder path
+    :rtype: str
+    """
+    folder_name = f"{self.sanitize_filename(character_name or '')}_{character_id}"
+    return os.path.join(self.path, folder_name.lstrip("_"))
+
+  def get_character_items(self, character_id, folder, anim_data):
+    """Get the pipeline items needed to download animations for a character.
+
+    The journal of the output folder tells what's already been downloaded.
+    When retrying, completed animations are skipped without sending any
+    request, and the ones that failed or were interrupted go first. This
+    needs every animation to be known, so a streamed search is read in full
+    first. Otherwise, items are yielded as soon as animations are found.
+
+    :param character_id: Character ID
+    :type character_id: str
+
+    :param folder: Output folder path
+    :type folder: str
+
+    :param anim_data: Animation IDs and names (or an iterable of pairs)
+    :type anim_data: dict
+
+    :return: Pipeline items
+    :rtype: iterable
+    """
+    journal = RunJournal(folder)
+
+    if isinstance(anim_data, dict):
+      anim_data = anim_data.items()
+
+    items = (
+      {"index": index+1, "anim_id": anim_id, "anim_name": anim_name,
+       "character_id": character_id, "folder": folder, "journal": journal}
+      for index, (anim_id, anim_name) in enumerate(anim_data))
+
+    if self.is_retry:
+      # Files downloaded before the folder had a journal are found by the
+      # name of their animation in the catalog.
+      items, complete = journal.resume_order(list(items), lambda item: self.get_output_path(
+        item["index"], item["anim_name"], folder))
+      for item in complete:
+        print(f"Animation {item['index']} {item['anim_name']} already downloaded, skipping")
+        self.task_done()
+
+    return items
+
+  def run_pipeline(self, items):
+    """Download the animations of a single character through a pipeline.
+
+    :param items: Pipeline items
+    :type items: iterable
+    """
+    # Animations downloaded as part of packs are done before the others.
+    if USE_PACKS:
+      items = self.export_packs(list(items))
+
+    pipeline = DownloadPipeline(
+      lookup=self.lookup_item,
+      export=self.export_item,
+      download=self.download_item,
+      on_done=lambda item: self.task_done(),
+      on_error=self.record_failure,
+      # Check if the 'Stop' button has been pressed in the UI.
+      should_stop=lambda: self.stop,
+      export_batch=self.export_batch,
+      batch_size=EXPORT_BATCH_SIZE)
+    pipeline.run(items)
+
+  def lookup_item(self, item):
+    """Pipeline stage: build the export payload of an animation.
+
+    :param item: Pipeline item
+    :type item: dict
+
+    :return: Pipeline item with its payload, or None to skip it
+    :rtype: dict
+    """
+    item["payload"] = self.build_animation_payload(
+      item["character_id"], item["anim_id"])
+    item["product_name"] = json.loads(item["payload"])["product_name"]
+    item["export_key"] = export_key(item["payload"])
+
+    # Motions the library already has don't need to be exported.
+    file = self.get_from_library(item)
+    if file is not None:
+      item["file"] = file
+      item["journal"].record(item["anim_id"], COMPLETED, index=item["index"],
+        file=file.path, size=file.size, sha256=file.sha256)
+      return None
+
+    # Used to measure how long the item waits for the export stage.
+    item["queued"] = time.monotonic()
+
+    return item
+
+  def export_item(self, item):
+    """Pipeline stage: export an animation and get its download link.
+
+    :param item: Pipeline item
+    :type item: dict
+
+    :return: Pipeline item with its URL, or None if it couldn't be exported
+    :rtype: dict
+    """
+    self.tracer.record("export_wait", time.monotonic() - item["queued"],
+      anim_id=item["anim_id"])
+
+    # If the same export has already been downloaded, or is being done
+    # right now, its file is copied by the download stage instead.
+    item["export"], item["leader"] = self.exports.join(item["export_key"])
+    if not item["leader"]:
+      return item
+
+    return self.export_single(item)
+
+  def export_single(self, item):
+    """Export an animation on its own.
+
+    :param item: Pipeline item, which must be the leader of its export
+    :type item: dict
+
+    :return: Pipeline item with its URL, or None if it couldn't be exported
+    :rtype: dict
+    """
+    try:
+      item["url"] = self.export_animation(item["character_id"], item["payload"])
+    except Exception as e:
+      self.exports.abandon(item["export_key"], e)
+      raise
+
+    if not item["url"]:
+      self.exports.abandon(item["export_key"])
+      print(f'WARNING: Couldnt download animation {item["index"]} {item["anim_id"]} {item["anim_name"]}')
+      self.record_failure(item)
+      return None
+
+    return item
+
+  def export_batch(self, items):
+    """Pipeline stage: export several animations at once.
+
+    The animations are exported together, like the motions of a pack, and
+    the download stage splits the archive Mixamo returns into a file per
+    animation. If the batch can't be exported, the animations (or only
+    the ones missing from the archive) are exported one by one instead.
+
+    :param items: Pipeline items
+    :type items: list
+
+    :return: Pipeline items that can be downloaded
+    :rtype: list
+    """
+    start = time.monotonic()
+    ready = []
+    leaders = []
+
+    for item in items:
+      self.tracer.record("export_wait", start - item["queued"],
+        anim_id=item["anim_id"])
+
+      # Exports already downloaded, or being done, aren't batched.
+      item["export"], item["leader"] = self.exports.join(item["export_key"])
+      (leaders if item["leader"] else ready).append(item)
+
+    singles = leaders
+    if len(leaders) > 1:
+      archive = self.export_archive(leaders)
+      singles = []
+
+      for item in leaders:
+        if archive is not None and item["batch_name"] in archive:
+          archive.retain()
+          item["archive"] = archive
+          ready.append(item)
+        else:
+          singles.append(item)
+
+      if archive is not None and not archive.users:
+        archive.remove()
+
+    for item in singles:
+      try:
+        item = self.export_single(item)
+      except AuthenticationError:
+        raise
+      except Exception as e:
+        print(f'WARNING: Couldnt export animation {item["index"]} {item["anim_id"]}: {e!r}')
+        self.record_failure(item, e)
+        continue
+
+      if item is not None:
+        ready.append(item)
+
+    self.tracer.record("batch", time.monotonic() - start, size=len(items),
+      batched=len(leaders) - len(singles) if len(leaders) > 1 else 0,
+      singles=len(singles))
+
+    return ready
+
+  def export_archive(self, items):
+    """Export several animations in a single archive and download it.
+
+    :param items: Pipeline items (of the same character)
+    :type items: list
+
+    :return: Downloaded archive, or None if it couldn't be exported
+    :rtype: batching.BatchArchive
+    """
+    # Motions are named in the archive after the file they're saved to.
+    for item in items:
+      item["batch_name"] = os.path.splitext(os.path.basename(
+        self.get_output_path(item["index"], item["product_name"])))[0]
+
+    payload = build_batch_payload(
+      items[0]["character_id"], [item["payload"] for item in items],
+      [item["batch_name"] for item in items])
+
+    path = os.path.join(items[0]["folder"] or "", f".batch_{items[0]['index']}.zip")
+
+    return self.download_archive(items[0]["character_id"], payload, path,
+      f"a batch of {len(items)} animations")
+
+  def download_archive(self, character_id, payload, path, description):
+    """Export several motions at once and download their archive.
+
+    :param character_id: Character ID
+    :type character_id: str
+
+    :param payload: Export payload
+    :type payload: str
+
+    :param path: Path the archive is saved to
+    :type path: str
+
+    :param description: What's exported (only used in warnings)
+    :type description: str
+
+    :return: Downloaded archive, or None if it couldn't be exported
+    :rtype: batching.BatchArchive
+    """
+    try:
+      url = self.export_animation(character_id, payload)
+      if not url:
+        print(f"WARNING: Couldnt export {description}, exporting them one by one")
+        return None
+
+      file = self.download_file(url, path)
+      return BatchArchive(file.path)
+
+    except AuthenticationError:
+      raise
+    except Exception as e:
+      print(f"WARNING: Couldnt download {description} ({e!r}), exporting them one by one")
+      if os.path.exists(path):
+        os.remove(path)
+      return None
+
+  def export_packs(self, items):
+    """Download the animations that are part of packs by exporting the packs.
+
+    The packs are chosen by 'planner.plan_exports', so that as few exports
+    as possible are needed, and their archives are split into a file per
+    wanted animation (the others are thrown away). Animations that aren't
+    part of any pack worth exporting, or whose pack couldn't be exported,
+    are left to the pipeline.
+
+    :param items: Pipeline items (of the same character)
+    :type items: list
+
+    :return: Pipeline items left to export on their own
+    :rtype: list
+    """
+    if not items:
+      return items
+
+    start = time.monotonic()
+    character_id = items[0]["character_id"]
+    packs = self.get_pack_motions(character_id)
+
+    # Payloads are cached, so the pipeline won't request them again.
+    with ThreadPoolExecutor(LOOKUP_WORKERS) as pool:
+      keys = list(pool.map(self.get_motion_key, items))
+
+    wanted = {
+      item["anim_id"]: key for item, key in zip(items, keys) if key is not None}
+    plan, singles = plan_exports(
+      wanted, {pack_id: set(motions) for pack_id, (_, motions) in packs.items()})
+
+    print(f"Pack planner: {len(wanted) - len(singles)} animations in {len(plan)} packs, "
+          f"{len(items) - len(wanted) + len(singles)} on their own")
+    self.tracer.record("plan", time.monotonic() - start, packs=len(plan),
+      covered=len(wanted) - len(singles), singles=len(items) - len(wanted) + len(singles))
+
+    items_by_id = {item["anim_id"]: item for item in items}
+    extracting = []
+
+    # Packs are exported one after the other (like every export of a
+    # character), while the previous ones are being extracted.
+    with ThreadPoolExecutor(DOWNLOAD_WORKERS) as pool:
+      for pack_id, anim_ids in plan:
+        if self.stop:
+          break
+
+        product, motions = packs[pack_id]
+        folder = items_by_id[anim_ids[0]]["folder"]
+        archive = self.download_archive(character_id,
+          self.build_pack_payload(character_id, product),
+          os.path.join(folder or "", f".pack_{pack_id}.zip"),
+          f"the pack {product.get('name')}")
+        if archive is None:
+          continue
+
+        members = [
+          (items_by_id[anim_id], motions[wanted[anim_id]]) for anim_id in anim_ids
+          if motions[wanted[anim_id]] in archive]
+        if not members:
+          archive.remove()
+          continue
+
+        # Every item retains the archive before any extraction starts, so
+        # that it isn't removed by the first one to be done.
+        archive.retain(len(members))
+        for item, name in members:
+          item["archive"] = archive
+          item["batch_name"] = name
+          extracting.append((item, pool.submit(self.extract_pack_item, item)))
+
+    done = {item["anim_id"] for item, future in extracting if future.result()}
+    for item in items:
+      if "file" in item:
+        done.add(item["anim_id"])
+        self.task_done()
+
+    return [item for item in items if item["anim_id"] not in done]
+
+  def get_pack_motions(self, character_id):
+    """Get the motions of every pack of the pack catalog.
+
+    :param character_id: Character ID
+    :type character_id: str
+
+    :return: Pack IDs mapped to their product details and to the names of
+      their motions by key (see 'batching.get_gms_hash_key')
+    :rtype: dict
+    """
+    try:
+      with open(PACK_CATALOG_FILE, "r") as file:
+        pack_ids = list(json.load(file))
+    except (OSError, ValueError) as e:
+      print(f"WARNING: Couldnt read the pack catalog, exporting the animations "
+            f"one by one: {e}")
+      return {}
+
+    with ThreadPoolExecutor(SEARCH_WORKERS) as pool:
+      products = list(pool.map(
+        lambda pack_id: self.get_pack_product(character_id, pack_id), pack_ids))
+
+    packs = {}
+    for pack_id, product in zip(pack_ids, products):
+      if product is None:
+        continue
+
+      motions = product.get("details", {}).get("motions", [])
+      packs[pack_id] = (product, {
+        get_gms_hash_key(motion["gms_hash"]): motion["name"] for motion in motions})
+
+    return packs
+
+  def get_pack_product(self, character_id, pack_id):
+    """Get the product details of a pack, from the cache when possible.
+
+    :return: Product details, or None if they couldn't be got
+    :rtype: dict
+    """
+    try:
+      product = self.cache.get_product(character_id, pack_id)
+      if product is None:
+        product = self.fetch_product(character_id, pack_id)
+      return product
+    except AuthenticationError:
+      raise
+    except Exception as e:
+      print(f"WARNING: Couldnt get the details of the pack {pack_id}: {e!r}")
+      return None
+
+  def get_motion_key(self, item):
+    """Get the key the motion of an item is known by in packs.
+
+    :param item: Pipeline item
+    :type item: dict
+
+    :return: Key of its 'gms_hash' (see 'batching.get_gms_hash_key'), or
+      None if it shouldn't be part of a pack
+    """
+    try:
+      # Animations found in the library are done already.
+      if self.lookup_item(item) is None:
+        return None
+    except Exception:
+      # The pipeline will try again, and report the error.
+      return None
+
+    # Exports already downloaded are copied rather than exported again.
+    if self.exports.lookup(item["export_key"]) is not None:
+      return None
+
+    return self.get_item_key(item)
+
+  def build_pack_payload(self, character_id, product):
+    """Build the payload exporting a whole pack, like the packs downloader.
+
+    :param character_id: Character ID
+    :type character_id: str
+
+    :param product: Product details of the pack
+    :type product: dict
+
+    :return: Payload that will be used to export the pack
+    :rtype: str
+    """
+    payload = {
+        "character_id": character_id,
+        "product_name": product.get("name"),
+        "preferences": {
+          "format": "fbx7_2019",
+          "mesh_motionpack": "t-pose",
+          "fps": "60",
+          "reducekf": "0",
+        },
+        "type": product["type"],
+        "gms_hash": [
+          build_motion_gms_hash(motion) for motion in product["details"]["motions"]],
+    }
+
+    return json.dumps(payload)
+
+  def extract_pack_item(self, item):
+    """Save an animation from the archive of its pack.
+
+    :param item: Pipeline item, with its 'archive' and 'batch_name'
+    :type item: dict
+
+    :return: True if it's been saved, False if it must be exported on its own
+    :rtype: bool
+    """
+    try:
+      item["journal"].record(item["anim_id"], STARTED, index=item["index"])
+      file = self.extract_from_archive(item)
+    except Exception as e:
+      print(f'WARNING: Couldnt extract animation {item["index"]} {item["anim_name"]} '
+            f'from its pack ({e!r}), exporting it on its own')
+      del item["archive"]
+      return False
+
+    # Later runs copy it instead of exporting it again.
+    self.exports.complete(item["export_key"], item["character_id"], file)
+    self.add_to_library(item, file)
+
+    item["journal"].record(item["anim_id"], COMPLETED, index=item["index"],
+      file=file.path, size=file.size, sha256=file.sha256)
+    self.task_done()
+    return True
+
+  def download_item(self, item):
+    """Pipeline stage: download an exported animation to disk.
+
+    :param item: Pipeline item
+    :type item: dict
+
+    :return: Future done once the file has been written, if it's left to
+      the writer stage
+    :rtype: concurrent.futures.Future
+    """
+    item["journal"].record(item["anim_id"], STARTED, index=item["index"])
+
+    if item["leader"] and "archive" not in item:
+      # The file may be written by the writer stage, in which case the
+      # download slot is freed as soon as it's been received, and the item
+      # is only done once it's been written.
+      try:
+        future = self.start_download(item["url"], self.get_output_path(
+          item["index"], item["product_name"], item["folder"]), item["index"])
+      except Exception as e:
+        self.exports.abandon(item["export_key"], e)
+        raise
+
+      done = Future()
+      future.add_done_callback(lambda future: self.finish_download(item, future, done))
+      return done
+
+    if item["leader"]:
+      try:
+        file = self.extract_from_archive(item)
+        self.exports.complete(item["export_key"], item["character_id"], file)
+      finally:
+        self.exports.abandon(item["export_key"])
+    else:
+      # Wait for the export it's been coalesced with, if it's running.
+      file = self.copy_export(item["export"].result(), item["index"],
+        item["product_name"], item["folder"])
+
+    self.finish_item(item, file)
+
+  def finish_download(self, item, future, done):
+    """Complete the export of an item once its file has been written.
+
+    :param item: Pipeline item
+    :type item: dict
+
+    :param future: Future of the written file (see 'start_download')
+    :type future: concurrent.futures.Future
+
+    :param done: Future set once the item is complete (or failed)
+    :type done: concurrent.futures.Future
+    """
+    try:
+      file = future.result()
+      self.exports.complete(item["export_key"], item["character_id"], file)
+      self.finish_item(item, file)
+    except Exception as e:
+      self.exports.abandon(item["export_key"], e)
+      done.set_exception(e)
+      return
+
+    done.set_result(file)
+
+  def finish_item(self, item, file):
+    """Record that the file of an item has been saved.
+
+    :param item: Pipeline item
+    :type item: dict
+
+    :param file: Saved file (with its 'path', 'size' and 'sha256')
+    :type file: fileio.AtomicFile
+    """
+    self.add_to_library(item, file)
+    item["journal"].record(item["anim_id"], COMPLETED, index=item["index"],
+      file=file.path, size=file.size, sha256=file.sha256)
+
+  def get_from_library(self, item):
+    """Save an animation from the library, if it's already got it.
+
+    :param item: Pipeline item, with its payload
+    :type item: dict
+
+    :return: Saved file, or None if it has to be exported
+    :rtype: library.LibraryFile
+    """
+    with self.tracer.span("library", index=item["index"]) as span:
+      file = self.library.obtain(item["character_id"], self.get_item_key(item),
+        self.get_output_path(item["index"], item["product_name"], item["folder"]),
+        self.should_fsync())
+      span["found"] = file is not None
+      if file is not None:
+        self.add_to_writer(file)
+      return file
+
+  def add_to_library(self, item, file):
+    """Record the file of an animation in the library.
+
+    :param item: Pipeline item, with its payload
+    :type item: dict
+
+    :param file: Saved file
+    :type file: fileio.AtomicFile
+    """
+    try:
+      self.library.add_file(item["character_id"], self.get_item_key(item), file)
+    except Exception as e:
+      print(f'WARNING: Couldnt add animation {item["index"]} to the library: {e!r}')
+
+  def get_item_key(self, item):
+    """Get the key of the motion of an item, which is what packs and the
+    library know it by.
+
+    The same motion in a pack may be a variant of it (e.g: mirrored or
+    trimmed), so its whole 'gms_hash' has to match, not just its 'model-id'.
+
+    :param item: Pipeline item, with its payload
+    :type item: dict
+
+    :return: Key of the motion (see 'batching.get_gms_hash_key')
+    :rtype: str
+    """
+    return get_gms_hash_key(json.loads(item["payload"])["gms_hash"][0])
+
+  def extract_from_archive(self, item):
+    """Extract an animation exported in a batch (or a pack) from its archive.
+
+    :param item: Pipeline item
+    :type item: dict
+
+    :return: Extracted file
+    :rtype: fileio.AtomicFile
+    """
+    archive = item["archive"]
+    try:
+      with self.tracer.span("extract", index=item["index"]) as span:
+        file = archive.extract(item["batch_name"], self.get_output_path(
+          item["index"], item["product_name"], item["folder"]), self.should_fsync())
+        self.add_to_writer(file)
+        span["bytes"] = file.size
+        return file
+    finally:
+      archive.release()
+
+  def record_failure(self, item, error=None):
+    """Record in the journal that an animation couldn't be downloaded.
+
+    :param item: Pipeline item
+    :type item: dict
+
+    :param error: Exception that made it fail, if any
+    :type error: Exception
+    """
+    item["journal"].record(item["anim_id"], FAILED, index=item["index"],
+      error=repr(error) if error else None)
+
+  def task_done(self):
+    """Let the UI know that a task has been completed."""
+    # Tasks are completed from several threads, so the counter is locked.
+    with self.task_lock:
+      self.current_task.emit(self.task)
+      # Increase the counter by one.
+      self.task += 1
+
+  def make_request(self, method, url, **kwargs):
+    """Send a request to Mixamo, going through the shared rate limiter.
+
+    Connection errors, throttled requests (429) and server errors (5xx)
+    are retried, waiting as long as the 'Retry-After' header says or
+    backing off exponentially. Requests rejected because the access token
+    has expired (401) are sent again once it's been refreshed. Requests
+    are given up after MAX_RETRIES attempts, or MAX_RETRY_TIME seconds of
+    backing off.
+
+    Streamed responses keep their rate limiter slot until they're closed.
+
+    :param method: HTTP method
+    :type method: str
+
+    :param url: Request URL
+    :type url: str
+
+    :return: Response
+    :rtype: requests.Response
+    """
+    endpoint = classify(url)
+    start = time.monotonic()
+    # Time spent waiting for the rate limiter, and backing off.
+    wait = 0
+    backoff = 0
+
+    for attempt in range(MAX_RETRIES):
+      wait_start = time.monotonic()
+      self.tokens.wait_ready()
+      limiter.acquire(endpoint)
+      wait += time.monotonic() - wait_start
+
+      token = self.tokens.get_token()
+      try:
+        response = session.request(method, url, timeout=10, **kwargs)
+      except requests.exceptions.RequestException:
+        limiter.release(endpoint)
+        delay = get_retry_wait(attempt, backoff)
+        if delay is None:
+          break
+        time.sleep(delay)
+        backoff += delay
+        continue
+
+      # A streamed body is read after this returns: its slot is kept until
+      # then, so that the limit counts the downloads actually running.
+      if kwargs.get("stream") and response.status_code < 400:
+        limiter.release_on_close(response, endpoint)
+      else:
+        limiter.release(endpoint, response.status_code, response.headers)
+
+      # The access token has expired: get a new one (only once for all the
+      # requests rejected with it) and send the request again. If there's
+      # no new token, there's no point in going on.
+      if response.status_code == 401 and endpoint != "download":
+        response.close()
+        if self.tokens.handle_unauthorized(token):
+          continue
+        self.stop = True
+        raise AuthenticationError("Mixamo rejected the access token, please log in again.")
+
+      if response.status_code not in RETRY_STATUSES:
+        self.tracer.record("request", time.monotonic() - start, method=method,
+          endpoint=endpoint, status=response.status_code, attempts=attempt+1,
+          wait=round(wait, 6))
+        return response
+
+      response.close()
+      delay = get_retry_wait(attempt, backoff, response.headers)
+      if delay is None:
+        break
+      print(f"WARNING: {url} answered {response.status_code}, retrying")
+      time.sleep(delay)
+      backoff += delay
+
+    self.tracer.record("request", time.monotonic() - start, method=method,
+      endpoint=endpoint, status=None, attempts=attempt+1, wait=round(wait, 6))
+    raise Exception(f"Failed to complete request to {url} after {attempt+1} attempts.")
+
+  def get_primary_character(self):
+    """Get the primary character (i.e: the one selected by the user).
+
+    It's only requested once per account, and then read from the
+    character store until the user selects another character.
+
+    :return: Answer of the primary character endpoint, with the
+      'primary_character_id' and 'primary_character_name' keys
+    :rtype: dict
+    """
+    account = get_account_key(self.tokens.get_token())
+    return character_store.get(account, self.fetch_primary_character)
+
+  def fetch_primary_character(self):
+    """Request the primary character from Mixamo.
+
+    :return: Answer of the primary character endpoint
+    :rtype: dict
+    """
+    # Send a GET request to the primary character endpoint.
+    response = self.make_request("GET",
+      f"{API_URL}/characters/primary",
+      headers=HEADERS)
+
+    return response.json()
+
+  def get_primary_character_id(self):
+    """Get the primary character ID (i.e: the one selected by the user).
+
+    :return: Primary character ID
+    :rtype: str
+    """
+    return self.get_primary_character().get("primary_character_id")
+
+  def get_primary_character_name(self):
+    """Get the primary character name (i.e: the one selected by the user).
+
+    :return: Primary character name
+    :rtype: str
+    """
+    return self.get_primary_character().get("primary_character_name")
+
+  def build_tpose_payload(self, character_id, character_name):
+    """Build the payload that will be used to export the T-Pose.
+
+    :param character_id: Primary character ID
+    :type character_id: str
+
+    :param character_name: Primary character name
+    :type character name: str
+
+    :return: Payload that will be used to export the T-Pose
+    :rtype: str
+    """
+    # Update the 'product_name' variable so that it can be used later
+    # as the FBX file name (see the 'download_animation' method).
+    self.product_name = character_name
+
+    # Build the payload.
+    payload = {
+      "character_id": character_id,
+      "product_name": self.product_name,
+      "type": "Character",
+      "preferences": {"format":"fbx7_2019", "mesh":"t-pose"},
+      "gms_hash": None,
+    }
+
+    # Convert the payload dictionary into a JSON string.
+    tpose_payload = json.dumps(payload)    
+
+    return tpose_payload
+
+  def get_queried_animations_data(self, query):
+    """Get the ID and name of every animation found by the user query.
+
+    :return: Queried animation IDs and names
+    :rtype: dict
+    """
+    anim_data = self.search_catalog(query)
+    if anim_data is not None:
+      return anim_data
+
+    anim_data = dict(self.iter_queried_animations(query))
+
+    # Let the UI know how many animations are to be downloaded.
+    self.total_tasks.emit(len(anim_data))
+
+    return anim_data
+
+  def search_catalog(self, query):
+    """Get the ID and name of every animation matching a query, offline.
+
+    The local catalog is searched through an inverted index saved next to
+    it (see 'catalog_index.py' for the query syntax). This only takes a few
+    milliseconds, against several requests for Mixamo's search.
+
+    :param query: Keyword to be used as query when searching animations
+    :type query: str
+
+    :return: Matching animation IDs and names, or None if the catalog
+      couldn't be read or nothing matches
+    :rtype: dict
+    """
+    try:
+      index = CatalogIndex.load(CATALOG_FILE, "description")
+    except (OSError, ValueError) as e:
+      print(f"WARNING: Couldn't read the local catalog: {e}")
+      return None
+
+    # The catalog may be missing the animations Mixamo added since it was
+    # last refreshed, but it's trusted as long as it finds something.
+    anim_data = index.search(query)
+    if not anim_data:
+      print(f"No match for '{query}' in the local catalog, searching Mixamo")
+      return None
+
+    # Let the UI know how many animations are to be downloaded.
+    self.total_tasks.emit(len(anim_data))
+
+    return anim_data
+
+  def iter_queried_animations(self, query):
+    """Yield the ID and name of every animation found by the user query.
+
+    The first page is fetched to know how many pages there are, and the
+    rest of them are then fetched in parallel. Animations are yielded as
+    soon as their page arrives, so that they can start being downloaded
+    before the search is over.
+
+    Mixamo's search doesn't understand the syntax of the local catalog's,
+    so every alternative of the query ("OR") is searched on its own,
+    without any "*" (see 'catalog_index.get_remote_queries').
+
+    :param query: Keyword to be used as query when searching animations
+    :type query: str
+
+    :return: Queried animation IDs and names
+    :rtype: generator
+    """
+    # Animations can show up in several pages (and alternatives), so only
+    # yield them once.
+    found = set()
+    estimate = 0
+
+    def unique(animations):
+      for animation in animations:
+        if animation["id"] not in found:
+          found.add(animation["id"])
+          yield animation["id"], animation["description"]
+
+    for remote_query in get_remote_queries(query):
+      # Send a GET request to the animations endpoint for the first page.
+      data = self.get_queried_page(remote_query, 1)
+
+      # Total number of pages.
+      num_pages = data["pagination"]["num_pages"]
+
+      # Let the UI know how many animations are (roughly) to be downloaded.
+      # The exact number is only known once every page has been read.
+      estimate += data["pagination"].get("num_results", num_pages * len(data["results"]))
+      self.total_tasks.emit(estimate)
+
+      yield from unique(data["results"])
+
+      # Make sure we read every other page and grab the animations therein.
+      with ThreadPoolExecutor(SEARCH_WORKERS) as pool:
+        pages = [
+          pool.submit(self.get_queried_page, remote_query, page_num)
+          for page_num in range(2, num_pages + 1)]
+
+        for page in as_completed(pages):
+          yield from unique(page.result()["results"])
+
+    if len(found) != estimate:
+      self.total_tasks.emit(len(found))
+
+  def get_queried_page(self, query, page_num):
+    """Get a page of the animations found by the user query.
+
+    :param query: Keyword to be used as query when searching animations
+    :type query: str
+
+    :param page_num: Page number (starting at 1)
+    :type page_num: int
+
+    :return: Response of the products endpoint
+    :rtype: dict
+    """
+    # Parameters to be passed onto the endpoint.
+    params = {
+      "limit": 96,
+      "page": page_num,
+      "type": PRODUCT_TYPE,
+      "query": query}
+
+    # Send a GET request to the animations endpoint.
+    response = self.make_request("GET",
+      f"{API_URL}/products",
+      headers=HEADERS,
+      params=params)
+
+    return response.json()
+
+  def get_all_animations_data(self):
+    """Get the ID and name of every animation in Mixamo.
+
+    To speed things up, all animations have been previously exported to a
+    JSON file that we'll be reading locally. This is way faster than getting
+    all animations on the fly every time you run the tool.
+
+    Mixamo doesn't seem to add new animations very often, so we're OK with
+    using a pre-saved local file.
+
+    The JSON file might be updated on GitHub if we know of any new entries.
+
+    :return: All animation IDs and names
+    :rtype: dict   
+    """
+    # Initialize a dictionary to store all animation IDs and names.
+    anim_data = {}
+
+    # Read the local JSON file and dump its content to the dictionary.
+    with open(CATALOG_FILE, "r") as file:
+      anim_data = json.load(file)
+
+    # Let the UI know how many animations are to be downloaded.    
+    self.total_tasks.emit(len(anim_data))
+    
+    return anim_data
+
+  def get_new_animations_data(self):
+    """Get the ID and name of every animation added to Mixamo recently.
+
+    These are the animations found by the last incremental refresh of the
+    catalog ('getids.py --incremental'), which are saved to a diff file.
+
+    :return: New animation IDs and names
+    :rtype: dict
+    """
+    anim_data = {}
+
+    if os.path.exists(DIFF_FILE):
+      with open(DIFF_FILE, "r") as file:
+        anim_data = json.load(file).get(PRODUCT_TYPE, {}).get("added", {})
+    else:
+      print(f"No {DIFF_FILE} found. Run 'getids.py --incremental' first.")
+
+    # Let the UI know how many animations are to be downloaded.
+    self.total_tasks.emit(len(anim_data))
+
+    return anim_data
+
+  def build_animation_payload(self, character_id, anim_id):
+    """Build the payload that will be used to export the animation.
+
+    :param character_id: Primary character ID
+    :type character_id: str
+
+    :param anim_id: Animation ID
+    :type anim_id: str
+
+    :return: Payload that will be used to export the animation
+    :rtype: str
+    """
+    with self.tracer.span("payload", anim_id=anim_id) as span:
+      # Product details are read from the cache when possible.
+      product = self.cache.get_product(character_id, anim_id)
+      span["cached"] = product is not None
+
+      if product is None:
+        product = self.fetch_product(character_id, anim_id)
+
+      return self.build_cached_payload(character_id, product)
+
+  def fetch_product(self, character_id, product_id):
+    """Request the product details of an animation (or a pack) on a
+    character, and cache them.
+
+    :param character_id: Character ID
+    :type character_id: str
+
+    :param product_id: Product ID
+    :type product_id: str
+
+    :return: Product details
+    :rtype: dict
+    """
+    # Send a GET request to the animation-on-character endpoint.
+    response = self.make_request("GET",
+      f"{API_URL}/products/{product_id}?similar=0&character_id={character_id}",
+      headers=HEADERS)
+
+    product = response.json()
+    self.cache.put_product(character_id, product_id, product)
+    return product
+
+  def build_cached_payload(self, character_id, product):
+    """Get the export payload of some product details from the cache.
+
+    The payload is only built (and stored) if it's not been cached yet.
+
+    :param character_id: Primary character ID
+    :type character_id: str
+
+    :param product: Product details returned by the products endpoint
+    :type product: dict
+
+    :return: Payload that will be used to export the animation
+    :rtype: str
+    """
+    key = payload_key(character_id, product)
+    anim_payload = self.cache.get_payload(key)
+
+    if anim_payload is None:
+      anim_payload = self.build_payload_from_product(character_id, product)
+      self.cache.put_payload(key, character_id, anim_payload)
+
+    # Make the animation name public so that we can use it later.
+    self.product_name = json.loads(anim_payload)["product_name"]
+
+    return anim_payload
+
+  def build_payload_from_product(self, character_id, product):
+    """Build the export payload from the product details of an animation.
+
+    This is kept apart from the HTTP request so that every backend can
+    share it, whatever client they use to get the product details.
+
+    :param character_id: Primary character ID
+    :type character_id: str
+
+    :param product: Product details returned by the products endpoint
+    :type product: dict
+
+    :return: Payload that will be used to export the animation
+    :rtype: str
+    """
+    # Get the animation description (make it public so that we can use it later).
+    # We're using the description because some anims have the same name and this
+    # would cause them to be overriden when downloading to disk.
+    self.product_name = product.get("description")
+    # Get the animation type.
+    _type = product["type"]
+
+    # Set the animation preferences.
+    # NOTE: Changing the 'skin' key to True doesn't seem to have any effect.
+    preferences =   {
+      "format": "fbx7_2019",
+      "skin": False,
+      "fps": "60",
+      "reducekf": "0",
+    }
+
+    # Build the 'gms_hash' Mixamo actually needs, from a copy of the
+    # original one.
+    gms_hash = build_gms_hash(product["details"]["gms_hash"])
+    gms_hash["trim"] = [int(gms_hash["trim"][0]), int(gms_hash["trim"][1])]
+
+    # Build the payload.
+    payload = {
+        "character_id": character_id,
+        "product_name": self.product_name,
+        "type": _type,
+        "preferences": preferences,
+        "gms_hash": [gms_hash],
+    }
+
+    # Convert the payload dictionary into a JSON string.
+    anim_payload = json.dumps(payload)
+
+    return anim_payload
+
+  def export_animation(self, character_id, payload):
+    """Export the animation and retrieve the download link.
+
+    :param character_id: Primary character ID
+    :type character_id: str
+
+    :param payload: Payload that will be used to export the animation
+    :type payload: str
+
+    :return: URL to download the animation
+    :rtype: str
+    """
+    export_start = time.monotonic()
+
+    # Send a POST request to the export animations endpoint.
+    response = self.make_request("POST",
+      f"{API_URL}/animations/export",
+      data=payload,
+      headers=HEADERS)
+
+    # Exports Mixamo refuses (4xx) aren't retried, nor worth polling for:
+    # the monitor would report the previous export of the character.
+    if not 200 <= response.status_code < 300:
+      print(f"WARNING: Mixamo refused the export ({response.status_code}): "
+            f"{response.text[:200]}")
+      self.tracer.record("export", time.monotonic() - export_start,
+        character_id=character_id, status=response.status_code, polls=0)
+      return None
+    job_id = get_job_id(response)
+
+    # Initialize a 'status' flag.
+    status = None
+    polls = 0
+    delay = 0
+    start = time.monotonic()
+
+    # Check if the process is completed and retry if it's not. The poller
+    # decides how long to wait before every check, based on how long the
+    # previous exports took, and gives up once the deadline (counted from
+    # the export request) is reached.
+    for delay in self.poller.delays(export_start):
+      time.sleep(delay)
+
+      # Send a GET request to the monitor endpoint.
+      response = self.make_request("GET",
+        f"{API_URL}/characters/{character_id}/monitor",
+        headers=HEADERS)
+      polls += 1
+
+      # Until the monitor reports the export just sent, it's pending.
+      job = response.json()
+      status = job.get("status") if is_export_job(job, job_id) else None
+
+      # The loop will end as soon as the status is 'completed'.
+      if status in ("completed", "failed"):
+        break
+
+    self.poller.record(time.monotonic() - start, polls, status, delay)
+    if status == "failed":
+      print(f"WARNING: Mixamo failed to export the animation (job {job_id})")
+
+    # The time spent exporting is split between sending the export and
+    # polling its status.
+    self.tracer.record("export", time.monotonic() - export_start,
+      character_id=character_id, status=status, polls=polls,
+      submit_time=round(start - export_start, 6),
+      poll_time=round(time.monotonic() - start, 6))
+
+    # Grab the download link from the response.
+    if status == "completed":
+      download_link = job.get("job_result")
+
+      return download_link
+    return None
+
+  def fetch_export(self, character_id, payload, index, product_name, folder=None):
+    """Export an animation and download it, unless the same export has
+    already been downloaded (see 'exports.ExportStore').
+
+    :param character_id: Character ID
+    :type character_id: str
+
+    :param payload: Export payload
+    :type payload: str
+
+    :param index: Index used as a prefix of the file name
+    :type index: int
+
+    :param product_name: Animation name
+    :type product_name: str
+
+    :param folder: Output folder path (defaults to the one set by the user)
+    :type folder: str
+
+    :return: Downloaded file, or None if it couldn't be exported
+    :rtype: fileio.AtomicFile
+    """
+    key = export_key(payload)
+    export, leader = self.exports.join(key)
+    if not leader:
+      return self.copy_export(export.result(), index, product_name, folder)
+
+    try:
+      url = self.export_animation(character_id, payload)
+      file = self.download_animation(url, index, product_name, folder)
+      if file is not None:
+        self.exports.complete(key, character_id, file)
+      return file
+    finally:
+      self.exports.abandon(key)
+
+  def should_fsync(self):
+    """Tell whether a file must be flushed to disk before it's renamed.
+
+    That's what the "always" policy does (see FSYNC_POLICY). With "end",
+    files are flushed by the writer stage once the run is over, so only
+    the ones written without it are flushed right away.
+
+    :rtype: bool
+    """
+    if FSYNC_POLICY == "end":
+      return self.writer is None
+    return FSYNC_POLICY == "always"
+
+  def add_to_writer(self, file):
+    """Let the writer stage know about a file written without it (e.g:
+    copied), so that it's flushed with the others.
+
+    :param file: Written file
+    :type file: fileio.AtomicFile
+    """
+    if self.writer is not None:
+      self.writer.add(file.path)
+
+  def copy_export(self, artifact, index, product_name, folder=None):
+    """Copy the file of an export that's already been downloaded.
+
+    :param artifact: File 'path', 'size' and 'sha256'
+    :type artifact: dict
+
+    :param index: Index used as a prefix of the file name
+    :type index: int
+
+    :param product_name: Animation name
+    :type product_name: str
+
+    :param folder: Output folder path (defaults to the one set by the user)
+    :type folder: str
+
+    :return: Copied file
+    :rtype: fileio.AtomicFile
+    """
+    if folder is None:
+      folder = self.path
+
+    if folder:
+      os.makedirs(folder, exist_ok=True)
+
+    with self.tracer.span("copy", index=index) as span:
+      file = copy_file(artifact["path"],
+        self.get_output_path(index, product_name, folder), artifact["size"],
+        fsync=self.should_fsync())
+      self.add_to_writer(file)
+      span["bytes"] = file.size
+      return file
+
+  def sanitize_filename(self, filename):
+    # Define a regular expression pattern to match disallowed characters
+    # This pattern includes common problematic characters
+    #pattern = r'[<>:"/\\|?*\n]' # extra possible chars: ',.-
+    pattern = "[^a-zA-Z0-9_ ]" # even more strict, no symbols
+
+    # Remove the problematic characters
+    sanitized_filename = re.sub(pattern, '', filename)
+
+    # Replace multiple spaces with a single space and remove start-ending spaces
+    sanitized_filename = re.sub(r'\s+', ' ', sanitized_filename).strip()
+
+    return sanitized_filename
+
+  def get_output_path(self, index, product_name, folder=None):
+    """Get the path of the file an animation will be saved to.
+
+    Files are saved as '{index}_{name}' so that animations with the same
+    name don't overwrite each other. If no output folder has been set by
+    the user, files are saved to the cwd (i.e: the folder where this Python
+    script is being executed).
+
+    :param index: Index used as a prefix of the file name
+    :type index: int
+
+    :param product_name: Animation name
+    :type product_name: str
+
+    :param folder: Output folder path (defaults to the one set by the user)
+    :type folder: str
+
+    :return: Output file path
+    :rtype: str
+    """
+    if folder is None:
+      folder = self.path
+
+    file_name = f"{index}_{self.sanitize_filename(product_name)}.{FILE_EXTENSION}"
+
+    if folder:
+      return os.path.join(folder, file_name)
+    return file_name
+
+  def download_animation(self, url, index, product_name=None, folder=None):
+    """Download the animation to disk.
+
+    :param url: URL to download the animation
+    :type url: str
+
+    :param index: Index used as a prefix of the file name
+    :type index: int
+
+    :param product_name: Animation name (defaults to the last one built)
+    :type product_name: str
+
+    :param folder: Output folder path (defaults to the one set by the user)
+    :type folder: str
+
+    :return: Downloaded file (with its 'path', 'size' and 'sha256')
+    :rtype: fileio.AtomicFile
+    """
+    # Ensure this code is only run if a URL has been retrieved.
+    if url:
+      if product_name is None:
+        product_name = self.product_name
+
+      return self.download_file(
+        url, self.get_output_path(index, product_name, folder), index)
+
+  def download_file(self, url, path, index=None):
+    """Download a file to disk.
+
+    :param url: URL of the file
+    :type url: str
+
+    :param path: Path the file is saved to
+    :type path: str
+
+    :param index: Index of the animation (only used in traces)
+    :type index: int
+
+    :return: Downloaded file (with its 'path', 'size' and 'sha256')
+    :rtype: fileio.AtomicFile
+    """
+    return self.start_download(url, path, index).result()
+
+  def start_download(self, url, path, index=None):
+    """Download a file, leaving it to the writer stage if there's one.
+
+    :param url: URL of the file
+    :type url: str
+
+    :param path: Path the file is saved to
+    :type path: str
+
+    :param index: Index of the animation (only used in traces)
+    :type index: int
+
+    :return: Future of the downloaded file, done once it's been written
+    :rtype: concurrent.futures.Future
+    """
+    # Check if the output folder exists on disk. If it doesn't, create it.
+    folder = os.path.dirname(path)
+    if folder:
+      os.makedirs(folder, exist_ok=True)
+
+    # Without a writer stage (e.g: outside of the pipelines), the file is
+    # written as it's received.
+    writer = self.writer or OutputWriter(
+      self.tracer, fsync="always" if self.should_fsync() else "never")
+
+    start = time.monotonic()
+    fields = {"index": index}
+    received = None
+    try:
+      # Send a GET request to the download link. The response is streamed
+      # so that big files are never held in memory as a whole.
+      with self.make_request("GET", url, stream=True) as response:
+        response.raise_for_status()
+        chunks = response.iter_content(CHUNK_SIZE)
+        expected_size = get_expected_size(response.headers)
+
+        # Save the response into a new file called after the animation
+        # name. It's written to a temporary file first, and only renamed
+        # once its size has been checked, so a crash never leaves a
+        # truncated file.
+        received = writer.write(chunks, path, expected_size, index)
+        fields["bytes"] = received.size
+        return received.future
+    except BaseException as e:
+      fields["error"] = repr(e)
+      raise
+    finally:
+      # Writes done on this thread have their own "write" spans.
+      write_time = received.write_time if received is not None else 0
+      self.tracer.record("download", time.monotonic() - start - write_time, **fields)
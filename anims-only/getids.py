@@ -1,8 +1,11 @@
+import argparse
+import hashlib
 import json
 import os
 import requests
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 HEADERS = {
     "Accept": "application/json",
@@ -12,47 +15,272 @@ HEADERS = {
     "X-Requested-With": "XMLHttpRequest",
 }
 
+API_URL = "https://www.mixamo.com/api/v1"
+
+# Product types to scrape, and the file each of them is saved to.
+OUTPUT_FILES = {
+    "Motion": "mixamo_anims_new.json",
+    "MotionPack": "mixamo_animsPack_new.json",
+}
+
+# Catalogs shipped with the downloader, used as the starting point of the
+# first incremental refresh.
+CATALOG_FILES = {
+    "Motion": "mixamo_anims.json",
+    "MotionPack": "mixamo_animsPack.json",
+}
+
+# State kept between incremental refreshes, and the diff they write.
+STATE_FILE = "mixamo_catalog_state.json"
+DIFF_FILE = "mixamo_catalog_diff.json"
+
+# Number of pages fetched at the same time.
+WORKERS = 8
+
+# Stop once this many passes in a row haven't found any new product...
+STABLE_PASSES = 3
+# ...or after this many passes, whatever happens first.
+MAX_PASSES = 20
+
 session = requests.Session()
 
 def make_request(method, url, **kwargs):
     for _ in range(10):  # Retry 10 times
         try:
-            response = session.request(method, url, timeout=10, **kwargs)                
+            response = session.request(method, url, timeout=10, **kwargs)
             return response
         except (requests.exceptions.Timeout, requests.exceptions.RequestException) as e:
             time.sleep(1)
             continue
     raise Exception(f"Failed to complete request to {url} after 10 retries.")
 
-def get_animations_data():
+def get_page(product_type, page_num):
     params = {
       "limit": 96,
-      "page": 0,
-      "type": "Motion",
-      #"query": query,
+      "page": page_num,
+      "type": product_type,
     }
-    response = make_request("GET", "https://www.mixamo.com/api/v1/products", headers=HEADERS, params=params)
-    data = response.json()
+    response = make_request("GET", f"{API_URL}/products", headers=HEADERS, params=params)
+    return response.json()
+
+def get_products_data(product_type, pool, stable_passes=STABLE_PASSES, max_passes=MAX_PASSES):
+    data = get_page(product_type, 0)
     num_pages = data["pagination"]["num_pages"]
-    animations = []
-
-    print(f"numpages={num_pages}")
-
-    # for some reason, it seems not all animations are returned in a single pass.
-    # Therefore we run the query multiple times and then de-duplicate to ensure all animations are included.
-    runs = 20
-    for run in range(runs):
-        print(f'run={run+1}/{runs}')
-        for page_num in range(num_pages+1):
-            print(f"  page={page_num}")
-            params["page"] = page_num
-            response = make_request("GET", "https://www.mixamo.com/api/v1/products", headers=HEADERS, params=params)
-            data = response.json()
-            animations.extend(data["results"])
-        print(f"  total={len(animations)}")
-
-    anim_data = {animation["id"]: animation for animation in animations}
-    return anim_data
+
+    # Products are de-duplicated by ID as soon as they're received.
+    products = {product["id"]: product for product in data["results"]}
+
+    print(f"{product_type}: numpages={num_pages}")
+
+    # for some reason, it seems not all products are returned in a single pass.
+    # Therefore we run the query multiple times, until a few passes in a row
+    # don't find anything new, to ensure all products are included.
+    stable = 0
+    for run in range(max_passes):
+        found = len(products)
+
+        pages = pool.map(lambda page_num: get_page(product_type, page_num), range(num_pages+1))
+        for data in pages:
+            for product in data["results"]:
+                products.setdefault(product["id"], product)
+
+        new = len(products) - found
+        print(f"{product_type}: run={run+1} new={new} total={len(products)}")
+
+        stable = stable + 1 if new == 0 else 0
+        if stable >= stable_passes:
+            break
+
+    return products
+
+def get_catalogs(product_types=OUTPUT_FILES, workers=WORKERS, **kwargs):
+    with ThreadPoolExecutor(workers) as pool:
+        return {product_type: get_products_data(product_type, pool, **kwargs)
+                for product_type in product_types}
+
+def get_page_conditional(product_type, page_num, page_state):
+    # Send the validators of the last refresh, so that the API can answer
+    # with a 304 (and no body) if the page hasn't changed.
+    headers = dict(HEADERS)
+    if page_state.get("etag"):
+        headers["If-None-Match"] = page_state["etag"]
+    if page_state.get("last_modified"):
+        headers["If-Modified-Since"] = page_state["last_modified"]
+
+    params = {
+      "limit": 96,
+      "page": page_num,
+      "type": product_type,
+    }
+    response = make_request("GET", f"{API_URL}/products", headers=headers, params=params)
+
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    if response.status_code == 304:
+        return None, validators
+    return response.json(), validators
+
+def get_catalog_key(product_type):
+    # Motions are named after their description, because some of them have
+    # the same name. Packs are named after their name.
+    return "description" if product_type == "Motion" else "name"
+
+def get_fingerprint(products):
+    content = json.dumps(sorted([p["id"], p.get("name"), p.get("description")] for p in products))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def load_previous_products(product_type, state):
+    # Use the products of the last refresh or, if there's none, the catalog
+    # shipped with the downloader.
+    if product_type in state:
+        return state[product_type]["products"]
+
+    key = get_catalog_key(product_type)
+    if not os.path.exists(CATALOG_FILES[product_type]):
+        return {}
+    with open(CATALOG_FILES[product_type], 'r') as json_file:
+        return {id: {"id": id, key: name} for id, name in json.load(json_file).items()}
+
+def refresh_products_data(product_type, state, pool, workers=WORKERS,
+                          stable_passes=STABLE_PASSES, max_passes=MAX_PASSES):
+    previous = load_previous_products(product_type, state)
+    pages_state = state.get(product_type, {}).get("pages", {})
+    key = get_catalog_key(product_type)
+
+    def fetch(page_num):
+        page_state = pages_state.get(str(page_num), {})
+        data, validators = get_page_conditional(product_type, page_num, page_state)
+
+        # A 304 means the page is the same as last time.
+        if data is None:
+            results = [previous[id] for id in page_state["ids"] if id in previous]
+            return page_num, results, validators, None
+
+        return page_num, data["results"], validators, data["pagination"]["num_pages"]
+
+    def is_unchanged(results):
+        # Products are listed newest first, so once a page only has products
+        # known by the same name, the following pages haven't changed either.
+        return bool(results) and all(
+            product["id"] in previous and previous[product["id"]].get(key) == product.get(key)
+            for product in results)
+
+    # The first page tells how many there are, and is the first one read.
+    first = fetch(0)
+    num_pages = first[3]
+    if num_pages is None:
+        num_pages = state[product_type]["num_pages"]
+
+    print(f"{product_type}: numpages={num_pages}")
+
+    products = {}
+    new_pages_state = {}
+    # Removed products can only be found once every page has been read.
+    complete = False
+
+    stable = 0
+    for run in range(max_passes):
+        found = len(products)
+        changed = 0
+        read = 0
+        stopped = False
+
+        # Pages are read in order, 'workers' at a time, until one of them
+        # hasn't changed.
+        for start in range(0, num_pages+1, workers):
+            page_nums = range(start, min(start+workers, num_pages+1))
+            if run == 0 and start == 0:
+                pages = [first, *pool.map(fetch, page_nums[1:])]
+            else:
+                pages = pool.map(fetch, page_nums)
+
+            for page_num, results, validators, _ in pages:
+                read += 1
+                fingerprint = get_fingerprint(results)
+                if pages_state.get(str(page_num), {}).get("fingerprint") != fingerprint:
+                    changed += 1
+
+                new_pages_state[str(page_num)] = {
+                    "fingerprint": fingerprint,
+                    "ids": [product["id"] for product in results],
+                    **validators,
+                }
+                for product in results:
+                    products.setdefault(product["id"], product)
+
+                stopped = stopped or is_unchanged(results)
+
+            if stopped:
+                break
+
+        complete = complete or not stopped
+        new = len(products) - found
+        print(f"{product_type}: run={run+1} pages={read} changed_pages={changed} "
+              f"new={new} total={len(products)}")
+
+        stable = stable + 1 if new == 0 else 0
+        if stable >= stable_passes:
+            break
+
+    # The pages that weren't read still have the products they had.
+    if not complete:
+        for id, product in previous.items():
+            products.setdefault(id, product)
+        new_pages_state = {
+            **{page: page_state for page, page_state in pages_state.items()
+               if int(page) <= num_pages},
+            **new_pages_state}
+
+    state[product_type] = {
+        "num_pages": num_pages,
+        "pages": new_pages_state,
+        "products": products,
+    }
+
+    return get_diff(previous, products, product_type), products
+
+def get_diff(previous, products, product_type):
+    key = get_catalog_key(product_type)
+
+    def label(product):
+        return product.get(key)
+
+    added = {id: label(p) for id, p in products.items() if id not in previous}
+    removed = {id: label(p) for id, p in previous.items() if id not in products}
+    renamed = {
+        id: {"old": label(previous[id]), "new": label(p)}
+        for id, p in products.items()
+        if id in previous and label(previous[id]) != label(p)}
+
+    return {"added": added, "removed": removed, "renamed": renamed}
+
+def refresh_catalogs(product_types=OUTPUT_FILES, workers=WORKERS, **kwargs):
+    state = {}
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, 'r') as json_file:
+            state = json.load(json_file)
+
+    diffs, catalogs = {}, {}
+    with ThreadPoolExecutor(workers) as pool:
+        for product_type in product_types:
+            diffs[product_type], catalogs[product_type] = refresh_products_data(
+                product_type, state, pool, workers, **kwargs)
+
+    with open(STATE_FILE, 'w') as json_file:
+        json.dump(state, json_file)
+
+    with open(DIFF_FILE, 'w') as json_file:
+        json.dump(diffs, json_file, indent=4)
+
+    return diffs, catalogs
+
+def save_catalog(products, product_type, file_path):
+    key = get_catalog_key(product_type)
+    anim_ans = {product['id']: product[key] for product in products.values()}
+    with open(file_path, 'w') as json_file:
+        json.dump(anim_ans, json_file, indent=4)  # `indent=4` for pretty printing
 
 def make_table(animations):
     with open('animations_table.md', 'w') as file:
@@ -71,11 +299,29 @@ def make_table(animations):
             file.write(f"| {animation['id']} | {animation['name']} | {animation['description']} | {media_id} [PNG]({animation['thumbnail']}) [GIF]({animation['thumbnail_animated']}) |\n")
 
 
-animations = get_animations_data()
-print(f"found {len(animations)} unique animations")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape every animation and pack from Mixamo.")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--stable-passes", type=int, default=STABLE_PASSES)
+    parser.add_argument("--max-passes", type=int, default=MAX_PASSES)
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"only look for changes since the last refresh and write them to {DIFF_FILE}")
+    args = parser.parse_args()
+
+    if args.incremental:
+        diffs, catalogs = refresh_catalogs(workers=args.workers,
+                                           stable_passes=args.stable_passes,
+                                           max_passes=args.max_passes)
+        for product_type, diff in diffs.items():
+            print(f"{product_type}: added={len(diff['added'])} removed={len(diff['removed'])} "
+                  f"renamed={len(diff['renamed'])} (see {DIFF_FILE})")
+    else:
+        catalogs = get_catalogs(workers=args.workers,
+                                stable_passes=args.stable_passes,
+                                max_passes=args.max_passes)
 
-anim_ans = {anim['id']: anim['description'] for id, anim in animations.items()}
-with open("mixamo_anims_new.json", 'w') as json_file:
-    json.dump(anim_ans, json_file, indent=4)  # `indent=4` for pretty printing
+    for product_type, products in catalogs.items():
+        print(f"found {len(products)} unique {product_type} products")
+        save_catalog(products, product_type, OUTPUT_FILES[product_type])
 
-make_table(animations)
\ No newline at end of file
+    make_table(catalogs["Motion"])
@@ -0,0 +1,166 @@
+# Stdlib modules
+import json
+import os
+import threading
+import time
+
+
+# Name of the journal file, saved in the output folder.
+JOURNAL_FILE = ".mixamo_journal.jsonl"
+
+# Statuses an animation can have in the journal.
+STARTED = "started"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class RunJournal:
+    """Append-only record of what has been downloaded to an output folder.
+
+    Every line of the journal is a JSON object with the animation ID, its
+    status and, once it's been downloaded, the file it was saved to, its
+    size and its SHA-256 checksum. The last line of an animation wins.
+
+    This allows resuming a run without asking Mixamo anything about the
+    animations that are already on disk, and telling them apart from the
+    ones that failed or were interrupted halfway through.
+    """
+    def __init__(self, folder):
+        """Open the journal of an output folder, reading its current content.
+
+        :param folder: Output folder path ("" for the cwd)
+        :type folder: str
+        """
+        self.file_path = os.path.join(folder, JOURNAL_FILE)
+        self.lock = threading.Lock()
+        self.entries = {}
+
+        if os.path.exists(self.file_path):
+            with open(self.file_path, "r") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A crash may leave the last line half written.
+                        continue
+                    self.entries[entry["anim_id"]] = entry
+
+    def get(self, anim_id):
+        """Get the last journal entry of an animation.
+
+        :param anim_id: Animation ID
+        :type anim_id: str
+
+        :return: Journal entry, or None if the animation isn't in the journal
+        :rtype: dict
+        """
+        with self.lock:
+            return self.entries.get(anim_id)
+
+    def is_complete(self, anim_id):
+        """Tell whether an animation has been fully downloaded.
+
+        The file must still be on disk and have the size it was saved with.
+
+        :param anim_id: Animation ID
+        :type anim_id: str
+
+        :return: True if the animation doesn't need to be downloaded again
+        :rtype: bool
+        """
+        entry = self.get(anim_id)
+        if entry is None or entry["status"] != COMPLETED:
+            return False
+
+        try:
+            return os.path.getsize(entry["file"]) == entry["size"]
+        except OSError:
+            return False
+
+    def adopt(self, anim_id, path, **fields):
+        """Record an animation as complete if its file is already on disk.
+
+        This is for files downloaded before the folder had a journal (e.g:
+        by an older version), which are only known by their path. Any file
+        that isn't empty is trusted.
+
+        :param anim_id: Animation ID
+        :type anim_id: str
+
+        :param path: Path the animation would have been saved to
+        :type path: str
+
+        :param fields: Extra fields (index...)
+        :type fields: dict
+
+        :return: True if the animation has been recorded as complete
+        :rtype: bool
+        """
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return False
+        if not size:
+            return False
+
+        self.record(anim_id, COMPLETED, file=path, size=size, **fields)
+        return True
+
+    def record(self, anim_id, status, **fields):
+        """Append an entry to the journal.
+
+        :param anim_id: Animation ID
+        :type anim_id: str
+
+        :param status: STARTED, COMPLETED or FAILED
+        :type status: str
+
+        :param fields: Extra fields (index, file, size, sha256...)
+        :type fields: dict
+        """
+        entry = {"anim_id": anim_id, "status": status, "time": time.time(), **fields}
+
+        with self.lock:
+            self.entries[anim_id] = entry
+
+            folder = os.path.dirname(self.file_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+
+            with open(self.file_path, "a") as file:
+                file.write(json.dumps(entry) + "\n")
+
+    def resume_order(self, items, get_path=None):
+        """Sort items for a resumed run, leaving out the completed ones.
+
+        Animations that failed or were interrupted go first, followed by
+        the ones that haven't been tried yet, in their original order. The
+        ones the journal doesn't know about, but whose file is already on
+        disk, are recorded as complete (see 'adopt').
+
+        :param items: Items with an 'anim_id' key
+        :type items: list
+
+        :param get_path: Callable getting the path an item would have been
+          saved to (None to only trust the journal)
+        :type get_path: callable
+
+        :return: Items to process, and items that are already complete
+        :rtype: tuple
+        """
+        retry, pending, complete = [], [], []
+
+        for item in items:
+            entry = self.get(item["anim_id"])
+
+            if self.is_complete(item["anim_id"]):
+                complete.append(item)
+            elif entry is not None:
+                retry.append(item)
+            elif get_path is not None and self.adopt(
+                    item["anim_id"], get_path(item), index=item.get("index")):
+                complete.append(item)
+            else:
+                pending.append(item)
+
+        return retry + pending, complete
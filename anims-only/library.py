@@ -0,0 +1,259 @@
+# Stdlib modules
+import collections
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+
+# Local modules
+from fileio import CHUNK_SIZE, check_file, link_file, write_stream
+
+
+# Index of the motions downloaded to an output folder, kept in the folder
+# itself so that both downloaders share it when they write to the same one.
+LIBRARY_FILE = ".mixamo_library.sqlite"
+
+# Bump this whenever the layout of the index changes (it's then rebuilt as
+# motions are downloaded again).
+LIBRARY_VERSION = 2
+
+
+# File of a motion got from the library.
+LibraryFile = collections.namedtuple("LibraryFile", ["path", "size", "sha256"])
+
+
+class ContentIndex:
+    """Index of the motions already downloaded to a library folder.
+
+    Running both downloaders into the same library used to export (and
+    store) every motion of a pack twice. Now they share an index of what
+    they've downloaded:
+
+    - The packs downloader records the motions every pack archive has,
+      with the size and checksum of their files.
+    - The anims-only downloader records the file of every animation.
+
+    Before exporting an animation, the anims-only downloader looks it up
+    ('obtain'): a file the library already has is hard linked (or copied,
+    if it can't be), and a motion only found in a pack is extracted from
+    its archive. Either way, it's not exported again.
+
+    Motions are identified by character and by the key of their
+    'gms_hash' (see 'batching.get_gms_hash_key'): packs don't list the
+    product ID of their motions, and a motion's variants (e.g: mirrored)
+    share its 'model-id'. Entries whose file has been removed or changed
+    since are dropped when found. Files are only hashed again if they've
+    been modified since they were recorded. The index can be shared by
+    several threads.
+    """
+    def __init__(self, file_path):
+        """Open (or create) the index database.
+
+        :param file_path: Path of the SQLite database
+        :type file_path: str
+        """
+        folder = os.path.dirname(file_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.linked = 0
+        self.extracted = 0
+        self.kept = 0
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(file_path, check_same_thread=False)
+
+        with self.db:
+            # Motions recorded by older versions are forgotten.
+            version = self.db.execute("PRAGMA user_version").fetchone()[0]
+            if version != LIBRARY_VERSION:
+                self.db.execute("DROP TABLE IF EXISTS motions")
+                self.db.execute(f"PRAGMA user_version = {LIBRARY_VERSION}")
+
+            # Files of single motions have an empty 'member', and members
+            # have the modification time of their archive.
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS motions (
+                    character_id TEXT,
+                    motion_key TEXT,
+                    path TEXT,
+                    member TEXT,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    sha256 TEXT,
+                    created REAL,
+                    PRIMARY KEY (character_id, motion_key, path, member))""")
+
+    def add_file(self, character_id, key, file):
+        """Record the file of a motion.
+
+        :param character_id: Character ID
+        :type character_id: str
+
+        :param key: Key of the motion (see 'batching.get_gms_hash_key')
+        :type key: str
+
+        :param file: Downloaded file (with its 'path', 'size' and 'sha256')
+        :type file: fileio.AtomicFile
+        """
+        path = os.path.abspath(file.path)
+        self._put([(character_id, key, path, "", file.size,
+                    os.stat(path).st_mtime_ns, file.sha256, time.time())])
+
+    def add_archive(self, character_id, path, motions):
+        """Record the motions of a pack archive.
+
+        :param character_id: Character ID
+        :type character_id: str
+
+        :param path: Archive path
+        :type path: str
+
+        :param motions: Keys of the motions, by name (files are named after
+          their motion in the archive, whatever their extension)
+        :type motions: dict
+
+        :return: Number of motions recorded
+        :rtype: int
+        """
+        path = os.path.abspath(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        rows = []
+
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                name = os.path.splitext(os.path.basename(info.filename))[0]
+                if info.is_dir() or name not in motions:
+                    continue
+
+                sha256 = hashlib.sha256()
+                with archive.open(info) as member:
+                    for chunk in iter(lambda: member.read(CHUNK_SIZE), b""):
+                        sha256.update(chunk)
+
+                rows.append((character_id, motions[name], path, info.filename,
+                             info.file_size, mtime_ns, sha256.hexdigest(), time.time()))
+
+        self._put(rows)
+        return len(rows)
+
+    def find(self, character_id, key):
+        """Get where a motion has been downloaded to.
+
+        :param character_id: Character ID
+        :type character_id: str
+
+        :param key: Key of the motion
+        :type key: str
+
+        :return: (path, member, size, mtime_ns, sha256) of every file having
+          it, single files first
+        :rtype: list
+        """
+        with self.lock:
+            return self.db.execute(
+                "SELECT path, member, size, mtime_ns, sha256 FROM motions "
+                "WHERE character_id = ? AND motion_key = ? ORDER BY member, created",
+                (character_id, key)).fetchall()
+
+    def obtain(self, character_id, key, path, fsync=True):
+        """Save a motion from the library to a file, without exporting it.
+
+        :param character_id: Character ID
+        :type character_id: str
+
+        :param key: Key of the motion
+        :type key: str
+
+        :param path: Path of the file
+        :type path: str
+
+        :param fsync: Whether to flush a copied or extracted file to disk
+          before renaming it
+        :type fsync: bool
+
+        :return: Saved file, or None if the library doesn't have it
+        :rtype: LibraryFile
+        """
+        path = os.path.abspath(path)
+
+        for entry in self.find(character_id, key):
+            try:
+                file = self._obtain(entry, path, fsync)
+            except (OSError, KeyError, zipfile.BadZipFile) as e:
+                print(f"WARNING: Couldnt get {entry[0]} from the library: {e!r}")
+                file = None
+
+            if file is None:
+                # The file has been deleted or modified since it was indexed.
+                self.remove(character_id, key, entry[0], entry[1])
+                continue
+
+            if file.path != entry[0] or entry[1]:
+                self.add_file(character_id, key, file)
+            return file
+
+        return None
+
+    def remove(self, character_id, key, path, member=""):
+        """Forget a file of a motion."""
+        with self.lock, self.db:
+            self.db.execute(
+                "DELETE FROM motions WHERE character_id = ? AND motion_key = ? "
+                "AND path = ? AND member = ?", (character_id, key, path, member))
+
+    def stats(self):
+        """Get how many motions have been got from the library.
+
+        :return: Number of motions hard linked (or copied), extracted from
+          a pack, and already where they had to be
+        :rtype: dict
+        """
+        with self.lock:
+            return {"linked": self.linked, "extracted": self.extracted, "kept": self.kept}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def _obtain(self, entry, path, fsync):
+        source, member, size, mtime_ns, sha256 = entry
+        if not os.path.isfile(source):
+            return None
+
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+
+        if not member:
+            if check_file(source, size, sha256, mtime_ns) is None:
+                return None
+
+            kept = os.path.exists(path) and os.path.samefile(source, path)
+            if not kept:
+                link_file(source, path, fsync)
+
+            with self.lock:
+                if kept:
+                    self.kept += 1
+                else:
+                    self.linked += 1
+            return LibraryFile(path, size, sha256)
+
+        with zipfile.ZipFile(source) as archive, archive.open(member) as stream:
+            file = write_stream(
+                path, iter(lambda: stream.read(CHUNK_SIZE), b""), size, fsync)
+
+        if file.sha256 != sha256:
+            os.remove(path)
+            return None
+
+        with self.lock:
+            self.extracted += 1
+        return LibraryFile(file.path, file.size, file.sha256)
+
+    def _put(self, rows):
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO motions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
@@ -0,0 +1,69 @@
+# Stdlib modules
+from collections import defaultdict
+
+
+# Cost of every motion of a pack, relative to the cost of an export
+# (sending it, polling it and downloading it). Exporting a pack isn't
+# free: the bigger it is, the longer it takes, and its motions that
+# aren't wanted are downloaded for nothing.
+PACK_MOTION_COST = 0.1
+
+
+def plan_exports(wanted, packs, motion_cost=PACK_MOTION_COST):
+    """Choose the packs to export to get a set of motions with few exports.
+
+    This is a weighted set cover, solved with the greedy algorithm (which
+    is at most ln(n) times worse than the best plan): the pack with the
+    lowest cost per wanted motion is picked until no pack is cheaper than
+    exporting its motions one by one. Every motion left is exported on its
+    own.
+
+    Motions are matched by a key both the motions and the packs know them
+    by (their 'gms_hash', see 'batching.get_gms_hash_key'), since the
+    motions of a pack aren't listed with their product ID.
+
+    :param wanted: Motion IDs mapped to their key
+    :type wanted: dict
+
+    :param packs: Pack IDs mapped to the keys of their motions
+    :type packs: dict
+
+    :param motion_cost: Cost of every motion of a pack (see PACK_MOTION_COST)
+    :type motion_cost: float
+
+    :return: List of (pack ID, motion IDs) to export as packs, and the
+      motion IDs to export on their own
+    :rtype: tuple
+    """
+    motions = defaultdict(list)
+    for motion_id, key in wanted.items():
+        motions[key].append(motion_id)
+
+    uncovered = set(motions)
+    plan = []
+
+    while uncovered:
+        best = None
+
+        for pack_id, keys in packs.items():
+            covered = uncovered.intersection(keys)
+            cost = 1 + motion_cost * len(keys)
+
+            # Only worth it if cheaper than one export per covered motion.
+            if cost >= len(covered):
+                continue
+
+            ratio = cost / len(covered)
+            if best is None or ratio < best[0]:
+                best = (ratio, pack_id, covered)
+
+        if best is None:
+            break
+
+        _, pack_id, covered = best
+        uncovered -= covered
+        plan.append((pack_id, sorted(
+            motion_id for key in covered for motion_id in motions[key])))
+
+    singles = sorted(motion_id for key in uncovered for motion_id in motions[key])
+    return plan, singles
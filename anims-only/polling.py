@@ -0,0 +1,246 @@
+# Stdlib modules
+import json
+import os
+import random
+import statistics
+import threading
+import time
+
+
+# Delay before the first status check when there's no history yet.
+DEFAULT_FIRST_DELAY = 0.5
+
+# Delays never go below or above these values (in seconds).
+MIN_DELAY = 0.2
+MAX_DELAY = 5
+
+# Every delay is this many times longer than the previous one.
+BACKOFF = 1.5
+
+# Random variation applied to every delay (0.2 means +/- 20%).
+JITTER = 0.2
+
+# Give up on an export after this many seconds.
+EXPORT_DEADLINE = 120
+
+# The first check is done once this percentage of the previous exports
+# were already finished.
+FIRST_POLL_PERCENTILE = 25
+
+# Number of export latencies kept on disk to learn from.
+HISTORY_SIZE = 200
+
+# Number of run summaries kept on disk.
+RUNS_SIZE = 50
+
+
+class AdaptivePoller:
+    """Decide how long to wait between checks of the export status.
+
+    Instead of a fixed delay and a fixed number of checks, the first check
+    is done after a delay learned from the previous exports, then delays
+    grow exponentially (with some jitter, so that we don't hit the server
+    at regular intervals) until the deadline is reached.
+
+    Usage:
+
+        start = time.monotonic()
+        for polls, delay in enumerate(poller.delays(start), 1):
+            time.sleep(delay)
+            status = check_status()
+            if status in ("completed", "failed"):
+                break
+        poller.record(time.monotonic() - start, polls, status, delay)
+    """
+    def __init__(self, history=None, runs=None, deadline=EXPORT_DEADLINE):
+        """Initialize the poller.
+
+        :param history: Latencies of previous exports (in seconds)
+        :type history: list
+
+        :param runs: Summaries of previous runs
+        :type runs: list
+
+        :param deadline: Seconds after which an export is given up
+        :type deadline: float
+        """
+        self.history = list(history or [])[-HISTORY_SIZE:]
+        self.runs = list(runs or [])[-RUNS_SIZE:]
+        self.deadline = deadline
+
+        # Latencies and polls observed during this run, and exports given
+        # up or failed.
+        self.latencies = []
+        self.polls = []
+        self.timeouts = 0
+        self.failures = 0
+
+        self.lock = threading.Lock()
+
+    def first_delay(self):
+        """Get the delay before the first status check.
+
+        :return: Delay in seconds
+        :rtype: float
+        """
+        with self.lock:
+            observed = self.history + self.latencies
+
+        if len(observed) < 5:
+            return DEFAULT_FIRST_DELAY
+
+        delay = percentile(observed, FIRST_POLL_PERCENTILE)
+        return min(max(delay, MIN_DELAY), MAX_DELAY)
+
+    def delays(self, start=None):
+        """Yield the delays to wait before every status check.
+
+        The deadline is measured on the clock, so the time spent checking
+        the status counts as well: no check is done after it.
+
+        :param start: Time the export was sent at (see 'time.monotonic'),
+          now if not set
+        :type start: float
+
+        :return: Delays in seconds
+        :rtype: generator
+        """
+        if start is None:
+            start = time.monotonic()
+        delay = self.first_delay()
+
+        while True:
+            left = self.deadline - (time.monotonic() - start)
+            if left <= 0:
+                return
+
+            jittered = delay * random.uniform(1 - JITTER, 1 + JITTER)
+            yield min(jittered, left)
+
+            delay = min(delay * BACKOFF, MAX_DELAY)
+
+    def record(self, latency, polls=0, status="completed", last_delay=0):
+        """Record how long an export took.
+
+        We only know that the export was completed at some point between
+        the last two status checks, so the middle point is the latency that
+        gets recorded. Otherwise the learned delays could never go down.
+
+        Exports that failed or were given up aren't learned from.
+
+        :param latency: Seconds between the export request and the last check
+        :type latency: float
+
+        :param polls: Number of status checks that were needed
+        :type polls: int
+
+        :param status: Last status reported: "completed", "failed", or
+          anything else if the export was given up
+        :type status: str
+
+        :param last_delay: Delay that was waited before the last check
+        :type last_delay: float
+        """
+        with self.lock:
+            self.polls.append(polls)
+            if status == "completed":
+                self.latencies.append(latency - last_delay / 2)
+            elif status == "failed":
+                self.failures += 1
+            else:
+                self.timeouts += 1
+
+    def stats(self):
+        """Get the statistics of the exports done during this run.
+
+        :return: Export latency statistics
+        :rtype: dict
+        """
+        with self.lock:
+            latencies = sorted(self.latencies)
+            polls = list(self.polls)
+            timeouts = self.timeouts
+            failures = self.failures
+
+        stats = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "exports": len(latencies),
+            "timeouts": timeouts,
+            "failures": failures,
+            "first_delay": round(self.first_delay(), 3),
+        }
+
+        if latencies:
+            stats.update({
+                "mean": round(statistics.mean(latencies), 3),
+                "p50": round(percentile(latencies, 50), 3),
+                "p95": round(percentile(latencies, 95), 3),
+                "max": round(latencies[-1], 3),
+                "polls_mean": round(statistics.mean(polls), 2),
+            })
+
+        return stats
+
+    @classmethod
+    def load(cls, file_path, **kwargs):
+        """Create a poller that learns from the latencies stored on disk.
+
+        :param file_path: Path of the JSON file with the stored latencies
+        :type file_path: str
+
+        :return: Poller
+        :rtype: AdaptivePoller
+        """
+        data = {}
+        if os.path.exists(file_path):
+            try:
+                with open(file_path, "r") as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                print(f"WARNING: Couldnt read export latencies from {file_path}")
+
+        return cls(data.get("latencies"), data.get("runs"), **kwargs)
+
+    def save(self, file_path):
+        """Store the latencies and a summary of this run on disk.
+
+        :param file_path: Path of the JSON file
+        :type file_path: str
+
+        :return: Summary of this run
+        :rtype: dict
+        """
+        stats = self.stats()
+
+        with self.lock:
+            latencies = (self.history + [round(l, 3) for l in self.latencies])
+            runs = self.runs + [stats]
+
+        data = {
+            "latencies": latencies[-HISTORY_SIZE:],
+            "runs": runs[-RUNS_SIZE:],
+        }
+
+        with open(file_path, "w") as file:
+            json.dump(data, file, indent=4)
+
+        return stats
+
+
+def percentile(values, percent):
+    """Get the value below which a given percentage of the values fall.
+
+    :param values: Values
+    :type values: list
+
+    :param percent: Percentage (0-100)
+    :type percent: float
+
+    :return: Percentile
+    :rtype: float
+    """
+    values = sorted(values)
+    index = (len(values) - 1) * percent / 100
+    lower = int(index)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (index - lower)
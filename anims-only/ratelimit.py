@@ -0,0 +1,438 @@
+# Stdlib modules
+import asyncio
+import collections
+import email.utils
+import random
+import threading
+import time
+
+
+# Requests per second sent to Mixamo, all endpoints included...
+RATE = 20.0
+# ...and how many of them can be sent at once after being idle.
+BURST = 40
+
+# Concurrency of every endpoint class: (initial, maximum). It grows by one
+# request per round trip while things go well, and is halved as soon as
+# Mixamo throttles us or fails.
+LIMITS = {
+    "products": (8, 64),
+    "export": (2, 8),
+    "monitor": (4, 16),
+    "download": (4, 32),
+    "other": (2, 8),
+}
+
+# Concurrency is halved at most once in this many seconds, so that a burst
+# of errors caused by the same overload doesn't bring it down to 1.
+DECREASE_INTERVAL = 1.0
+
+# A request is retried this many times before giving up.
+MAX_RETRIES = 10
+
+# Delay before retrying a request without a 'Retry-After' header. It's
+# doubled on every attempt, up to MAX_BACKOFF (in seconds).
+BACKOFF = 0.5
+MAX_BACKOFF = 30
+
+# A request failing on its own (no 'Retry-After' header) is given up once
+# it's spent this many seconds backing off, even if it has attempts left:
+# offline, MAX_RETRIES backoffs would add up to about two minutes. Time
+# spent sending the attempts (e.g: timing out) isn't counted.
+MAX_RETRY_TIME = 10
+
+# Statuses worth retrying: throttling and server errors.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# The current rate is measured over this many seconds.
+RATE_WINDOW = 10
+
+# How often async requests check whether they can be sent (in seconds).
+ASYNC_POLL_INTERVAL = 0.01
+
+
+def classify(url):
+    """Get the endpoint class of a Mixamo URL.
+
+    :param url: Request URL
+    :type url: str
+
+    :return: One of the keys of LIMITS
+    :rtype: str
+    """
+    path = url.split("?")[0]
+
+    if "/animations/export" in path:
+        return "export"
+    if path.endswith("/monitor"):
+        return "monitor"
+    if "/products" in path:
+        return "products"
+    if "/api/" not in path:
+        # Exported files are served by a CDN, outside of the API.
+        return "download"
+    return "other"
+
+
+def get_retry_after(headers):
+    """Get the delay asked for by a 'Retry-After' header.
+
+    :param headers: Response headers
+    :type headers: dict
+
+    :return: Delay in seconds, or None if there's no valid header
+    :rtype: float
+    """
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    # It can also be an HTTP date.
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - time.time(), 0)
+
+
+def get_retry_delay(attempt, headers=None):
+    """Get how long to wait before retrying a request.
+
+    :param attempt: Number of the failed attempt (starting at 0)
+    :type attempt: int
+
+    :param headers: Headers of the failed response, if any
+    :type headers: dict
+
+    :return: Delay in seconds
+    :rtype: float
+    """
+    retry_after = get_retry_after(headers)
+    if retry_after is not None:
+        return retry_after
+
+    # Full jitter, so that the retries of parallel requests are spread out.
+    return random.uniform(0.5, 1) * min(BACKOFF * 2 ** attempt, MAX_BACKOFF)
+
+
+def get_retry_wait(attempt, waited, headers=None):
+    """Get how long to wait before retrying a request, unless it's backed
+    off for too long already (see MAX_RETRY_TIME).
+
+    :param attempt: Number of the failed attempt (starting at 0)
+    :type attempt: int
+
+    :param waited: Seconds already spent waiting to retry the request
+    :type waited: float
+
+    :param headers: Headers of the failed response, if any
+    :type headers: dict
+
+    :return: Delay in seconds, or None if the request should be given up
+    :rtype: float
+    """
+    delay = get_retry_delay(attempt, headers)
+    # Mixamo asking to wait is honoured, only our own backoff is limited.
+    if get_retry_after(headers) is None and waited + delay > MAX_RETRY_TIME:
+        return None
+    return delay
+
+
+class TokenBucket:
+    """Thread safe token bucket.
+
+    The bucket may go into debt: a caller takes a token even if there's
+    none left, and is told how long to wait for it to be refilled. This
+    keeps callers in order without a queue.
+    """
+    def __init__(self, rate=RATE, burst=BURST):
+        """Initialize the bucket.
+
+        :param rate: Tokens added per second
+        :type rate: float
+
+        :param burst: Maximum number of tokens
+        :type burst: int
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take a token.
+
+        :return: Seconds to wait before using it
+        :rtype: float
+        """
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            return max(-self.tokens / self.rate, 0)
+
+    def pause(self, delay):
+        """Hand out no token for some time.
+
+        :param delay: Seconds to wait
+        :type delay: float
+        """
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, -delay * self.rate)
+
+
+class AdaptiveLimit:
+    """Concurrency limit adjusted with AIMD.
+
+    Every successful request adds 1/limit to the limit (about one more
+    request per round trip), and throttled or failed requests halve it.
+    """
+    def __init__(self, initial, maximum, minimum=1):
+        """Initialize the limit.
+
+        :param initial: Starting number of concurrent requests
+        :type initial: int
+
+        :param maximum: Maximum number of concurrent requests
+        :type maximum: int
+
+        :param minimum: Minimum number of concurrent requests
+        :type minimum: int
+        """
+        self.limit = float(initial)
+        self.maximum = maximum
+        self.minimum = minimum
+        self.in_flight = 0
+        self.waiting = 0
+        self.last_decrease = 0
+        self.condition = threading.Condition()
+
+    def try_acquire(self):
+        """Take a slot if there's one free.
+
+        :return: True if the slot was taken
+        :rtype: bool
+        """
+        with self.condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        """Take a slot, waiting for one to be free."""
+        with self.condition:
+            self.waiting += 1
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.waiting -= 1
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        """Free a slot and adjust the limit.
+
+        :param throttled: True if the request was throttled or failed
+        :type throttled: bool
+        """
+        with self.condition:
+            self.in_flight -= 1
+
+            now = time.monotonic()
+            if not throttled:
+                self.limit = min(self.limit + 1 / self.limit, self.maximum)
+            elif now - self.last_decrease >= DECREASE_INTERVAL:
+                self.limit = max(self.limit / 2, self.minimum)
+                self.last_decrease = now
+
+            self.condition.notify_all()
+
+
+class RateLimiter:
+    """Rate and concurrency limits shared by every request sent to Mixamo.
+
+    A request first waits for a slot of its endpoint class, then for a
+    token of the global bucket. When Mixamo answers with a 429, the whole
+    bucket is paused for as long as its 'Retry-After' header says.
+
+    Usage:
+
+        limiter.acquire("products")
+        response = session.get(url)
+        limiter.release("products", response.status_code, response.headers)
+
+    Streamed responses keep their slot until their body has been read
+    (see 'release_on_close').
+    """
+    def __init__(self, rate=RATE, burst=BURST, limits=LIMITS):
+        """Initialize the limiter.
+
+        :param rate: Requests per second, all endpoints included
+        :type rate: float
+
+        :param burst: Requests that can be sent at once after being idle
+        :type burst: int
+
+        :param limits: Endpoint classes mapped to (initial, maximum)
+          concurrency
+        :type limits: dict
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.limits = {
+            endpoint: AdaptiveLimit(initial, maximum)
+            for endpoint, (initial, maximum) in limits.items()}
+
+        self.lock = threading.Lock()
+        self.waiting_tokens = 0
+        self.sent = collections.deque()
+        self.counters = {"requests": 0, "throttled": 0, "errors": 0}
+
+    def acquire(self, endpoint):
+        """Wait until a request can be sent.
+
+        :param endpoint: Endpoint class (see 'classify')
+        :type endpoint: str
+        """
+        self.limits[endpoint].acquire()
+        self._wait(time.sleep)
+
+    async def acquire_async(self, endpoint):
+        """Coroutine equivalent of acquire."""
+        limit = self.limits[endpoint]
+
+        if not limit.try_acquire():
+            with limit.condition:
+                limit.waiting += 1
+            try:
+                while not limit.try_acquire():
+                    await asyncio.sleep(ASYNC_POLL_INTERVAL)
+            finally:
+                with limit.condition:
+                    limit.waiting -= 1
+
+        delay = self.bucket.reserve()
+        if delay:
+            with self.lock:
+                self.waiting_tokens += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                with self.lock:
+                    self.waiting_tokens -= 1
+
+    def _wait(self, sleep):
+        delay = self.bucket.reserve()
+        if not delay:
+            return
+
+        with self.lock:
+            self.waiting_tokens += 1
+        try:
+            sleep(delay)
+        finally:
+            with self.lock:
+                self.waiting_tokens -= 1
+
+    def release(self, endpoint, status=None, headers=None):
+        """Tell the limiter how a request went.
+
+        :param endpoint: Endpoint class (see 'classify')
+        :type endpoint: str
+
+        :param status: Response status, or None if no response was received
+        :type status: int
+
+        :param headers: Response headers
+        :type headers: dict
+        """
+        throttled = status is None or status in RETRY_STATUSES
+        self.limits[endpoint].release(throttled)
+
+        if status == 429:
+            retry_after = get_retry_after(headers)
+            if retry_after is not None:
+                self.bucket.pause(retry_after)
+
+        now = time.monotonic()
+        with self.lock:
+            self.counters["requests"] += 1
+            if status == 429:
+                self.counters["throttled"] += 1
+            elif throttled:
+                self.counters["errors"] += 1
+
+            self.sent.append(now)
+            while self.sent and self.sent[0] < now - RATE_WINDOW:
+                self.sent.popleft()
+
+    def release_on_close(self, response, endpoint):
+        """Release the slot of a streamed response once it's closed, i.e:
+        once its body has been read, rather than when its headers arrive.
+
+        :param response: Streamed response (requests.Response or
+          httpx.Response)
+
+        :param endpoint: Endpoint class (see 'classify')
+        :type endpoint: str
+        """
+        name = "aclose" if hasattr(response, "aclose") else "close"
+        close = getattr(response, name)
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.release(endpoint, response.status_code, response.headers)
+
+        if name == "aclose":
+            async def wrapper():
+                try:
+                    await close()
+                finally:
+                    release()
+        else:
+            def wrapper():
+                try:
+                    close()
+                finally:
+                    release()
+
+        setattr(response, name, wrapper)
+
+    def stats(self):
+        """Get the current state of the limiter.
+
+        :return: Current rate (requests per second over the last
+          RATE_WINDOW seconds), queue depth (requests waiting for a slot or
+          a token), counters, and the limit of every endpoint class
+        :rtype: dict
+        """
+        now = time.monotonic()
+        with self.lock:
+            recent = sum(1 for sent in self.sent if sent >= now - RATE_WINDOW)
+            stats = {
+                "rate": round(recent / RATE_WINDOW, 2),
+                "queue_depth": self.waiting_tokens,
+                **self.counters}
+
+        stats["endpoints"] = {}
+        for endpoint, limit in self.limits.items():
+            with limit.condition:
+                stats["queue_depth"] += limit.waiting
+                stats["endpoints"][endpoint] = {
+                    "limit": round(limit.limit, 2),
+                    "in_flight": limit.in_flight,
+                    "waiting": limit.waiting}
+
+        return stats
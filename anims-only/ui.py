@@ -5,9 +5,14 @@ import json
 from PySide2 import QtCore, QtGui, QtWebEngineWidgets, QtWidgets
 
 # Local modules
+import async_downloader
+from auth import CachedTokenProvider
+from downloader import AsyncMixamoDownloader
 from downloader import HEADERS
+from downloader import invalidate_characters
 from downloader import MixamoDownloader
-from webpage import CustomWebPage
+from downloader import load_characters
+from webpage import BrowserTokenProvider, CharacterChangeInterceptor, CustomWebPage
 
 
 class MixamoDownloaderUI(QtWidgets.QMainWindow):
@@ -47,6 +52,19 @@ class MixamoDownloaderUI(QtWidgets.QMainWindow):
         # method in this class in order to get its value.
         page.retrieved_token.connect(self.apply_token)
 
+        # If the token expires mid-download, a new one is read from the
+        # browser. Tokens are also cached on disk so that the command line
+        # tool can reuse them.
+        self.token_provider = BrowserTokenProvider(page, parent=self)
+        self.token_cache = CachedTokenProvider(self.token_provider)
+
+        # The primary character is only requested once, until another one
+        # is selected (or uploaded) in the browser. What's cached for the
+        # previous one is forgotten too, as it may have been re-uploaded.
+        self.character_interceptor = CharacterChangeInterceptor(
+            invalidate_characters, parent=self)
+        page.profile().setUrlRequestInterceptor(self.character_interceptor)
+
         # Create the central widget and its layout.
         central_widget = QtWidgets.QWidget()
 
@@ -77,22 +95,33 @@ class MixamoDownloaderUI(QtWidgets.QMainWindow):
         self.le_query = QtWidgets.QLineEdit()
         self.le_query.setEnabled(False)
 
+        self.rb_new = QtWidgets.QRadioButton("New animations")
+        self.rb_new.setToolTip(
+            "Animations added since the last 'getids.py --incremental' run")
+
         self.rb_tpose = QtWidgets.QRadioButton("T-Pose (with skin)")
 
         self.cb_retry = QtWidgets.QCheckBox("Retry failed downloads")
         self.cb_retry.setChecked(True)
 
+        # The asyncio backend can only be used if httpx is installed.
+        self.cb_async = QtWidgets.QCheckBox("Async backend")
+        self.cb_async.setEnabled(async_downloader.is_available())
+
         # The line edit is to be enabled only when using the query option.
         self.rb_query.toggled.connect(lambda: self.le_query.setEnabled(True))
         self.rb_all.toggled.connect(lambda: self.le_query.setEnabled(False))
+        self.rb_new.toggled.connect(lambda: self.le_query.setEnabled(False))
         self.rb_tpose.toggled.connect(lambda: self.le_query.setEnabled(False))
 
         # Add the radio buttons and line edit to the download options layout.
         anim_opt_lyt.addWidget(self.rb_all)
         anim_opt_lyt.addWidget(self.rb_query)
         anim_opt_lyt.addWidget(self.le_query)
+        anim_opt_lyt.addWidget(self.rb_new)
         anim_opt_lyt.addWidget(self.rb_tpose)
         anim_opt_lyt.addWidget(self.cb_retry)
+        anim_opt_lyt.addWidget(self.cb_async)
 
         # Add another horizontal layout to the footer.
         # This layout will contain the Output Folder group box.
@@ -125,6 +154,31 @@ class MixamoDownloaderUI(QtWidgets.QMainWindow):
         # Add the group box to its corresponding layout.
         output_dir_lyt.addWidget(gbox_output)
 
+        # Create a group box where users can choose a JSON file with the
+        # characters to download animations for (batch mode). If empty,
+        # the primary character is used.
+        gbox_chars = QtWidgets.QGroupBox("Characters (batch mode)")
+        gbox_chars.setMaximumHeight(70)
+
+        gbox_chars_lyt = QtWidgets.QHBoxLayout()
+        gbox_chars.setLayout(gbox_chars_lyt)
+
+        self.le_chars = QtWidgets.QLineEdit()
+        self.le_chars.setPlaceholderText(
+            "Primary character (or select a file such as mixamo_chars.json)")
+        tb_chars = QtWidgets.QToolButton()
+
+        icon = QtWidgets.QApplication.style().standardIcon(
+            QtWidgets.QStyle.SP_FileIcon)
+
+        tb_chars.setIcon(icon)
+        tb_chars.clicked.connect(self.set_characters_file)
+
+        gbox_chars_lyt.addWidget(self.le_chars)
+        gbox_chars_lyt.addWidget(tb_chars)
+
+        output_dir_lyt.addWidget(gbox_chars)
+
         # Create the button that will launch the download process.
         self.get_btn = QtWidgets.QPushButton('Start download')
         self.get_btn.clicked.connect(self.get_access_token)
@@ -183,6 +237,8 @@ class MixamoDownloaderUI(QtWidgets.QMainWindow):
         :type token: str
         """
         HEADERS["Authorization"] = f"Bearer {token}"
+        self.token_provider.token = token
+        self.token_cache.save(token)
         self.run_downloader()
 
     def run_downloader(self):
@@ -201,8 +257,21 @@ class MixamoDownloaderUI(QtWidgets.QMainWindow):
         path = self.le_path.text()
         is_retry = self.cb_retry.isChecked()
 
+        # Read the characters for batch mode, if a file has been set.
+        characters = None
+        if self.le_chars.text():
+            characters = load_characters(self.le_chars.text())
+
+        # Both backends share the same signals, so the rest of the UI
+        # doesn't need to know which one is being used.
+        if self.cb_async.isChecked():
+            worker_cls = AsyncMixamoDownloader
+        else:
+            worker_cls = MixamoDownloader
+
         # Create a MixamoDownloader instance and move it to the new thread.
-        self.worker = MixamoDownloader(path, mode, query, is_retry)
+        self.worker = worker_cls(path, mode, query, is_retry, characters,
+                                 self.token_cache)
         self.worker.moveToThread(self.thread)
 
         # As soon as the thread is started, the run method on the worker
@@ -271,6 +340,15 @@ class MixamoDownloaderUI(QtWidgets.QMainWindow):
         if path:
             self.le_path.setText(path)
 
+    def set_characters_file(self):
+        """Ask the user to select the characters file through a QFileDialog."""
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, 'Select the characters file', filter='JSON files (*.json)')
+
+        # If a file has been selected by the user, update the line edit.
+        if path:
+            self.le_chars.setText(path)
+
     def get_mode(self):
         """Read the radio buttons to know which download mode to be used.
 
@@ -281,5 +359,7 @@ class MixamoDownloaderUI(QtWidgets.QMainWindow):
             return "all"
         elif self.rb_query.isChecked():
             return "query"
+        elif self.rb_new.isChecked():
+            return "new"
         elif self.rb_tpose.isChecked():
             return "tpose"
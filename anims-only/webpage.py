@@ -1,5 +1,22 @@
+# Stdlib modules
+import threading
+
 # Third-party modules
-from PySide2 import QtCore, QtWebEngineWidgets, QtWidgets
+from PySide2 import QtCore, QtWebEngineCore, QtWebEngineWidgets, QtWidgets
+
+# Local modules
+from auth import AuthenticationError, TokenProvider
+
+
+# Seconds to wait for the browser to hand out the access token.
+TOKEN_TIMEOUT = 10
+
+# Seconds to wait for the user to log in again once asked to, after which
+# the download fails instead of hanging.
+LOGIN_TIMEOUT = 300
+
+# Path of the API endpoints that select or upload characters.
+CHARACTERS_PATH = "/api/v1/characters"
 
 
 class CustomWebPage(QtWebEngineWidgets.QWebEnginePage):
@@ -36,3 +53,108 @@ class CustomWebPage(QtWebEngineWidgets.QWebEnginePage):
         if "ACCESS TOKEN" in message:
             access_token = message.split(":")[-1].strip()
             self.retrieved_token.emit(access_token)
+
+
+class BrowserTokenProvider(QtCore.QObject, TokenProvider):
+    """Token provider reading the access token from the embedded browser.
+
+    The page can only be used from the UI thread, while tokens are
+    refreshed from the download thread, so requests are sent through
+    signals and the download thread waits for their answer.
+
+    If the browser doesn't have a new token (i.e. the Mixamo session has
+    expired too), the user is asked once to log in again, and given
+    LOGIN_TIMEOUT seconds to do it.
+    """
+    requested = QtCore.Signal()
+    prompted = QtCore.Signal()
+
+    def __init__(self, page, token=None, parent=None):
+        """Initialize the provider.
+
+        :param page: Page where the user is logged in to Mixamo
+        :type page: QWebEnginePage
+
+        :param token: Token already read from the page
+        :type token: str
+        """
+        super().__init__(parent)
+
+        self.page = page
+        self.token = token
+        self.received = threading.Event()
+
+        # Both are emitted from the download thread and run on the UI one.
+        self.requested.connect(self.read_token)
+        self.prompted.connect(self.prompt_login)
+
+    def get_token(self):
+        return self.token
+
+    def refresh(self, expired_token):
+        token = self.request_token()
+
+        if token == expired_token:
+            self.received.clear()
+            self.prompted.emit()
+            if not self.received.wait(LOGIN_TIMEOUT):
+                raise AuthenticationError(
+                    f"Nobody logged in to Mixamo again within {LOGIN_TIMEOUT} seconds.")
+            token = self.request_token()
+
+        return token if token != expired_token else None
+
+    def request_token(self):
+        """Read the token from the page and wait for it (download thread).
+
+        :return: Access token
+        :rtype: str
+        """
+        self.received.clear()
+        self.requested.emit()
+        self.received.wait(TOKEN_TIMEOUT)
+        return self.token
+
+    @QtCore.Slot()
+    def read_token(self):
+        self.page.runJavaScript(
+            "localStorage.getItem('access_token');", self.set_token)
+
+    def set_token(self, token):
+        if token:
+            self.token = token
+        self.received.set()
+
+    @QtCore.Slot()
+    def prompt_login(self):
+        QtWidgets.QMessageBox.information(
+            None, "Mixamo Downloader",
+            "Your Mixamo session has expired. Please log in again in the "
+            "browser, then press OK to resume the download.")
+        self.received.set()
+
+
+class CharacterChangeInterceptor(QtWebEngineCore.QWebEngineUrlRequestInterceptor):
+    """Tell when the user selects or uploads a character in the browser.
+
+    Every request of the page goes through this interceptor, which calls
+    'on_change' for those changing the characters of the account (i.e.
+    anything but a GET to the characters endpoints), so that the primary
+    character known by the downloader can be forgotten.
+
+    Requests are intercepted on the browser's IO thread, so 'on_change'
+    must be thread-safe.
+    """
+    def __init__(self, on_change, parent=None):
+        """Initialize the interceptor.
+
+        :param on_change: Callable run when the characters change
+        :type on_change: callable
+        """
+        super().__init__(parent)
+        self.on_change = on_change
+
+    def interceptRequest(self, info):
+        method = bytes(info.requestMethod()).decode()
+        if method != "GET" and CHARACTERS_PATH in info.requestUrl().path():
+            self.on_change()
@@ -0,0 +1,102 @@
+"""Benchmark batched exports (several animations per export) by batch size.
+
+Every run downloads the same animations from the mock server, exporting
+them '--batch-sizes' at a time, for every export latency per motion set
+with '--motion-durations' (the extra time an export takes for every
+motion after the first one). Usage:
+
+    python bench_batch.py --count 32 --batch-sizes 1 2 4 8 16 --motion-durations 0 0.1 0.5
+"""
+# Stdlib modules
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# Make the downloader importable from the benchmarks folder.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "anims-only"))
+
+# Local modules
+import engine
+from bench_pipeline import BenchEngine
+from mock_mixamo import MockConfig, MockMixamoServer
+from tracing import Tracer
+
+
+def run_batch(server, anim_data, batch_size):
+    """Download every animation once, with a given batch size.
+
+    :return: Wall time, downloaded files and requests received by the mock
+      server, by endpoint
+    :rtype: dict
+    """
+    counters_before = dict(server.state.counters)
+
+    with tempfile.TemporaryDirectory() as path:
+        # Start every run cold, without any export latency learned.
+        engine.EXPORT_BATCH_SIZE = batch_size
+        engine.POLL_STATS_FILE = os.path.join(path, "export_latency.json")
+
+        output = os.path.join(path, "output")
+        worker = BenchEngine(output, anim_data)
+        worker.tracer = Tracer()
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            worker.runImpl()
+        wall = time.perf_counter() - start
+
+        files = [
+            name for name in os.listdir(output)
+            if name.endswith(f".{engine.FILE_EXTENSION}")]
+
+    return {
+        "wall": wall,
+        "files": len(files),
+        "counters": {
+            endpoint: count - counters_before.get(endpoint, 0)
+            for endpoint, count in server.state.counters.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=32)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--motion-durations", type=float, nargs="+", default=[0, 0.1, 0.5])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--export-duration", type=float, default=1.0)
+    parser.add_argument("--payload-size", type=int, default=256 * 1024)
+    args = parser.parse_args()
+
+    anim_data = {f"anim-{i:04d}": f"Animation {i}" for i in range(args.count)}
+    config = MockConfig(args.latency, args.export_duration, args.payload_size)
+
+    print(f"{'per motion':>10} {'batch':>6} {'wall':>8} {'files':>9} {'anims/s':>8} "
+          f"{'exports':>8} {'polls':>6} {'speedup':>8}")
+
+    with MockMixamoServer(config) as server:
+        engine.API_URL = server.api_url
+        engine.CACHE_FILE = ":memory:"
+
+        for motion_duration in args.motion_durations:
+            config.motion_duration = motion_duration
+            baseline = None
+
+            for batch_size in args.batch_sizes:
+                result = run_batch(server, anim_data, batch_size)
+                counters = result["counters"]
+                baseline = baseline or result["wall"]
+
+                print(f"{motion_duration:9.2f}s {batch_size:>6} {result['wall']:7.2f}s "
+                      f"{result['files']:>4}/{args.count:<4} "
+                      f"{result['files'] / result['wall']:8.2f} "
+                      f"{counters.get('export', 0):>8} {counters.get('monitor', 0):>6} "
+                      f"{baseline / result['wall']:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
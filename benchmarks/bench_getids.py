@@ -0,0 +1,75 @@
+"""Compare the concurrent catalog scraper against the old sequential one.
+
+The mock server lists the catalogs recorded in 'mixamo_anims.json' and
+'mixamo_animsPack.json', randomly swapping some products on every page
+like the real API does. Usage:
+
+    python bench_getids.py --latency 0.05 --drop-rate 0.02
+"""
+# Stdlib modules
+import argparse
+import os
+import sys
+import time
+
+# Make getids importable from the benchmarks folder.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "anims-only"))
+
+# Local modules
+import getids
+from mock_mixamo import MockConfig, MockMixamoServer, load_catalog
+
+
+def run_sequential(passes):
+    """The scraper as it was: every page, 'passes' times, one at a time."""
+    catalogs = {}
+
+    for product_type in getids.OUTPUT_FILES:
+        data = getids.get_page(product_type, 0)
+        num_pages = data["pagination"]["num_pages"]
+        products = []
+
+        for run in range(passes):
+            for page_num in range(num_pages + 1):
+                products.extend(getids.get_page(product_type, page_num)["results"])
+
+        catalogs[product_type] = {product["id"]: product for product in products}
+
+    return catalogs
+
+
+def run_concurrent(passes):
+    return getids.get_catalogs(max_passes=passes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--drop-rate", type=float, default=0.02)
+    parser.add_argument("--passes", type=int, default=getids.MAX_PASSES)
+    args = parser.parse_args()
+
+    catalog = load_catalog()
+    config = MockConfig(args.latency, catalog=catalog, page_drop_rate=args.drop_rate)
+
+    results = {}
+    with MockMixamoServer(config) as server:
+        getids.API_URL = server.api_url
+
+        for name, run in (("sequential", run_sequential), ("concurrent", run_concurrent)):
+            requests_before = server.state.counters.get("listing", 0)
+            start = time.perf_counter()
+            catalogs = run(args.passes)
+            results[name] = time.perf_counter() - start
+            requests_sent = server.state.counters.get("listing", 0) - requests_before
+
+            found = ", ".join(
+                f"{len(catalogs[product_type])}/{len(catalog[product_type])} {product_type}"
+                for product_type in catalogs)
+            print(f"{name:>10}: {results[name]:7.2f}s ({requests_sent} requests, found {found})")
+
+    print(f"   speedup: {results['sequential'] / results['concurrent']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
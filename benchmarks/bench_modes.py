@@ -0,0 +1,198 @@
+"""Benchmark every download mode of both backends against the mock API.
+
+The downloader is run headlessly, exactly like the UI runs it, in the
+"all", "query" and "tpose" modes, so that performance changes can be
+checked offline. Usage:
+
+    python bench_modes.py --count 30 --latency 0.1 --rate-limit-rate 0.05
+
+The "all" mode downloads the first '--count' animations of the catalog,
+and the "query" mode searches them for '--query'. With '--characters',
+they're downloaded for that many characters at once (batch mode). With
+'--write-delay', the output folder is as slow as a NAS would be (see
+'bench_writer.py'). Runs downloading no file at all make the benchmark
+fail.
+"""
+# Stdlib modules
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Make the downloader importable from the benchmarks folder.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "anims-only"))
+
+# Local modules
+import async_downloader
+import engine
+from bench_writer import slow_down_writes
+from mock_mixamo import MockConfig, MockMixamoServer, load_catalog
+from ratelimit import RateLimiter
+from tracing import Tracer, get_trace_path
+
+
+MODES = ("all", "query", "tpose")
+
+BACKENDS = {"threads": engine.MixamoEngine}
+if async_downloader.is_available():
+    BACKENDS["async"] = async_downloader.AsyncMixamoEngine
+
+
+def make_catalog(folder, products, count):
+    """Write the first animations of the mock catalog to a catalog file.
+
+    :param folder: Folder where the catalog is written
+    :type folder: str
+
+    :param products: Motions listed by the mock server
+    :type products: list
+
+    :param count: Number of animations in the catalog
+    :type count: int
+
+    :return: Catalog file path
+    :rtype: str
+    """
+    file_path = os.path.join(folder, "mixamo_anims.json")
+    with open(file_path, "w") as file:
+        json.dump({product["id"]: product["description"]
+                   for product in products[:count]}, file)
+    return file_path
+
+
+def run_mode(server, backend, mode, args):
+    """Run the downloader once and measure it.
+
+    :return: Wall time, expected and downloaded files, bytes written and
+      requests received by the mock server, by endpoint (errors included),
+      and connections opened to it
+    :rtype: dict
+    """
+    counters_before = dict(server.state.counters)
+    totals = []
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Start every run from scratch: empty cache, no latency history,
+        # and a rate limiter that hasn't learned anything yet.
+        engine.CATALOG_FILE = make_catalog(
+            folder, server.state.config.catalog["Motion"], args.count)
+        engine.CACHE_FILE = ":memory:"
+        engine.POLL_STATS_FILE = os.path.join(folder, "export_latency.json")
+        engine.limiter = RateLimiter(rate=args.rate)
+
+        characters = None
+        if args.characters > 1:
+            characters = {
+                f"mock-character-{index}": f"Mock Character {index}"
+                for index in range(args.characters)}
+
+        path = os.path.join(folder, "output")
+        worker = BACKENDS[backend](path, mode, args.query, characters=characters)
+        worker.total_tasks.connect(totals.append)
+
+        if args.trace_folder:
+            worker.tracer = Tracer(get_trace_path(args.trace_folder))
+        else:
+            worker.tracer = Tracer()
+
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+            worker.run()
+        wall = time.perf_counter() - start
+
+        # In batch mode, every character has its own subfolder.
+        files = [
+            os.path.join(root, name) for root, _, names in os.walk(path)
+            for name in names if name.endswith(f".{engine.FILE_EXTENSION}")]
+
+        counters = {
+            endpoint: count - counters_before.get(endpoint, 0)
+            for endpoint, count in server.state.counters.items()}
+        # Conditional listings are already counted as listings, and
+        # connections aren't requests.
+        connections = counters.pop("connections", 0)
+        counters.pop("listing_not_modified", None)
+
+        return {
+            "wall": wall,
+            "expected": totals[-1] if totals else 0,
+            "files": len(files),
+            "bytes": sum(os.path.getsize(file) for file in files),
+            "counters": counters,
+            "connections": connections,
+            "summary": worker.tracer.summary(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--count", type=int, default=30)
+    parser.add_argument("--query", default="walk*")
+    parser.add_argument("--characters", type=int, default=1,
+                        help="number of characters to download the animations for")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--export-duration", type=float, default=0.5)
+    parser.add_argument("--payload-size", type=int, default=1024 * 1024)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--write-delay", type=float, default=0.0,
+                        help="seconds per MiB written to the output folder")
+    parser.add_argument("--download-host", default="localhost",
+                        help="host name of the download links, to tell them apart from the API")
+    parser.add_argument("--rate", type=float, default=engine.limiter.bucket.rate,
+                        help="requests per second allowed by the rate limiter")
+    parser.add_argument("--trace-folder", help="save the trace of every run there")
+    parser.add_argument("--verbose", action="store_true", help="show the downloader output")
+    args = parser.parse_args()
+
+    if args.write_delay:
+        slow_down_writes(args.write_delay)
+
+    config = MockConfig(args.latency, args.export_duration, args.payload_size,
+                        load_catalog(), page_drop_rate=0,
+                        failure_rate=args.failure_rate,
+                        rate_limit_rate=args.rate_limit_rate,
+                        retry_after=args.retry_after,
+                        download_host=args.download_host)
+
+    print(f"{'mode':<6} {'backend':<8} {'wall':>8} {'files':>9} {'anims/s':>8} "
+          f"{'MB/s':>7} {'requests':>9} {'conns':>6} {'429':>5} {'500':>5} {'export p95':>11} "
+          f"{'wait p50':>9}")
+
+    # Runs that downloaded nothing measured nothing either.
+    empty_runs = []
+
+    with MockMixamoServer(config) as server:
+        engine.API_URL = server.api_url
+
+        for mode in args.modes:
+            for backend in args.backends:
+                result = run_mode(server, backend, mode, args)
+                if not result["files"]:
+                    empty_runs.append(f"{mode} ({backend})")
+                counters = result["counters"]
+                export = result["summary"].get("export", {})
+                export_wait = result["summary"].get("export_wait", {})
+
+                print(f"{mode:<6} {backend:<8} {result['wall']:7.2f}s "
+                      f"{result['files']:>4}/{result['expected']:<4} "
+                      f"{result['files'] / result['wall']:8.2f} "
+                      f"{result['bytes'] / result['wall'] / 1e6:7.2f} "
+                      f"{sum(counters.values()):>9} {result['connections']:>6} "
+                      f"{counters.get('throttled', 0):>5} {counters.get('failed', 0):>5} "
+                      f"{export.get('p95', 0):10.2f}s {export_wait.get('p50', 0):8.2f}s")
+
+    if empty_runs:
+        sys.exit(f"ERROR: No file was downloaded by: {', '.join(empty_runs)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark exporting animations as part of packs, against one by one.
+
+The mock server is set up with '--packs' packs of '--pack-size' motions
+each. The downloaded animations are some of the motions of every pack
+(as many as the next value of '--wanted', in turn) and '--singles'
+animations that aren't part of any pack. Usage:
+
+    python bench_packs.py --packs 6 --pack-size 20 --wanted 12 6 2 --singles 8
+"""
+# Stdlib modules
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Make the downloader importable from the benchmarks folder.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "anims-only"))
+
+# Local modules
+import engine
+from bench_pipeline import BenchEngine
+from mock_mixamo import MockConfig, MockMixamoServer
+from tracing import Tracer
+
+
+def run_packs(server, anim_data, pack_ids, use_packs):
+    """Download every animation once, with or without packs.
+
+    :return: Wall time, downloaded files and requests received by the mock
+      server, by endpoint
+    :rtype: dict
+    """
+    counters_before = dict(server.state.counters)
+
+    with tempfile.TemporaryDirectory() as path:
+        # Start every run cold, without any export latency learned or
+        # product cached.
+        engine.USE_PACKS = use_packs
+        engine.POLL_STATS_FILE = os.path.join(path, "export_latency.json")
+        engine.CACHE_FILE = ":memory:"
+        engine.PACK_CATALOG_FILE = os.path.join(path, "packs.json")
+        with open(engine.PACK_CATALOG_FILE, "w") as file:
+            json.dump({pack_id: f"Pack {pack_id}" for pack_id in pack_ids}, file)
+
+        output = os.path.join(path, "output")
+        worker = BenchEngine(output, anim_data)
+        worker.tracer = Tracer()
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            worker.runImpl()
+        wall = time.perf_counter() - start
+
+        files = [
+            name for name in os.listdir(output)
+            if name.endswith(f".{engine.FILE_EXTENSION}")]
+
+    return {
+        "wall": wall,
+        "files": len(files),
+        "counters": {
+            endpoint: count - counters_before.get(endpoint, 0)
+            for endpoint, count in server.state.counters.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packs", type=int, default=6)
+    parser.add_argument("--pack-size", type=int, default=20)
+    parser.add_argument("--wanted", type=int, nargs="+", default=[12, 6, 2])
+    parser.add_argument("--singles", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--export-duration", type=float, default=1.0)
+    parser.add_argument("--motion-duration", type=float, default=0.05)
+    parser.add_argument("--payload-size", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    packs = {
+        f"pack-{i:02d}": [f"anim-{i:02d}-{j:03d}" for j in range(args.pack_size)]
+        for i in range(args.packs)}
+
+    anim_data = {}
+    for i, anim_ids in enumerate(packs.values()):
+        for anim_id in anim_ids[:args.wanted[i % len(args.wanted)]]:
+            anim_data[anim_id] = f"Animation {anim_id}"
+    for i in range(args.singles):
+        anim_data[f"single-{i:03d}"] = f"Animation single {i}"
+
+    config = MockConfig(args.latency, args.export_duration, args.payload_size,
+                        motion_duration=args.motion_duration, packs=packs)
+    count = len(anim_data)
+
+    print(f"{'run':>8} {'wall':>8} {'files':>9} {'anims/s':>8} {'exports':>8} "
+          f"{'polls':>6} {'downloads':>10} {'speedup':>8}")
+
+    with MockMixamoServer(config) as server:
+        engine.API_URL = server.api_url
+        baseline = None
+
+        for name, use_packs in (("singles", False), ("packs", True)):
+            result = run_packs(server, anim_data, list(packs), use_packs)
+            counters = result["counters"]
+            baseline = baseline or result["wall"]
+
+            print(f"{name:>8} {result['wall']:7.2f}s {result['files']:>4}/{count:<4} "
+                  f"{result['files'] / result['wall']:8.2f} "
+                  f"{counters.get('export', 0):>8} {counters.get('monitor', 0):>6} "
+                  f"{counters.get('download', 0):>10} {baseline / result['wall']:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
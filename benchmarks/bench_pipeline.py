@@ -0,0 +1,185 @@
+"""Compare the pipelined downloader against the old one-at-a-time loop.
+
+Every run downloads the same animations from a local mock Mixamo server,
+so nothing here needs a Mixamo account. The reference ("baseline") is the
+loop of the original downloader, reproduced as it was: no cache, no rate
+limiter, and export checks every 1.5 seconds. Usage:
+
+    python bench_pipeline.py --count 30 --latency 0.3
+"""
+# Stdlib modules
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Third-party modules
+import requests
+
+# Make the downloader importable from the benchmarks folder.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "anims-only"))
+
+# Local modules
+import async_downloader
+import engine
+from tracing import Tracer
+from mock_mixamo import MockConfig, MockMixamoServer
+
+
+class InMemoryAnimations:
+    """Mixin that makes a downloader read its animations from memory."""
+    def __init__(self, path, anim_data):
+        super().__init__(path, "all")
+        self.anim_data = anim_data
+
+    def get_all_animations_data(self):
+        self.total_tasks.emit(len(self.anim_data))
+        return self.anim_data
+
+
+class BenchEngine(InMemoryAnimations, engine.MixamoEngine):
+    pass
+
+
+class AsyncBenchEngine(InMemoryAnimations, async_downloader.AsyncMixamoEngine):
+    pass
+
+
+# Export checks of the original downloader, and the time between them.
+BASELINE_MAX_CHECKS = 15
+BASELINE_CHECK_DELAY = 1.5
+
+
+class BaselineDownloader:
+    """The download loop of the original downloader: one animation at a
+    time, each of them looked up, exported (checking it at a fixed rate)
+    and downloaded in memory before being written to disk. Only its exports
+    and downloads are traced.
+    """
+    def __init__(self, path, anim_data):
+        self.path = path
+        self.anim_data = anim_data
+        self.session = requests.Session()
+        self.tracer = Tracer()
+
+    def make_request(self, method, url, **kwargs):
+        for _ in range(10):
+            try:
+                return self.session.request(method, url, timeout=10, **kwargs)
+            except requests.exceptions.RequestException:
+                time.sleep(1)
+        raise Exception(f"Failed to complete request to {url} after 10 retries.")
+
+    def build_animation_payload(self, character_id, anim_id):
+        response = self.make_request("GET",
+            f"{engine.API_URL}/products/{anim_id}?similar=0&character_id={character_id}",
+            headers=engine.HEADERS)
+        product = response.json()
+
+        gms_hash = product["details"]["gms_hash"]
+        gms_hash["params"] = ",".join(str(int(param[-1])) for param in gms_hash["params"])
+        gms_hash["overdrive"] = 0
+        gms_hash["trim"] = [int(gms_hash["trim"][0]), int(gms_hash["trim"][1])]
+
+        return product["description"], json.dumps({
+            "character_id": character_id,
+            "product_name": product["description"],
+            "type": product["type"],
+            "preferences": {"format": "fbx7_2019", "skin": False, "fps": "60",
+                            "reducekf": "0"},
+            "gms_hash": [gms_hash],
+        })
+
+    def export_animation(self, character_id, payload):
+        self.make_request("POST", f"{engine.API_URL}/animations/export",
+                          data=payload, headers=engine.HEADERS)
+
+        status = None
+        for _ in range(BASELINE_MAX_CHECKS):
+            time.sleep(BASELINE_CHECK_DELAY)
+            response = self.make_request("GET",
+                f"{engine.API_URL}/characters/{character_id}/monitor",
+                headers=engine.HEADERS)
+            status = response.json().get("status")
+            if status == "completed":
+                return response.json().get("job_result")
+        return None
+
+    def run(self):
+        response = self.make_request("GET", f"{engine.API_URL}/characters/primary",
+                                     headers=engine.HEADERS)
+        character_id = response.json().get("primary_character_id")
+
+        for index, anim_id in enumerate(self.anim_data):
+            product_name, payload = self.build_animation_payload(character_id, anim_id)
+            with self.tracer.span("export", index=index + 1):
+                url = self.export_animation(character_id, payload)
+            if url:
+                with self.tracer.span("download", index=index + 1):
+                    response = self.make_request("GET", url)
+                with open(os.path.join(self.path, f"{index + 1}_{product_name}."
+                                       f"{engine.FILE_EXTENSION}"), "wb") as file:
+                    file.write(response.content)
+
+
+def run_pipelined(worker):
+    worker.runImpl()
+
+
+def run_baseline(worker):
+    worker.run()
+
+
+# Benchmarked runs: (name, downloader class, run function).
+RUNS = [
+    ("baseline", BaselineDownloader, run_baseline),
+    ("pipelined", BenchEngine, run_pipelined),
+]
+
+if async_downloader.is_available():
+    RUNS.append(("async", AsyncBenchEngine, run_pipelined))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--export-duration", type=float, default=0.5)
+    parser.add_argument("--payload-size", type=int, default=1024 * 1024)
+    args = parser.parse_args()
+
+    anim_data = {f"anim-{i:04d}": f"Animation {i}" for i in range(args.count)}
+    config = MockConfig(args.latency, args.export_duration, args.payload_size)
+
+    results = {}
+    with MockMixamoServer(config) as server:
+        engine.API_URL = server.api_url
+        # Give every run its own empty cache so they all start cold.
+        engine.CACHE_FILE = ":memory:"
+
+        for name, worker_cls, run in RUNS:
+            with tempfile.TemporaryDirectory() as path:
+                worker = worker_cls(path, anim_data)
+                # Keep the traces in memory, only their summary is printed.
+                worker.tracer = Tracer()
+                start = time.perf_counter()
+                run(worker)
+                results[name] = time.perf_counter() - start
+                downloaded = len([
+                    name for name in os.listdir(path)
+                    if name.endswith(f".{engine.FILE_EXTENSION}")])
+
+            print(f"{name:>10}: {results[name]:7.2f}s "
+                  f"({downloaded}/{args.count} files, "
+                  f"{args.count / results[name]:.2f} anims/s)")
+            worker.tracer.print_summary()
+
+    for name in results:
+        if name != "baseline":
+            print(f"{name:>10} speedup: {results['baseline'] / results[name]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
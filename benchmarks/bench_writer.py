@@ -0,0 +1,126 @@
+"""Benchmark the writer stage against slow output storage (e.g. a NAS).
+
+Every run downloads the same animations from the mock server, to an
+output folder made slow by sleeping '--write-delay' seconds for every MiB
+written to it, with every number of '--write-workers' (0 writes files as
+they're received, like before). Usage:
+
+    python bench_writer.py --count 32 --write-workers 0 2 4 --write-delay 0.5
+"""
+# Stdlib modules
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# Make the downloader importable from the benchmarks folder.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "anims-only"))
+
+# Local modules
+import engine
+import fileio
+from bench_pipeline import BenchEngine
+from mock_mixamo import MockConfig, MockMixamoServer
+from tracing import Tracer
+
+
+def slow_down_writes(delay):
+    """Make every file written to the output folder take longer.
+
+    Spools are temporary files, not 'fileio.AtomicFile's, so only the
+    output folder is slowed down.
+
+    :param delay: Seconds per MiB written
+    :type delay: float
+    """
+    write = fileio.AtomicFile.write
+
+    def slow_write(self, chunk):
+        time.sleep(delay * len(chunk) / (1024 * 1024))
+        write(self, chunk)
+
+    fileio.AtomicFile.write = slow_write
+
+
+def run_writer(server, anim_data, write_workers, fsync):
+    """Download every animation once, with a given number of writers.
+
+    :return: Wall time, downloaded files, requests received by the mock
+      server (by endpoint) and span summary
+    :rtype: dict
+    """
+    counters_before = dict(server.state.counters)
+
+    with tempfile.TemporaryDirectory() as path:
+        # Start every run cold, without any export latency learned.
+        engine.WRITE_WORKERS = write_workers
+        engine.FSYNC_POLICY = fsync
+        engine.POLL_STATS_FILE = os.path.join(path, "export_latency.json")
+
+        output = os.path.join(path, "output")
+        worker = BenchEngine(output, anim_data)
+        worker.tracer = Tracer()
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            worker.runImpl()
+        wall = time.perf_counter() - start
+
+        files = [
+            name for name in os.listdir(output)
+            if name.endswith(f".{engine.FILE_EXTENSION}")]
+
+    return {
+        "wall": wall,
+        "files": len(files),
+        "counters": {
+            endpoint: count - counters_before.get(endpoint, 0)
+            for endpoint, count in server.state.counters.items()},
+        "spans": worker.tracer.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=32)
+    parser.add_argument("--write-workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--write-delay", type=float, default=0.5)
+    parser.add_argument("--fsync", choices=["always", "end", "never"], default="always")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--export-duration", type=float, default=0.3)
+    parser.add_argument("--payload-size", type=int, default=1024 * 1024)
+    args = parser.parse_args()
+
+    slow_down_writes(args.write_delay)
+
+    anim_data = {f"anim-{i:04d}": f"Animation {i}" for i in range(args.count)}
+    config = MockConfig(args.latency, args.export_duration, args.payload_size)
+
+    print(f"{'writers':>7} {'wall':>8} {'files':>9} {'anims/s':>8} {'exports':>8} "
+          f"{'download p50':>13} {'write p50':>10} {'speedup':>8}")
+
+    with MockMixamoServer(config) as server:
+        engine.API_URL = server.api_url
+        engine.CACHE_FILE = ":memory:"
+        baseline = None
+
+        for write_workers in args.write_workers:
+            result = run_writer(server, anim_data, write_workers, args.fsync)
+            counters = result["counters"]
+            spans = result["spans"]
+            baseline = baseline or result["wall"]
+
+            write_p50 = f"{spans['write']['p50']:.3f}s" if "write" in spans else "-"
+
+            print(f"{write_workers:>7} {result['wall']:7.2f}s "
+                  f"{result['files']:>4}/{args.count:<4} "
+                  f"{result['files'] / result['wall']:8.2f} "
+                  f"{counters.get('export', 0):>8} {spans['download']['p50']:12.3f}s "
+                  f"{write_p50:>10} {baseline / result['wall']:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
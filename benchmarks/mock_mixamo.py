@@ -0,0 +1,469 @@
+"""Local mock of the Mixamo API, used to benchmark the downloader offline.
+
+Only the endpoints the downloader talks to are implemented. Just like the
+real API, a character can only run one export at a time: starting a new
+export replaces the job reported by '/characters/{id}/monitor'. Exports
+of several motions at once (packs, or batches of single motions) are
+downloaded as a zip archive with a file per motion, and take longer the
+more motions they have. Packs can be set up to contain chosen motions,
+listed with the same 'gms_hash' as their own product details. API
+requests can also be made to randomly fail (500) or be throttled (429),
+and to be rejected (401) unless they're sent with a valid token.
+
+Every new connection is counted ("connections"), which is what a TLS
+handshake would cost against the real API and CDN.
+
+Run it on its own with:
+
+    python mock_mixamo.py --port 8765
+"""
+# Stdlib modules
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+
+
+# Folder with the catalogs recorded from Mixamo, used as fixtures.
+FIXTURES_FOLDER = os.path.join(os.path.dirname(__file__), "..", "packs")
+
+# Number of products per page of the products endpoint.
+PAGE_SIZE = 96
+
+
+def load_catalog(folder=FIXTURES_FOLDER):
+    """Build product listings from the recorded catalog JSON files.
+
+    :param folder: Folder with 'mixamo_anims.json' and 'mixamo_animsPack.json'
+    :type folder: str
+
+    :return: Product type mapped to the list of its products
+    :rtype: dict
+    """
+    catalog = {}
+
+    for product_type, file_name, key in (
+            ("Motion", "mixamo_anims.json", "description"),
+            ("MotionPack", "mixamo_animsPack.json", "name")):
+        with open(os.path.join(folder, file_name), "r") as file:
+            names = json.load(file)
+
+        catalog[product_type] = [
+            {"id": product_id, "type": product_type, "name": name,
+             "description": name if key == "description" else "",
+             "category": "", "character_type": "human", "source": "system"}
+            for product_id, name in sorted(names.items())]
+
+    return catalog
+
+
+def get_words(text):
+    """Split a text into lower case words, like Mixamo's search does."""
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def matches(words, product_words):
+    """Tell whether every query word starts one of the words of a product."""
+    return all(
+        any(product_word.startswith(word) for product_word in product_words)
+        for word in words)
+
+
+def get_model_id(anim_id):
+    """Stable 'model-id' of a mock motion, so that packs can refer to it."""
+    return int(hashlib.sha1(anim_id.encode()).hexdigest()[:8], 16)
+
+
+def get_gms_hash(anim_id):
+    """'gms_hash' of a mock motion, the same in its product details and in
+    those of the packs it's part of."""
+    return {
+        "model-id": get_model_id(anim_id),
+        "mirror": False,
+        "trim": [0, 100],
+        "inplace": False,
+        "arm-space": 0,
+        "params": [["Overdrive", 0], ["Emotion", 1]],
+    }
+
+
+class MockConfig:
+    """Tunable behaviour of the mock server (all times in seconds)."""
+    def __init__(self, latency=0.05, export_duration=0.5, payload_size=256 * 1024,
+                 catalog=None, page_drop_rate=0.02, failure_rate=0.0,
+                 rate_limit_rate=0.0, retry_after=0.5, valid_tokens=None,
+                 download_host=None, motion_duration=0.0, packs=None):
+        """Initialize the configuration.
+
+        :param latency: Delay added to every API response
+        :type latency: float
+
+        :param export_duration: Time an export takes to complete
+        :type export_duration: float
+
+        :param payload_size: Size in bytes of every downloaded file
+        :type payload_size: int
+
+        :param catalog: Products listed by type (see 'load_catalog')
+        :type catalog: dict
+
+        :param page_drop_rate: Chance of a listed product being replaced by
+          another one, like the real API's inconsistent pagination does
+        :type page_drop_rate: float
+
+        :param failure_rate: Chance of an API request failing with a 500
+        :type failure_rate: float
+
+        :param rate_limit_rate: Chance of an API request being throttled
+          with a 429
+        :type rate_limit_rate: float
+
+        :param retry_after: 'Retry-After' header of throttled requests
+        :type retry_after: float
+
+        :param valid_tokens: Access tokens accepted by the API (401 for any
+          other). If not set, every request is accepted. It can be changed
+          while running to make the current token expire.
+        :type valid_tokens: set
+
+        :param download_host: Host name of the download links (e.g.
+          "localhost" when the API is on 127.0.0.1), so that downloads go
+          through their own connections like they do with the real CDN.
+          If not set, it's the same host as the API.
+        :type download_host: str
+
+        :param motion_duration: Time added to an export for every motion
+          after the first one
+        :type motion_duration: float
+
+        :param packs: Pack IDs mapped to the product IDs of their motions
+        :type packs: dict
+        """
+        self.latency = latency
+        self.export_duration = export_duration
+        self.payload_size = payload_size
+        self.catalog = catalog
+        self.page_drop_rate = page_drop_rate
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.valid_tokens = valid_tokens
+        self.download_host = download_host
+        self.motion_duration = motion_duration
+        self.packs = packs or {}
+
+
+class MockMixamoState:
+    """Jobs and counters shared by every request handler."""
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        # Current export job of every character: (job_id, ready_time).
+        self.jobs = {}
+        # Motion names of the jobs exported as an archive.
+        self.archives = {}
+        # Number of requests received per endpoint.
+        self.counters = {}
+
+    def count(self, endpoint):
+        with self.lock:
+            self.counters[endpoint] = self.counters.get(endpoint, 0) + 1
+
+
+class MockMixamoHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the Mixamo API endpoints."""
+    protocol_version = "HTTP/1.1"
+
+    # Set by 'MockMixamoServer'.
+    state = None
+
+    def log_message(self, format, *args):
+        # Keep the benchmark output readable.
+        pass
+
+    def setup(self):
+        # Called once per connection, however many requests it carries.
+        super().setup()
+        self.state.count("connections")
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+
+        if self.inject_error():
+            return
+
+        if path == "/api/v1/characters/primary":
+            self.state.count("primary")
+            return self.send_json({
+                "primary_character_id": "mock-character",
+                "primary_character_name": "Mock Character"})
+
+        if path == "/api/v1/products":
+            self.state.count("listing")
+            listing = self.listing()
+
+            # Pages support conditional requests through their ETag.
+            etag = '"%s"' % hashlib.sha1(json.dumps(listing).encode()).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self.state.count("listing_not_modified")
+                return self.send_not_modified(etag)
+            return self.send_json(listing, {"ETag": etag})
+
+        match = re.fullmatch(r"/api/v1/products/([\w-]+)", path)
+        if match:
+            self.state.count("products")
+            return self.send_json(self.product(match.group(1)))
+
+        match = re.fullmatch(r"/api/v1/characters/([\w-]+)/monitor", path)
+        if match:
+            self.state.count("monitor")
+            return self.send_json(self.monitor(match.group(1)))
+
+        match = re.fullmatch(r"/downloads/([\w-]+)", path)
+        if match:
+            self.state.count("download")
+            with self.state.lock:
+                names = self.state.archives.get(match.group(1))
+            if names:
+                return self.send_bytes(self.archive(names), "application/zip")
+            return self.send_bytes(b"\0" * self.state.config.payload_size)
+
+        self.send_error(404)
+
+    def do_POST(self):
+        # Read the body so that the connection can be reused.
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.inject_error():
+            return
+
+        if self.path == "/api/v1/animations/export":
+            self.state.count("export")
+            motions = payload.get("gms_hash") or []
+            config = self.state.config
+            ready = (time.monotonic() + config.export_duration
+                     + config.motion_duration * max(len(motions) - 1, 0))
+            job_id = uuid.uuid4().hex
+            with self.state.lock:
+                self.state.jobs[payload.get("character_id")] = (job_id, ready)
+                if len(motions) > 1 or payload.get("type") == "MotionPack":
+                    self.state.archives[job_id] = [motion.get("name") for motion in motions]
+            return self.send_json({"status": "processing", "uuid": job_id})
+
+        self.send_error(404)
+
+    def inject_error(self):
+        """Reject, fail or throttle API requests, as set in the config.
+
+        Downloads are served by a CDN in the real world, so they're left
+        alone.
+
+        :return: True if an error has been sent instead of the response
+        :rtype: bool
+        """
+        if not self.path.startswith("/api/"):
+            return False
+
+        config = self.state.config
+
+        if config.valid_tokens is not None:
+            token = self.headers.get("Authorization", "")[len("Bearer "):]
+            if token not in config.valid_tokens:
+                self.state.count("unauthorized")
+                self.send_empty(401)
+                return True
+
+        roll = random.random()
+
+        if roll < config.rate_limit_rate:
+            self.state.count("throttled")
+            self.send_empty(429, {"Retry-After": str(config.retry_after)})
+            return True
+
+        if roll < config.rate_limit_rate + config.failure_rate:
+            self.state.count("failed")
+            self.send_empty(500)
+            return True
+
+        return False
+
+    def archive(self, names):
+        """Zip archive of a job with several motions, like Mixamo's packs."""
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for name in names:
+                archive.writestr(f"{name}.fbx", b"\0" * self.state.config.payload_size)
+        return buffer.getvalue()
+
+    def product(self, anim_id):
+        """Product details of a single motion (or a pack), as Mixamo returns them."""
+        anim_ids = self.state.config.packs.get(anim_id)
+        if anim_ids is not None:
+            return {
+                "id": anim_id,
+                "type": "MotionPack",
+                "name": f"Mock pack {anim_id}",
+                "description": "",
+                "details": {
+                    "motions": [
+                        {"name": f"Mock {motion_id}", "gms_hash": get_gms_hash(motion_id)}
+                        for motion_id in anim_ids],
+                },
+            }
+
+        return {
+            "id": anim_id,
+            "type": "Motion",
+            "name": f"Mock {anim_id}",
+            "description": f"Mock Animation {anim_id}",
+            "details": {
+                "gms_hash": get_gms_hash(anim_id),
+                "motions": [
+                    {"name": f"Mock {anim_id} {i}",
+                     "gms_hash": {"model-id": i, "params": [["Overdrive", 0]],
+                                  "trim": [0, 100]}}
+                    for i in range(3)],
+            },
+        }
+
+    def listing(self):
+        """A page of the products endpoint.
+
+        Every product has a chance of being swapped for a random one, so a
+        single pass over every page usually misses a few products.
+        """
+        query = parse_qs(urlparse(self.path).query)
+        product_type = query.get("type", ["Motion"])[0]
+        limit = int(query.get("limit", [PAGE_SIZE])[0])
+        # Pages 0 and 1 both return the first page.
+        page = max(int(query.get("page", [1])[0]), 1)
+
+        products = (self.state.config.catalog or {}).get(product_type, [])
+
+        # Searches only match the name or description of a product: every
+        # word of the query must start one of their words.
+        words = get_words(query.get("query", [""])[0])
+        if words:
+            products = [
+                product for product in products
+                if matches(words, get_words(product["name"] + " " + product["description"]))]
+
+        results = products[(page - 1) * limit:page * limit]
+
+        drop_rate = self.state.config.page_drop_rate
+        results = [
+            random.choice(products) if random.random() < drop_rate else product
+            for product in results]
+
+        return {
+            "results": results,
+            "pagination": {
+                "page": page,
+                "limit": limit,
+                "num_pages": -(-len(products) // limit),
+                "num_results": len(products)}}
+
+    def monitor(self, character_id):
+        """Status of the current export job of a character."""
+        with self.state.lock:
+            job = self.state.jobs.get(character_id)
+
+        if job is None:
+            return {"status": "failed"}
+
+        job_id, ready = job
+        if time.monotonic() < ready:
+            return {"status": "processing", "uuid": job_id}
+
+        host = self.headers.get("Host")
+        if self.state.config.download_host:
+            host = f"{self.state.config.download_host}:{self.server.server_address[1]}"
+        return {"status": "completed", "uuid": job_id,
+                "job_result": f"http://{host}/downloads/{job_id}"}
+
+    def send_json(self, data, headers=None):
+        time.sleep(self.state.config.latency)
+        self.send_bytes(json.dumps(data).encode(), "application/json", headers)
+
+    def send_not_modified(self, etag):
+        self.send_empty(304, {"ETag": etag})
+
+    def send_empty(self, status, headers=None):
+        time.sleep(self.state.config.latency)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_bytes(self, body, content_type="application/octet-stream", headers=None):
+        self.send_response(200)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockMixamoServer:
+    """Run the mock API on a background thread.
+
+    Can be used as a context manager:
+
+        with MockMixamoServer(MockConfig()) as server:
+            downloader.API_URL = server.api_url
+    """
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.state = MockMixamoState(config or MockConfig())
+        handler = type("Handler", (MockMixamoHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return f"{self.url}/api/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--export-duration", type=float, default=0.5)
+    parser.add_argument("--payload-size", type=int, default=256 * 1024)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.export_duration, args.payload_size,
+                        load_catalog(), failure_rate=args.failure_rate,
+                        rate_limit_rate=args.rate_limit_rate,
+                        retry_after=args.retry_after)
+    with MockMixamoServer(config, port=args.port) as server:
+        print(f"Mock Mixamo API listening on {server.api_url}")
+        server.thread.join()
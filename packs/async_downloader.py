@@ -0,0 +1,485 @@
+# Stdlib modules
+import asyncio
+import itertools
+import json
+import os
+import time
+
+# Third-party modules
+# httpx is optional: the default backend only needs requests.
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Local modules
+import engine
+from auth import AuthenticationError, get_account_key
+from connections import create_async_client
+from exports import export_key, get_job_id, is_export_job
+from engine import HEADERS, MixamoEngine
+from fileio import CHUNK_SIZE, AtomicFile, get_expected_size
+from journal import COMPLETED, STARTED
+from ratelimit import MAX_RETRIES, RETRY_STATUSES, classify, get_retry_wait
+
+
+# Maximum number of product lookups running at the same time.
+LOOKUP_CONCURRENCY = 64
+
+# Maximum number of downloads running at the same time.
+DOWNLOAD_CONCURRENCY = 32
+
+# Maximum number of animations being processed at the same time.
+MAX_IN_FLIGHT = 256
+
+# Bytes of a download received before they're written to disk on a thread,
+# so that the event loop never waits for the disk.
+WRITE_BATCH = 1024 * 1024
+
+
+async def write_stream_async(path, chunks, expected_size=None, fsync=True):
+    """Coroutine equivalent of 'fileio.write_stream', writing an asynchronous
+    iterable of chunks on threads, WRITE_BATCH bytes at a time.
+
+    :return: Written file (with its 'size' and 'sha256')
+    :rtype: fileio.AtomicFile
+    """
+    file = AtomicFile(path, expected_size, fsync)
+    await asyncio.to_thread(file.__enter__)
+
+    try:
+        batch = []
+        batch_size = 0
+        async for chunk in chunks:
+            batch.append(chunk)
+            batch_size += len(chunk)
+            if batch_size >= WRITE_BATCH:
+                await asyncio.to_thread(write_chunks, file, batch)
+                batch = []
+                batch_size = 0
+        await asyncio.to_thread(write_chunks, file, batch)
+    except BaseException as e:
+        # The temporary file is removed (see 'fileio.AtomicFile').
+        await asyncio.to_thread(file.__exit__, type(e), e, e.__traceback__)
+        raise
+
+    # Flushed to disk and renamed.
+    await asyncio.to_thread(file.__exit__, None, None, None)
+    return file
+
+
+def write_chunks(file, chunks):
+    for chunk in chunks:
+        file.write(chunk)
+
+
+def is_available():
+    """Tell whether the asyncio backend can be used (i.e: httpx is installed).
+
+    :return: True if the backend is available
+    :rtype: bool
+    """
+    return httpx is not None
+
+
+class AsyncMixamoEngine(MixamoEngine):
+    """Bulk download animations from Mixamo using asyncio and httpx.
+
+    This is a drop-in replacement for MixamoEngine: it's created with the
+    same arguments, and emits the same 'total_tasks', 'current_task' and
+    'finished' events.
+
+    Instead of one thread per request, every animation is a coroutine.
+    Product lookups and downloads are only bounded by a semaphore, so
+    hundreds of them can be in flight on a single thread, while exports
+    are still serialized because Mixamo only monitors one export at a time
+    for a given character (in batch mode, characters export in parallel).
+
+    Everything touching the disk (the cache, the journal, the library and
+    the downloaded files) is done on threads, so that a coroutine waiting
+    for it doesn't hold every other one, exports included.
+    """
+    def runImpl(self):
+        if httpx is None:
+            raise RuntimeError("The asyncio backend needs httpx (pip install httpx).")
+
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
+        """Coroutine equivalent of MixamoEngine.runImpl."""
+        async with create_async_client(engine.API_URL) as client:
+            self.client = client
+
+            characters = await self.get_characters_async()
+
+            # If there's no character ID, it means that there was some problem
+            # with the access token, so we better stop the code at this point.
+            if not characters:
+                print("No character_id. Exiting")
+                return
+
+            self.lookup_slots = asyncio.Semaphore(LOOKUP_CONCURRENCY)
+            self.download_slots = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+
+            # Exports only need to be serialized per character.
+            self.export_locks = {
+                character_id: asyncio.Lock() for character_id, _, _ in characters}
+
+            # DOWNLOAD MODE: TPOSE
+            if self.mode == "tpose":
+                self.total_tasks.emit(len(characters))
+
+                for character_id, character_name, folder in characters:
+                    tpose_payload = self.build_tpose_payload(character_id, character_name)
+                    await self.fetch_export_async(
+                        character_id, tpose_payload, 0, character_name, folder)
+                    self.task_done()
+
+                self.finished.emit()
+                return
+
+            # Reading the animations list is done by the parent class.
+            # The query mode sends blocking requests, so run it on a thread.
+            if self.mode == "all":
+                anim_data = self.get_all_animations_data()
+            elif self.mode == "query":
+                anim_data = await asyncio.to_thread(
+                    self.get_queried_animations_data, self.query)
+            elif self.mode == "new":
+                anim_data = self.get_new_animations_data()
+
+            if len(characters) > 1:
+                self.total_tasks.emit(len(anim_data) * len(characters))
+
+            # Items are shared with the threaded pipeline, journal included.
+            # Characters are interleaved so that all of them make progress.
+            item_lists = [
+                self.get_character_items(character_id, folder, anim_data)
+                for character_id, _, folder in characters]
+            items = [
+                item for items in itertools.zip_longest(*item_lists)
+                for item in items if item is not None]
+
+            # Start a task per animation, but never keep more than
+            # MAX_IN_FLIGHT of them alive at the same time.
+            in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+            tasks = []
+
+            for item in items:
+                # Check if the 'Stop' button has been pressed in the UI.
+                if self.stop:
+                    break
+
+                await in_flight.acquire()
+                task = asyncio.create_task(self.process_animation(item))
+                task.add_done_callback(lambda _: in_flight.release())
+                tasks.append(task)
+
+            await asyncio.gather(*tasks)
+
+        if not self.stop:
+            print("DOWNLOAD COMPLETE.")
+        # Emit the 'finished' signal to let the UI know that worker is done.
+        self.finished.emit()
+
+    async def process_animation(self, item):
+        """Build the payload of an animation, export and download it to disk.
+
+        Errors are printed rather than raised, so that a single broken
+        animation doesn't cancel the rest of them.
+
+        :param item: Animation to process (same keys as a pipeline item)
+        :type item: dict
+        """
+        character_id = item["character_id"]
+        index = item["index"]
+
+        try:
+            if self.stop:
+                return
+
+            async with self.lookup_slots:
+                payload = await self.build_animation_payload_async(
+                    character_id, item["anim_id"])
+            product_name = json.loads(payload)["product_name"]
+            item["payload"] = payload
+            item["product_name"] = product_name
+
+            def on_start():
+                item["journal"].record(item["anim_id"], STARTED, index=index)
+
+            # Motions the library already has don't need to be exported.
+            file = await asyncio.to_thread(self.get_from_library, item)
+            if file is None:
+                file = await self.fetch_export_async(
+                    character_id, payload, index, product_name, item["folder"],
+                    anim_id=item["anim_id"], on_start=on_start)
+                if file is not None:
+                    await asyncio.to_thread(self.add_to_library, item, file)
+
+            if file is None:
+                if self.stop:
+                    return
+                print(f'WARNING: Couldnt download animation {index} {item["anim_id"]} {item["anim_name"]}')
+                await asyncio.to_thread(self.record_failure, item)
+            else:
+                await asyncio.to_thread(
+                    item["journal"].record, item["anim_id"], COMPLETED, index=index,
+                    file=file.path, size=file.size, sha256=file.sha256)
+
+            self.task_done()
+
+        except Exception as e:
+            print(f'WARNING: failed to process {index} {item["anim_id"]} {item["anim_name"]}: {e!r}')
+            await asyncio.to_thread(self.record_failure, item, e)
+            self.task_done()
+
+    async def fetch_export_async(self, character_id, payload, index, product_name,
+                                 folder=None, anim_id=None, on_start=None):
+        """Coroutine equivalent of fetch_export.
+
+        Exports are serialized per character, and downloads are bounded by
+        'download_slots'.
+
+        :param anim_id: Animation ID (only used in traces)
+        :type anim_id: str
+
+        :param on_start: Callable invoked (on a thread) when the file starts
+          being written
+        :type on_start: callable
+
+        :return: Downloaded file, or None if it couldn't be exported (or
+          the run has been stopped)
+        :rtype: fileio.AtomicFile
+        """
+        key = export_key(payload)
+        # Files downloaded earlier are hashed if they've been modified.
+        export, leader = await asyncio.to_thread(self.exports.join, key)
+
+        if not leader:
+            # Wait for the export it's been coalesced with, if it's running.
+            artifact = await asyncio.wrap_future(export)
+            if on_start:
+                await asyncio.to_thread(on_start)
+            return await asyncio.to_thread(
+                self.copy_export, artifact, index, product_name, folder)
+
+        try:
+            queued = time.monotonic()
+            async with self.export_locks[character_id]:
+                self.tracer.record("export_wait", time.monotonic() - queued,
+                                   anim_id=anim_id)
+                if self.stop:
+                    return None
+                url = await self.export_animation_async(character_id, payload)
+
+            if not url:
+                return None
+
+            async with self.download_slots:
+                if on_start:
+                    await asyncio.to_thread(on_start)
+                file = await self.download_animation_async(url, index, product_name, folder)
+
+            await asyncio.to_thread(self.exports.complete, key, character_id, file)
+            return file
+        finally:
+            self.exports.abandon(key)
+
+    async def make_request_async(self, method, url, stream=False, **kwargs):
+        """Coroutine equivalent of MixamoEngine.make_request.
+
+        Streamed responses must be closed with 'aclose' once read.
+        """
+        endpoint = classify(url)
+        start = time.monotonic()
+        wait = 0
+        backoff = 0
+
+        for attempt in range(MAX_RETRIES):
+            wait_start = time.monotonic()
+            # Refreshing the token blocks, so wait for it on a thread.
+            if self.tokens.refreshing or self.tokens.failed:
+                await asyncio.to_thread(self.tokens.wait_ready)
+            await engine.limiter.acquire_async(endpoint)
+            wait += time.monotonic() - wait_start
+
+            token = self.tokens.get_token()
+            try:
+                request = self.client.build_request(method, url, **kwargs)
+                response = await self.client.send(request, stream=stream)
+            except httpx.HTTPError:
+                engine.limiter.release(endpoint)
+                delay = get_retry_wait(attempt, backoff)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+                backoff += delay
+                continue
+
+            if stream and response.status_code < 400:
+                engine.limiter.release_on_close(response, endpoint)
+            else:
+                engine.limiter.release(endpoint, response.status_code, response.headers)
+
+            if response.status_code == 401 and endpoint != "download":
+                await response.aclose()
+                if await asyncio.to_thread(self.tokens.handle_unauthorized, token):
+                    continue
+                self.stop = True
+                raise AuthenticationError("Mixamo rejected the access token, please log in again.")
+
+            if response.status_code not in RETRY_STATUSES:
+                self.tracer.record("request", time.monotonic() - start, method=method,
+                                   endpoint=endpoint, status=response.status_code,
+                                   attempts=attempt + 1, wait=round(wait, 6))
+                return response
+
+            await response.aclose()
+            delay = get_retry_wait(attempt, backoff, response.headers)
+            if delay is None:
+                break
+            print(f"WARNING: {url} answered {response.status_code}, retrying")
+            await asyncio.sleep(delay)
+            backoff += delay
+
+        self.tracer.record("request", time.monotonic() - start, method=method,
+                           endpoint=endpoint, status=None, attempts=attempt + 1,
+                           wait=round(wait, 6))
+        raise Exception(f"Failed to complete request to {url} after {attempt + 1} attempts.")
+
+    async def get_characters_async(self):
+        """Coroutine equivalent of get_characters."""
+        if self.characters:
+            return self.get_characters()
+
+        character = await self.get_primary_character_async()
+        character_id = character.get("primary_character_id")
+        character_name = character.get("primary_character_name")
+
+        if not character_id:
+            return []
+        return [(character_id, character_name, self.path)]
+
+    async def get_primary_character_async(self):
+        """Coroutine equivalent of get_primary_character."""
+        account = get_account_key(self.tokens.get_token())
+        character = engine.character_store.lookup(account)
+        if character is not None:
+            return character
+
+        # Only one coroutine runs this per run, so the store's lock (which
+        # would block the event loop) isn't needed to fetch it only once.
+        response = await self.make_request_async(
+            "GET", f"{engine.API_URL}/characters/primary",
+            headers=HEADERS)
+        character = response.json()
+        engine.character_store.put(account, character)
+        return character
+
+    async def get_primary_character_id_async(self):
+        """Coroutine equivalent of get_primary_character_id."""
+        return (await self.get_primary_character_async()).get("primary_character_id")
+
+    async def get_primary_character_name_async(self):
+        """Coroutine equivalent of get_primary_character_name."""
+        return (await self.get_primary_character_async()).get("primary_character_name")
+
+    async def build_animation_payload_async(self, character_id, anim_id):
+        """Coroutine equivalent of build_animation_payload."""
+        with self.tracer.span("payload", anim_id=anim_id) as span:
+            product = await asyncio.to_thread(self.cache.get_product, character_id, anim_id)
+            span["cached"] = product is not None
+
+            if product is None:
+                response = await self.make_request_async(
+                    "GET", f"{engine.API_URL}/products/{anim_id}",
+                    params={"similar": 0, "character_id": character_id},
+                    headers=HEADERS)
+
+                product = response.json()
+                await asyncio.to_thread(self.cache.put_product, character_id, anim_id, product)
+
+            return await asyncio.to_thread(self.build_cached_payload, character_id, product)
+
+    async def export_animation_async(self, character_id, payload):
+        """Coroutine equivalent of export_animation."""
+        export_start = time.monotonic()
+        response = await self.make_request_async(
+            "POST", f"{engine.API_URL}/animations/export",
+            content=payload, headers=HEADERS)
+
+        if not 200 <= response.status_code < 300:
+            print(f"WARNING: Mixamo refused the export ({response.status_code}): "
+                  f"{response.text[:200]}")
+            self.tracer.record("export", time.monotonic() - export_start,
+                               character_id=character_id,
+                               status=response.status_code, polls=0)
+            return None
+        job_id = get_job_id(response)
+
+        # Check if the process is completed and retry if it's not,
+        # waiting as long as the poller says between every check.
+        status = None
+        polls = 0
+        delay = 0
+        start = time.monotonic()
+        for delay in self.poller.delays(export_start):
+            await asyncio.sleep(delay)
+
+            response = await self.make_request_async(
+                "GET", f"{engine.API_URL}/characters/{character_id}/monitor",
+                headers=HEADERS)
+            polls += 1
+
+            job = response.json()
+            status = job.get("status") if is_export_job(job, job_id) else None
+            if status in ("completed", "failed"):
+                break
+
+        self.poller.record(time.monotonic() - start, polls, status, delay)
+        if status == "failed":
+            print(f"WARNING: Mixamo failed to export the animation (job {job_id})")
+
+        self.tracer.record("export", time.monotonic() - export_start,
+                           character_id=character_id, status=status, polls=polls,
+                           submit_time=round(start - export_start, 6),
+                           poll_time=round(time.monotonic() - start, 6))
+
+        if status == "completed":
+            return job.get("job_result")
+        return None
+
+    async def download_animation_async(self, url, index, product_name, folder=None):
+        """Coroutine equivalent of download_animation.
+
+        :return: Downloaded file (with its 'path', 'size' and 'sha256')
+        :rtype: fileio.AtomicFile
+        """
+        if not url:
+            return
+
+        if folder is None:
+            folder = self.path
+
+        if folder:
+            await asyncio.to_thread(os.makedirs, folder, exist_ok=True)
+
+        with self.tracer.span("download", index=index) as span:
+            # Like any other request, downloads are retried and throttled
+            # by make_request_async. Their slot of the rate limiter is held
+            # until the whole file has been received.
+            response = await self.make_request_async("GET", url, stream=True)
+            try:
+                response.raise_for_status()
+
+                file = await write_stream_async(
+                    self.get_output_path(index, product_name, folder),
+                    response.aiter_bytes(CHUNK_SIZE), get_expected_size(response.headers),
+                    fsync=self.should_fsync())
+            finally:
+                await response.aclose()
+
+            span["bytes"] = file.size
+
+        return file
@@ -0,0 +1,71 @@
+# Stdlib modules
+import json
+
+
+def build_gms_hash(gms_hash, name=None):
+    """Build the 'gms_hash' Mixamo needs to export a motion.
+
+    The original is left untouched: product details are cached and hashed
+    to get the key of their payload, so they must stay as Mixamo returned
+    them.
+
+    :param gms_hash: 'gms_hash' of the motion in its product details
+    :type gms_hash: dict
+
+    :param name: Name of the motion (only needed for motions of a pack)
+    :type name: str
+
+    :return: New 'gms_hash' of the motion
+    :rtype: dict
+    """
+    gms_hash = dict(gms_hash)
+    if name is not None:
+        gms_hash["name"] = name
+    gms_hash["overdrive"] = 0
+
+    # Build a 'params' string depending on how many params the animation has.
+    # For example, if there are two params (Overdrive and Emotion), and their
+    # values are 1 and 0, the string will be "1,0".
+    gms_hash["params"] = ",".join(str(int(param[-1])) for param in gms_hash["params"])
+
+    return gms_hash
+
+
+def get_gms_hash_key(gms_hash):
+    """Get the key of a motion, telling it apart from its variants.
+
+    Packs list their motions with the 'gms_hash' of their product details,
+    while single animations are exported with a built one: both are
+    normalized, so that a motion has the same key whichever it comes from.
+    Variants of the same 'model-id' (e.g: mirrored, trimmed or in place)
+    have different keys.
+
+    :param gms_hash: 'gms_hash' of the motion, built or not
+    :type gms_hash: dict
+
+    :return: Key of the motion
+    :rtype: str
+    """
+    params = gms_hash.get("params") or []
+    if not isinstance(params, str):
+        params = ",".join(str(int(param[-1])) for param in params)
+
+    return json.dumps([
+        gms_hash.get("model-id"),
+        bool(gms_hash.get("mirror")),
+        [float(value) for value in gms_hash.get("trim") or []],
+        bool(gms_hash.get("inplace")),
+        int(gms_hash.get("arm-space") or 0),
+        params])
+
+
+def build_motion_gms_hash(motion):
+    """Build the 'gms_hash' Mixamo needs to export a motion of a pack.
+
+    :param motion: Motion listed in the details of a pack
+    :type motion: dict
+
+    :return: New 'gms_hash' of the motion
+    :rtype: dict
+    """
+    return build_gms_hash(motion["gms_hash"], motion["name"])
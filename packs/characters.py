@@ -0,0 +1,153 @@
+# Stdlib modules
+import json
+import os
+import threading
+import time
+
+
+# File where primary characters can be saved, so that later runs of the
+# command line tool don't have to request them again.
+CHARACTER_FILE = "mixamo_character.json"
+
+# Seconds a character saved on disk is trusted for, since it can also be
+# switched from outside the tool (e.g. on the website, in another browser).
+CHARACTER_TTL = 60 * 60
+
+
+class CharacterStore:
+    """Primary character of every account, fetched only once.
+
+    Mixamo's '/characters/primary' endpoint answers with both the ID and
+    the name of the character selected by the user. The answer is kept in
+    memory (and optionally on disk) per account, and shared by every run,
+    until the user selects or uploads another character ('invalidate').
+    """
+    def __init__(self, file_path=None, ttl=CHARACTER_TTL):
+        """Initialize the store.
+
+        :param file_path: JSON file where characters are saved. If not set,
+          they're only kept in memory.
+        :type file_path: str
+
+        :param ttl: Seconds a character read from disk is valid for
+        :type ttl: float
+        """
+        self.file_path = file_path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = None
+        # Per account locks, so that concurrent callers fetch only once.
+        self.fetch_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, account, fetch):
+        """Get the primary character of an account, fetching it if needed.
+
+        :param account: Account key (see 'auth.get_account_key')
+        :type account: str
+
+        :param fetch: Callable returning the answer of '/characters/primary'
+        :type fetch: callable
+
+        :return: Answer of '/characters/primary'
+        :rtype: dict
+        """
+        with self.lock:
+            fetch_lock = self.fetch_locks.setdefault(account, threading.Lock())
+
+        with fetch_lock:
+            character = self.lookup(account)
+            if character is not None:
+                return character
+
+            character = fetch()
+            self.put(account, character)
+            return character
+
+    def lookup(self, account):
+        """Get the primary character of an account, if it's known.
+
+        :param account: Account key
+        :type account: str
+
+        :return: Answer of '/characters/primary', or None
+        :rtype: dict
+        """
+        with self.lock:
+            entry = self._load().get(account)
+
+            if entry is None or time.time() - entry["time"] > self.ttl:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return {
+                "primary_character_id": entry["id"],
+                "primary_character_name": entry["name"]}
+
+    def put(self, account, character):
+        """Save the primary character of an account.
+
+        :param account: Account key
+        :type account: str
+
+        :param character: Answer of '/characters/primary'
+        :type character: dict
+        """
+        # There's nothing worth keeping if the request failed.
+        if not character.get("primary_character_id"):
+            return
+
+        with self.lock:
+            self._load()[account] = {
+                "id": character["primary_character_id"],
+                "name": character.get("primary_character_name"),
+                "time": time.time()}
+            self._save()
+
+    def invalidate(self, account=None):
+        """Forget the primary character of an account (or of all of them).
+
+        This is to be called whenever the user selects or uploads another
+        character. It can be called from any thread.
+
+        :param account: Account key. If not set, every account is forgotten.
+        :type account: str
+
+        :return: IDs of the characters forgotten
+        :rtype: list
+        """
+        with self.lock:
+            entries = self._load()
+            if account is None:
+                forgotten = list(entries.values())
+                self.entries = {}
+            else:
+                forgotten = [entries.pop(account)] if account in entries else []
+            self._save()
+
+        return [entry["id"] for entry in forgotten]
+
+    def _load(self):
+        if self.entries is not None:
+            return self.entries
+
+        self.entries = {}
+        if self.file_path and os.path.exists(self.file_path):
+            try:
+                with open(self.file_path, "r") as file:
+                    self.entries = json.load(file)
+            except (OSError, ValueError):
+                pass
+        return self.entries
+
+    def _save(self):
+        if not self.file_path:
+            return
+
+        try:
+            with open(self.file_path, "w") as file:
+                json.dump(self.entries, file)
+        except OSError as e:
+            print(f"WARNING: Couldnt save the primary character: {e}")
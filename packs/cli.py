@@ -0,0 +1,200 @@
+"""Download animations from Mixamo without the UI.
+
+Nothing here imports Qt, so it starts in a fraction of a second and needs
+no display, which makes it suitable for scripts and render farms. The
+access token is the one the UI reads from the browser once logged in to
+Mixamo (the 'access_token' item of the local storage). Usage:
+
+    python -m cli --token TOKEN --mode query --query "walk*" --output out
+"""
+# Stdlib modules
+import argparse
+import os
+import sys
+import threading
+
+# Local modules
+import async_downloader
+import engine
+from async_downloader import AsyncMixamoEngine
+from auth import (TOKEN_ENV, TOKEN_FILE, CachedTokenProvider, EnvTokenProvider,
+                  FileTokenProvider, StaticTokenProvider)
+from characters import CHARACTER_FILE, CharacterStore
+from engine import MixamoEngine, load_characters
+from writer import FSYNC_POLICIES
+
+
+MODES = ("all", "query", "new", "tpose")
+
+
+class Progress:
+    """Show the progress of the engine on a single line of stderr."""
+    def __init__(self, stream=sys.stderr):
+        self.stream = stream
+        self.total = 0
+        # Only redraw the line when it's shown in a terminal.
+        self.interactive = stream.isatty()
+
+    def set_total(self, total):
+        self.total = total
+
+    def update(self, task):
+        if self.interactive:
+            self.stream.write(f"\r[{task}/{self.total}]")
+            self.stream.flush()
+
+
+def get_token_provider(args):
+    """Get where the access token comes from, by order of preference.
+
+    A token given on the command line or in the environment can't be
+    renewed, while a token file is read again when the token expires
+    (e.g. after another process has written a new one to it).
+
+    :return: Token provider
+    :rtype: auth.TokenProvider
+    """
+    if args.token:
+        return StaticTokenProvider(args.token)
+    if args.token_file:
+        return FileTokenProvider(args.token_file)
+    if os.environ.get(TOKEN_ENV):
+        return EnvTokenProvider()
+    return CachedTokenProvider()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--token", help="Mixamo access token")
+    parser.add_argument("--token-file",
+                        help="file with the access token, read again whenever it expires")
+    parser.add_argument("--mode", choices=MODES, default="all")
+    parser.add_argument("--query", help="words to search for in the query mode")
+    parser.add_argument("--output", required=True, help="output folder")
+    parser.add_argument("--retry", action="store_true",
+                        help="skip the animations already downloaded to the output folder")
+    parser.add_argument("--characters",
+                        help="JSON file with the characters of the batch mode")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="use the asyncio backend (needs httpx)")
+    parser.add_argument("--cache-character", action="store_true",
+                        help=f"save the primary character to {CHARACTER_FILE} and reuse it "
+                             "in later runs (for up to an hour)")
+    parser.add_argument("--forget-exports", action="store_true",
+                        help="forget the exports downloaded by earlier runs, so that "
+                             "they're exported again instead of copied")
+    # Only single animations can be batched (packs are already exported
+    # as a whole).
+    if hasattr(engine, "EXPORT_BATCH_SIZE"):
+        parser.add_argument("--batch-size", type=int, default=engine.EXPORT_BATCH_SIZE,
+                            help="number of animations exported at once, in a single "
+                                 "archive (threaded backend only)")
+    # Single animations can be exported as part of the packs they're in.
+    if hasattr(engine, "USE_PACKS"):
+        parser.add_argument("--use-packs", action="store_true",
+                            help="export the animations as part of packs when that needs "
+                                 "fewer exports (threaded backend only)")
+        parser.add_argument("--pack-catalog", default=engine.PACK_CATALOG_FILE,
+                            help="JSON file with the IDs of the packs")
+    # Only packs are archives that can be extracted.
+    if hasattr(engine, "EXTRACT_PACKS"):
+        parser.add_argument("--extract", action="store_true",
+                            help="extract every pack to its own folder once downloaded "
+                                 "(threaded backend only)")
+    parser.add_argument("--write-workers", type=int, default=engine.WRITE_WORKERS,
+                        help="number of threads writing the downloaded files, so that "
+                             "a slow output folder doesn't slow the downloads down "
+                             "(threaded backend only, 0 to write them as they're received)")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default=engine.FSYNC_POLICY,
+                        help="when the downloaded files are flushed to disk: before "
+                             "each of them is renamed, all at once at the end, or never")
+    parser.add_argument("--trace-folder", default=engine.TRACE_FOLDER,
+                        help="folder where the trace of every run is saved "
+                             "(an empty string not to save them)")
+    parser.add_argument("--max-traces", type=int, default=engine.MAX_TRACES,
+                        help="number of traces kept in the trace folder, the oldest "
+                             "being removed first (0 to keep them all)")
+    parser.add_argument("--api-url", default=engine.API_URL,
+                        help="base URL of the Mixamo API (e.g. a mock server)")
+    args = parser.parse_args(argv)
+
+    token_provider = get_token_provider(args)
+    if not token_provider.get_token():
+        parser.error(f"an access token is needed (--token, --token-file, ${TOKEN_ENV}, "
+                     f"or a valid one cached by the UI in {TOKEN_FILE})")
+    if args.mode == "query" and not args.query:
+        parser.error("the query mode needs --query")
+    if args.use_async and not async_downloader.is_available():
+        parser.error("the asyncio backend needs httpx (pip install httpx)")
+    batch_size = getattr(args, "batch_size", 1)
+    if batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.use_async and batch_size > 1:
+        parser.error("batched exports are only supported by the threaded backend")
+    use_packs = getattr(args, "use_packs", False)
+    if args.use_async and use_packs:
+        parser.error("pack exports are only supported by the threaded backend")
+    if use_packs and not os.path.isfile(args.pack_catalog):
+        parser.error(f"the pack catalog {args.pack_catalog} doesn't exist (--pack-catalog)")
+    if args.write_workers < 0:
+        parser.error("--write-workers can't be negative")
+    if args.use_async and args.write_workers:
+        parser.error("the writer stage is only supported by the threaded backend")
+    extract = getattr(args, "extract", False)
+    if args.use_async and extract:
+        parser.error("extracting packs is only supported by the threaded backend")
+    if args.max_traces < 0:
+        parser.error("--max-traces can't be negative")
+
+    engine.API_URL = args.api_url
+    engine.WRITE_WORKERS = args.write_workers
+    engine.FSYNC_POLICY = args.fsync
+    engine.TRACE_FOLDER = args.trace_folder
+    engine.MAX_TRACES = args.max_traces
+    if batch_size > 1:
+        engine.EXPORT_BATCH_SIZE = batch_size
+    if use_packs:
+        engine.USE_PACKS = True
+        engine.PACK_CATALOG_FILE = args.pack_catalog
+    if extract:
+        engine.EXTRACT_PACKS = True
+    if args.cache_character:
+        engine.character_store = CharacterStore(CHARACTER_FILE)
+
+    characters = None
+    if args.characters:
+        characters = load_characters(args.characters)
+
+    engine_cls = AsyncMixamoEngine if args.use_async else MixamoEngine
+    worker = engine_cls(args.output, args.mode, args.query, args.retry, characters,
+                        token_provider)
+    if args.forget_exports:
+        print(f"Forgot {worker.exports.clear()} exports")
+
+    progress = Progress()
+    finished = threading.Event()
+    worker.total_tasks.connect(progress.set_total)
+    worker.current_task.connect(progress.update)
+    worker.finished.connect(finished.set)
+
+    # Run the engine on its own thread, so that Ctrl+C can stop it cleanly
+    # (letting the current downloads finish) instead of killing it.
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+
+    try:
+        while thread.is_alive():
+            thread.join(0.5)
+    except KeyboardInterrupt:
+        print("Stopping, waiting for the current downloads to finish...")
+        worker.stop = True
+        thread.join()
+
+    if progress.interactive:
+        sys.stderr.write("\n")
+
+    return 0 if finished.is_set() and not worker.stop else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
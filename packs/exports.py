@@ -0,0 +1,219 @@
+# Stdlib modules
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+
+# Local modules
+from fileio import check_file
+
+
+class ExportFailedError(Exception):
+    """The export an animation was waiting for couldn't be done."""
+
+
+def export_key(payload):
+    """Get the key of an export.
+
+    Mixamo returns the same file for the same payload (character, motion
+    and preferences), so the key is a hash of its content. Keys don't
+    depend on the order of the keys of the payload.
+
+    :param payload: Export payload
+    :type payload: str
+
+    :return: Export key
+    :rtype: str
+    """
+    content = json.dumps(json.loads(payload), sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def get_job_id(response):
+    """Get the ID of the export job started by an export request.
+
+    :param response: Answer to the export request
+    :type response: requests.Response
+
+    :return: Job ID, or None if Mixamo didn't send any
+    :rtype: str
+    """
+    try:
+        job = response.json()
+    except ValueError:
+        return None
+    return job.get("uuid") if isinstance(job, dict) else None
+
+
+def is_export_job(job, job_id):
+    """Check whether the monitor of a character reports a given export job.
+
+    A character runs one export at a time, and its monitor reports the
+    latest one: right after an export has been sent, it may still report
+    the previous one, completed. Jobs can only be told apart by their ID,
+    so when Mixamo doesn't send it, any job is taken for the one sent.
+
+    :param job: Answer of the monitor
+    :type job: dict
+
+    :param job_id: ID of the job sent (see 'get_job_id')
+    :type job_id: str
+
+    :rtype: bool
+    """
+    return job_id is None or job.get("uuid", job_id) == job_id
+
+
+class ExportStore:
+    """Files already exported, so that identical exports are only done once.
+
+    Before exporting, callers 'join' the export of their payload:
+
+    - If it has already been downloaded (in this run or an earlier one)
+      and the file is still there, unchanged, they get that file.
+    - If the same export is running right now, they wait for it.
+    - Otherwise they run it ("leader"), and must 'complete' or 'abandon'
+      it, which also releases everyone waiting for it.
+
+    Followers get the file the leader downloaded (a dictionary with its
+    'path', 'size' and 'sha256'), and only have to copy it. The store can
+    be shared by several threads.
+    """
+    def __init__(self, cache):
+        """Initialize the store.
+
+        :param cache: Cache where downloaded exports are recorded
+        :type cache: cache.ProductCache
+        """
+        self.cache = cache
+        self.lock = threading.Lock()
+        # Futures of the exports running right now, by key.
+        self.flights = {}
+        self.reused = 0
+        self.coalesced = 0
+
+    def join(self, key):
+        """Join the export of a payload.
+
+        :param key: Export key (see 'export_key')
+        :type key: str
+
+        :return: Future of the downloaded file, and whether the caller is
+          the leader (i.e: has to do the export itself)
+        :rtype: tuple
+        """
+        with self.lock:
+            future = self.flights.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+
+        # Hashing the file can take a while, so it's not done under the lock.
+        artifact = self.lookup(key)
+
+        with self.lock:
+            if artifact is not None:
+                self.reused += 1
+                future = Future()
+                future.set_result(artifact)
+                return future, False
+
+            # Someone else may have started it in the meantime.
+            future = self.flights.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+
+            future = self.flights[key] = Future()
+            return future, True
+
+    def lookup(self, key):
+        """Get the downloaded file of an export, if it's still on disk.
+
+        The file is only hashed again if it's been modified since it was
+        downloaded (see 'fileio.check_file').
+
+        :param key: Export key
+        :type key: str
+
+        :return: File 'path', 'size' and 'sha256', or None
+        :rtype: dict
+        """
+        artifact = self.cache.get_export(key)
+        if artifact is None:
+            return None
+
+        try:
+            if check_file(artifact["path"], artifact["size"], artifact["sha256"],
+                          artifact.get("mtime_ns")) is not None:
+                return artifact
+        except OSError:
+            pass
+
+        # The file has been deleted or modified since it was downloaded.
+        self.cache.remove_export(key)
+        return None
+
+    def complete(self, key, character_id, file):
+        """Record the file an export has been downloaded to.
+
+        :param key: Export key
+        :type key: str
+
+        :param character_id: Character ID the export was done for
+        :type character_id: str
+
+        :param file: Downloaded file
+        :type file: fileio.AtomicFile
+        """
+        path = os.path.abspath(file.path)
+        artifact = {"path": path, "size": file.size, "sha256": file.sha256,
+                    "mtime_ns": os.stat(path).st_mtime_ns}
+        self.cache.put_export(key, character_id, artifact)
+
+        with self.lock:
+            future = self.flights.pop(key, None)
+        if future is not None:
+            future.set_result(artifact)
+
+    def abandon(self, key, error=None):
+        """Give up an export, failing everyone waiting for it.
+
+        Nothing is done if it has already been completed, so this can be
+        called whatever happened (e.g: in a 'finally' clause).
+
+        :param key: Export key
+        :type key: str
+
+        :param error: Why it failed
+        :type error: Exception
+        """
+        with self.lock:
+            future = self.flights.pop(key, None)
+        if future is not None:
+            future.set_exception(error or ExportFailedError(f"Export {key} failed"))
+
+    def clear(self, character_id=None):
+        """Forget the exports downloaded by earlier runs (e.g: if some of
+        their files aren't the right ones), so that they're done again.
+
+        Their files are left on disk.
+
+        :param character_id: Character ID (None for every character)
+        :type character_id: str
+
+        :return: Number of exports forgotten
+        :rtype: int
+        """
+        return self.cache.clear_exports(character_id)
+
+    def stats(self):
+        """Get how many exports have been saved in this run.
+
+        :return: Number of exports reused from disk and coalesced with a
+          running one
+        :rtype: dict
+        """
+        with self.lock:
+            return {"reused": self.reused, "coalesced": self.coalesced}
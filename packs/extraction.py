@@ -0,0 +1,227 @@
+# Stdlib modules
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Local modules
+from fileio import CHUNK_SIZE, write_stream
+from writer import FSYNC_POLICIES, flush_files
+
+
+# Number of threads extracting archives at the same time.
+EXTRACT_WORKERS = 2
+
+# How many downloaded archives may wait for an extraction thread. Any
+# other archive is extracted once the downloads are over.
+EXTRACT_BACKLOG = 8
+
+
+class PackExtractor:
+    """Extract pack archives in the background, as soon as they're downloaded.
+
+    Archives are extracted on a pool of their own, so downloads never wait
+    for them: when 'workers' archives are being extracted and 'backlog'
+    more are waiting, the next ones are only remembered (they're already
+    on disk) and extracted by 'close', once the downloads are over.
+
+    Every archive is extracted to a folder named after it, next to it.
+    Members are streamed to disk one chunk at a time, to temporary files
+    renamed once complete (see 'fileio.AtomicFile'), and every part of
+    their path goes through the same rules as the names of downloaded
+    files, so no member can be written outside of its folder. Members
+    whose paths end up the same (e.g: "Walk?.fbx" and "Walk*.fbx") get a
+    numbered suffix rather than overwriting each other. They're flushed to
+    disk like the downloaded files (see 'writer.FSYNC_POLICIES').
+
+    Usage:
+
+        extractor = PackExtractor(engine.sanitize_filename, engine.tracer)
+        extractor.submit("1_Pack.zip")
+        ...
+        stats = extractor.close()
+    """
+    def __init__(self, sanitize, tracer, workers=EXTRACT_WORKERS,
+                 backlog=EXTRACT_BACKLOG, fsync="always"):
+        """Initialize the extractor.
+
+        :param sanitize: Callable cleaning up a file name (without extension)
+        :type sanitize: callable
+
+        :param tracer: Tracer the extractions are recorded to
+        :type tracer: tracing.Tracer
+
+        :param workers: Number of archives extracted at the same time
+        :type workers: int
+
+        :param backlog: Number of archives that may wait for a thread
+        :type backlog: int
+
+        :param fsync: When extracted files are flushed to disk (see
+          'writer.FSYNC_POLICIES')
+        :type fsync: str
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+
+        self.sanitize = sanitize
+        self.tracer = tracer
+        self.fsync = fsync
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="extract")
+        self.slots = threading.BoundedSemaphore(workers + backlog)
+        self.lock = threading.Lock()
+        self.futures = []
+        self.deferred = []
+        # Files to flush to disk when closed ("end" policy).
+        self.unsynced = []
+
+        self.archives = 0
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+
+    def submit(self, path):
+        """Extract an archive in the background (never blocks).
+
+        :param path: Archive path
+        :type path: str
+        """
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.deferred.append(path)
+            return
+
+        self._start(path)
+
+    def close(self, cancel=False):
+        """Extract the archives left, and wait for every extraction.
+
+        :param cancel: Whether to skip the archives that haven't started yet
+          (e.g: if the run has been stopped)
+        :type cancel: bool
+
+        :return: Number of archives and files extracted, bytes written,
+          archives that failed, and archives deferred until now
+        :rtype: dict
+        """
+        with self.lock:
+            deferred, self.deferred = self.deferred, []
+
+        if not cancel:
+            for path in deferred:
+                self.slots.acquire()
+                self._start(path)
+
+        wait(self.futures)
+        self.pool.shutdown()
+
+        with self.lock:
+            unsynced, self.unsynced = self.unsynced, []
+        flush_files(unsynced)
+
+        return {"archives": self.archives, "files": self.files, "bytes": self.bytes,
+                "failed": self.failed, "deferred": len(deferred)}
+
+    def get_folder(self, path):
+        """Get the folder an archive is extracted to (its path, without '.zip')."""
+        return os.path.splitext(path)[0]
+
+    def get_member_path(self, folder, member):
+        """Get the path a member of an archive is extracted to.
+
+        :param folder: Folder of the archive
+        :type folder: str
+
+        :param member: Name of the member in the archive
+        :type member: str
+
+        :return: File path, or None if nothing is left of its name
+        :rtype: str
+        """
+        *parents, file_name = member.replace("\\", "/").split("/")
+        name, extension = os.path.splitext(file_name)
+
+        parts = [self.sanitize(part) for part in parents]
+        parts.append(self.sanitize(name))
+        if not parts[-1]:
+            return None
+
+        if extension:
+            parts[-1] += "." + self.sanitize(extension[1:])
+        return os.path.join(folder, *[part for part in parts if part])
+
+    def get_unique_path(self, path, taken):
+        """Get a path no other member of the archive has been extracted to.
+
+        Paths are compared regardless of case, since the output folder may
+        not tell them apart.
+
+        :param path: Path of the member (see 'get_member_path')
+        :type path: str
+
+        :param taken: Paths of the members extracted so far (updated)
+        :type taken: set
+
+        :return: Path, with a numbered suffix if it was taken
+        :rtype: str
+        """
+        base, extension = os.path.splitext(path)
+        number = 1
+        while os.path.normcase(path).lower() in taken:
+            number += 1
+            path = f"{base}_{number}{extension}"
+
+        taken.add(os.path.normcase(path).lower())
+        return path
+
+    def _start(self, path):
+        future = self.pool.submit(self._extract, path)
+        future.add_done_callback(lambda _: self.slots.release())
+        with self.lock:
+            self.futures.append(future)
+
+    def _extract(self, path):
+        try:
+            with self.tracer.span("unpack", archive=os.path.basename(path)) as span:
+                files, size = self._extract_members(path)
+                span["files"] = files
+                span["bytes"] = size
+        except Exception as e:
+            print(f"WARNING: Couldnt extract {path}: {e!r}")
+            with self.lock:
+                self.failed += 1
+            return
+
+        with self.lock:
+            self.archives += 1
+            self.files += files
+            self.bytes += size
+
+    def _extract_members(self, path):
+        folder = self.get_folder(path)
+        files = 0
+        size = 0
+        taken = set()
+
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                member_path = None if info.is_dir() else self.get_member_path(
+                    folder, info.filename)
+                if member_path is None:
+                    continue
+
+                member_path = self.get_unique_path(member_path, taken)
+                os.makedirs(os.path.dirname(member_path), exist_ok=True)
+                with archive.open(info) as member:
+                    file = write_stream(member_path,
+                        iter(lambda: member.read(CHUNK_SIZE), b""), info.file_size,
+                        self.fsync == "always")
+
+                if self.fsync == "end":
+                    with self.lock:
+                        self.unsynced.append(file.path)
+
+                files += 1
+                size += file.size
+
+        return files, size
@@ -0,0 +1,241 @@
+# Stdlib modules
+import hashlib
+import os
+
+
+# Size of the chunks downloads are written in (in bytes).
+CHUNK_SIZE = 64 * 1024
+
+# Suffix of the temporary files downloads are written to.
+PARTIAL_SUFFIX = ".part"
+
+
+class IncompleteDownloadError(Exception):
+    """The number of bytes written doesn't match the expected size."""
+
+
+class AtomicFile:
+    """File that only shows up at its final path once it's complete.
+
+    Data is written to a temporary file next to the final one, which is
+    flushed to disk and renamed when the context manager exits. If anything
+    goes wrong (an exception, or a size that doesn't match the expected
+    one), the temporary file is removed, so a crash never leaves a truncated
+    file behind.
+
+    The size and SHA-256 checksum of the data are computed while writing.
+
+    Usage:
+
+        with AtomicFile("1_Walking.fbx", expected_size=1024) as file:
+            for chunk in chunks:
+                file.write(chunk)
+    """
+    def __init__(self, path, expected_size=None, fsync=True):
+        """Initialize the file.
+
+        :param path: Final path of the file
+        :type path: str
+
+        :param expected_size: Expected size in bytes (None to skip the check)
+        :type expected_size: int
+
+        :param fsync: Whether to flush the data to disk before renaming
+        :type fsync: bool
+        """
+        self.path = path
+        self.temp_path = path + PARTIAL_SUFFIX
+        self.expected_size = expected_size
+        self.fsync = fsync
+        self.size = 0
+        self.hash = hashlib.sha256()
+
+    def __enter__(self):
+        self.file = open(self.temp_path, "wb")
+        return self
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.size += len(chunk)
+        self.hash.update(chunk)
+
+    @property
+    def sha256(self):
+        return self.hash.hexdigest()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            with self.file:
+                if exc_type is None:
+                    self.file.flush()
+                    if self.fsync:
+                        os.fsync(self.file.fileno())
+
+            if exc_type is None:
+                if self.expected_size is not None and self.size != self.expected_size:
+                    raise IncompleteDownloadError(
+                        f"{self.path}: got {self.size} bytes, expected {self.expected_size}")
+
+                os.replace(self.temp_path, self.path)
+
+        finally:
+            # The temporary file is only left if it couldn't be completed.
+            if os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
+
+
+def write_stream(path, chunks, expected_size=None, fsync=True):
+    """Write an iterable of chunks to a file atomically.
+
+    :param path: Final path of the file
+    :type path: str
+
+    :param chunks: Chunks of bytes
+    :type chunks: iterable
+
+    :param expected_size: Expected size in bytes (None to skip the check)
+    :type expected_size: int
+
+    :param fsync: Whether to flush the data to disk before renaming
+    :type fsync: bool
+
+    :return: Written file (with its 'size' and 'sha256')
+    :rtype: AtomicFile
+    """
+    with AtomicFile(path, expected_size, fsync) as file:
+        for chunk in chunks:
+            file.write(chunk)
+
+    return file
+
+
+def read_chunks(path):
+    """Read a file in chunks.
+
+    :param path: File path
+    :type path: str
+
+    :return: Chunks of bytes
+    :rtype: generator
+    """
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            yield chunk
+
+
+def hash_file(path):
+    """Get the SHA-256 checksum of a file.
+
+    :param path: File path
+    :type path: str
+
+    :return: Checksum (hex)
+    :rtype: str
+    """
+    sha256 = hashlib.sha256()
+    for chunk in read_chunks(path):
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def check_file(path, size, sha256, mtime_ns=None):
+    """Check that a file is still the one that was recorded.
+
+    Hashing a whole file takes a while, so it's only done if the file has
+    been modified since it was recorded (or if that time isn't known).
+
+    :param path: File path
+    :type path: str
+
+    :param size: Recorded size
+    :type size: int
+
+    :param sha256: Recorded checksum
+    :type sha256: str
+
+    :param mtime_ns: Recorded modification time (see 'os.stat')
+    :type mtime_ns: int
+
+    :return: Current modification time if the file is unchanged, None
+      otherwise
+    :rtype: int
+
+    :raises OSError: If the file can't be read
+    """
+    stat = os.stat(path)
+    if stat.st_size != size:
+        return None
+    if stat.st_mtime_ns == mtime_ns:
+        return mtime_ns
+    if hash_file(path) != sha256:
+        return None
+    return stat.st_mtime_ns
+
+
+def copy_file(source, path, expected_size=None, fsync=True):
+    """Copy a file atomically (the source can be the file itself).
+
+    :param source: Path of the file to copy
+    :type source: str
+
+    :param path: Final path of the copy
+    :type path: str
+
+    :param expected_size: Expected size in bytes (None to skip the check)
+    :type expected_size: int
+
+    :param fsync: Whether to flush the data to disk before renaming
+    :type fsync: bool
+
+    :return: Written file (with its 'size' and 'sha256')
+    :rtype: AtomicFile
+    """
+    return write_stream(path, read_chunks(source), expected_size, fsync)
+
+
+def link_file(source, path, fsync=True):
+    """Hard link a file atomically, or copy it if it can't be linked (e.g:
+    across file systems).
+
+    :param source: Path of the file to link
+    :type source: str
+
+    :param path: Final path of the link
+    :type path: str
+
+    :param fsync: Whether to flush a copy to disk before renaming it
+    :type fsync: bool
+
+    :return: True if it's been linked, False if it's been copied
+    :rtype: bool
+    """
+    temp_path = path + PARTIAL_SUFFIX
+    try:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        os.link(source, temp_path)
+    except OSError:
+        copy_file(source, path, fsync=fsync)
+        return False
+
+    os.replace(temp_path, path)
+    return True
+
+
+def get_expected_size(headers):
+    """Get the size a download should have from its response headers.
+
+    The Content-Length of a compressed response is the size of the
+    compressed body, not of what gets written to disk, so it's ignored.
+
+    :param headers: Response headers
+    :type headers: Mapping
+
+    :return: Expected size in bytes, or None if unknown
+    :rtype: int
+    """
+    if headers.get("Content-Encoding", "identity") != "identity":
+        return None
+
+    length = headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
@@ -0,0 +1,260 @@
+# Stdlib modules
+import queue
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+# Number of threads fetching product details ahead of the export stage.
+LOOKUP_WORKERS = 8
+
+# Number of threads streaming finished exports to disk.
+DOWNLOAD_WORKERS = 4
+
+# How many looked-up items may wait in front of the export stage.
+LOOKAHEAD = 32
+
+# Marker used to tell a stage that there's no more work coming.
+_DONE = object()
+
+
+class DownloadPipeline:
+    """Run the lookup, export and download steps as overlapping stages.
+
+    Mixamo only lets one export run at a time for a given character (the
+    '/characters/{id}/monitor' endpoint reports a single job), so exports
+    must be serialized. Fetching product details and downloading finished
+    files don't have that restriction, so they're run on their own thread
+    pools and never wait for the export slot:
+
+      items --> [lookup pool] --> [export thread] --> [download pool]
+
+    Every stage is a plain callable that receives an item (a dictionary)
+    and returns it, so the pipeline knows nothing about Mixamo itself.
+
+    - 'lookup' returns the item with its payload, or None to skip it.
+    - 'export' returns the item with its download URL, or None if failed.
+    - 'download' writes the file to disk, or returns a future done once
+      it's been written (e.g: by a writer stage of its own).
+
+    The export stage can also take several items at once ('export_batch'),
+    as many as are waiting in front of it (up to 'batch_size'), and return
+    the list of those that can be downloaded.
+
+    'on_done' is invoked exactly once per item, whatever stage it ended in
+    (once its file has been written, if it's downloaded), and 'on_error'
+    whenever a stage raises an exception.
+    """
+    def __init__(self, lookup, export, download, on_done=None, on_error=None,
+                 should_stop=None, lookup_workers=LOOKUP_WORKERS,
+                 download_workers=DOWNLOAD_WORKERS, lookahead=LOOKAHEAD,
+                 export_batch=None, batch_size=1):
+        """Initialize the pipeline.
+
+        :param lookup: Callable that builds the export payload of an item
+        :type lookup: callable
+
+        :param export: Callable that exports an item and gets its URL
+        :type export: callable
+
+        :param download: Callable that downloads an item to disk
+        :type download: callable
+
+        :param on_done: Callable invoked once an item has been processed
+        :type on_done: callable
+
+        :param on_error: Callable invoked with the item and the exception
+        :type on_error: callable
+
+        :param should_stop: Callable that returns True to cancel the run
+        :type should_stop: callable
+
+        :param lookup_workers: Number of product lookup threads
+        :type lookup_workers: int
+
+        :param download_workers: Number of download threads
+        :type download_workers: int
+
+        :param lookahead: Max items waiting in front of the export stage
+        :type lookahead: int
+
+        :param export_batch: Callable that exports a list of items and
+          returns the ones that can be downloaded
+        :type export_batch: callable
+
+        :param batch_size: Max number of items exported at once (only used
+          if 'export_batch' is set)
+        :type batch_size: int
+        """
+        self.lookup = lookup
+        self.export = export
+        self.download = download
+        self.on_done = on_done or (lambda item: None)
+        self.on_error = on_error or (lambda item, error: None)
+        self.should_stop = should_stop or (lambda: False)
+        self.lookup_workers = lookup_workers
+        self.download_workers = download_workers
+        self.lookahead = lookahead
+        self.export_batch = export_batch
+        self.batch_size = batch_size if export_batch else 1
+
+    def run(self, items):
+        """Push every item through the pipeline and wait until it's drained.
+
+        :param items: Items to process (dictionaries)
+        :type items: iterable
+        """
+        lookup_queue = queue.Queue(self.lookahead)
+        export_queue = queue.Queue(self.lookahead)
+
+        # Start the lookup threads and the single export thread.
+        lookup_threads = [
+            threading.Thread(target=self._lookup_worker,
+                             args=(lookup_queue, export_queue), daemon=True)
+            for _ in range(self.lookup_workers)]
+
+        # Limit how many exported items can be waiting for a download
+        # thread, so that a slow disk doesn't make the queue grow forever.
+        download_slots = threading.BoundedSemaphore(self.download_workers * 2)
+
+        with ThreadPoolExecutor(self.download_workers) as download_pool:
+            export_thread = threading.Thread(
+                target=self._export_worker,
+                args=(export_queue, download_pool, download_slots),
+                daemon=True)
+
+            for thread in lookup_threads:
+                thread.start()
+            export_thread.start()
+
+            # Feed the pipeline. Putting items in a bounded queue keeps the
+            # lookups only a few items ahead of the export stage.
+            for item in items:
+                if self.should_stop():
+                    break
+                lookup_queue.put(item)
+
+            # Tell every lookup thread there's nothing else to do, and wait
+            # for them before closing the export stage.
+            for _ in lookup_threads:
+                lookup_queue.put(_DONE)
+            for thread in lookup_threads:
+                thread.join()
+
+            export_queue.put(_DONE)
+            export_thread.join()
+
+    def _lookup_worker(self, lookup_queue, export_queue):
+        while True:
+            item = lookup_queue.get()
+            if item is _DONE:
+                return
+
+            # Once a stop has been requested, just drain the queue.
+            if self.should_stop():
+                continue
+
+            result = self._call(self.lookup, item)
+            if result is None:
+                self.on_done(item)
+                continue
+
+            export_queue.put(result)
+
+    def _export_worker(self, export_queue, download_pool, download_slots):
+        while True:
+            item = export_queue.get()
+            if item is _DONE:
+                return
+
+            if self.should_stop():
+                continue
+
+            batch, done = [item], False
+            if self.batch_size > 1:
+                batch, done = self._get_batch(item, export_queue)
+                results = self._call_batch(batch)
+            else:
+                result = self._call(self.export, item)
+                results = [] if result is None else [result]
+
+            # Items that won't be downloaded are done already.
+            downloaded = {id(result) for result in results}
+            for item in batch:
+                if id(item) not in downloaded:
+                    self.on_done(item)
+
+            for result in results:
+                download_slots.acquire()
+                download_pool.submit(self._download_worker, result, download_slots)
+
+            if done:
+                return
+
+    def _get_batch(self, item, export_queue):
+        """Get the items waiting in front of the export stage, up to
+        'batch_size'. Batches are never waited for to fill up.
+
+        :return: Items, and whether the end of the queue has been reached
+        :rtype: tuple
+        """
+        batch = [item]
+        while len(batch) < self.batch_size:
+            try:
+                item = export_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _call_batch(self, batch):
+        """Export a batch of items, printing any error instead of raising it.
+
+        :return: Items to download
+        :rtype: list
+        """
+        try:
+            return self.export_batch(batch)
+        except Exception as e:
+            print(f"WARNING: {self.export_batch.__name__} failed for "
+                  f"{[item.get('anim_id') for item in batch]}:")
+            traceback.print_exc()
+            for item in batch:
+                self.on_error(item, e)
+            return []
+
+    def _download_worker(self, item, download_slots):
+        try:
+            result = self._call(self.download, item)
+            if isinstance(result, Future):
+                result.add_done_callback(lambda future: self._finish(item, future))
+            else:
+                self.on_done(item)
+        finally:
+            download_slots.release()
+
+    def _finish(self, item, future):
+        """Complete an item once the file its download left to be written
+        has been (or couldn't be).
+        """
+        error = future.exception()
+        if error is not None:
+            print(f"WARNING: {self.download.__name__} failed for {item.get('anim_id')}: "
+                  f"{error!r}")
+            self.on_error(item, error)
+        self.on_done(item)
+
+    def _call(self, stage, item):
+        """Run a stage on an item, printing any error instead of raising it.
+
+        A single broken animation shouldn't take the whole run down.
+        """
+        try:
+            return stage(item)
+        except Exception as e:
+            print(f"WARNING: {stage.__name__} failed for {item.get('anim_id')}:")
+            traceback.print_exc()
+            self.on_error(item, e)
+            return None
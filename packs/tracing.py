@@ -0,0 +1,210 @@
+# Stdlib modules
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Local modules
+from polling import percentile
+
+
+# Folder where the trace of every run is saved...
+TRACE_FOLDER = "traces"
+# ...and how many traces are kept there (the oldest are removed first).
+MAX_TRACES = 20
+
+# Percentiles shown in the summary of a run.
+PERCENTILES = (50, 95, 99)
+
+
+def get_trace_path(folder=TRACE_FOLDER, keep=MAX_TRACES):
+    """Get a new trace file path, named after the current time.
+
+    Older traces are removed from the folder, so that there are at most
+    'keep' of them once the new one is written.
+
+    :param folder: Folder where traces are saved
+    :type folder: str
+
+    :param keep: Number of traces kept (0 to keep them all)
+    :type keep: int
+
+    :return: Trace file path
+    :rtype: str
+    """
+    if keep:
+        prune_traces(folder, keep - 1)
+
+    name = time.strftime("trace_%Y%m%d_%H%M%S") + f"_{os.getpid()}.jsonl"
+    return os.path.join(folder, name)
+
+
+def prune_traces(folder=TRACE_FOLDER, keep=MAX_TRACES):
+    """Remove the oldest traces of a folder.
+
+    :param folder: Folder where traces are saved
+    :type folder: str
+
+    :param keep: Number of traces kept
+    :type keep: int
+
+    :return: Number of traces removed
+    :rtype: int
+    """
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return 0
+
+    # Trace names start with the time they were created at.
+    traces = sorted(name for name in names
+                    if name.startswith("trace_") and name.endswith(".jsonl"))
+    removed = 0
+    for name in traces[:max(len(traces) - keep, 0)]:
+        try:
+            os.remove(os.path.join(folder, name))
+            removed += 1
+        except OSError as e:
+            print(f"WARNING: Couldnt remove the trace {name}: {e}")
+
+    return removed
+
+
+class Tracer:
+    """Record how long every step of a run takes.
+
+    Every span (a request, a payload, an export, a download...) is written
+    as a line of a JSONL trace, with its duration and whatever fields the
+    code being traced adds to it. Durations are also kept in memory to
+    summarize the run once it's over.
+
+    Usage:
+
+        with tracer.span("download", url=url) as span:
+            span["bytes"] = download(url)
+    """
+    def __init__(self, file_path=None):
+        """Initialize the tracer.
+
+        :param file_path: Trace file, created on the first span. If not set,
+          spans are only kept in memory.
+        :type file_path: str
+        """
+        self.file_path = file_path
+        self.file = None
+        self.lock = threading.Lock()
+        self.start = time.monotonic()
+        # Span names mapped to the durations and bytes of their spans.
+        self.durations = {}
+        self.bytes = {}
+
+    @contextlib.contextmanager
+    def span(self, name, **fields):
+        """Time a block of code.
+
+        The dictionary it yields can be filled with extra fields to save
+        along with the span. A 'bytes' field is also used to compute the
+        throughput of the spans in the summary.
+
+        :param name: Span name
+        :type name: str
+
+        :param fields: Fields to save along with the span
+        :type fields: dict
+        """
+        start = time.monotonic()
+        try:
+            yield fields
+        except BaseException as e:
+            fields["error"] = repr(e)
+            raise
+        finally:
+            self.record(name, time.monotonic() - start, **fields)
+
+    def record(self, name, duration, **fields):
+        """Save a span whose duration has been measured somewhere else.
+
+        :param name: Span name
+        :type name: str
+
+        :param duration: Duration of the span (in seconds)
+        :type duration: float
+
+        :param fields: Fields to save along with the span
+        :type fields: dict
+        """
+        entry = {
+            "span": name,
+            "time": round(time.monotonic() - self.start - duration, 6),
+            "duration": round(duration, 6),
+            "thread": threading.current_thread().name,
+            **fields}
+
+        with self.lock:
+            self.durations.setdefault(name, []).append(duration)
+            if fields.get("bytes"):
+                self.bytes[name] = self.bytes.get(name, 0) + fields["bytes"]
+
+            if self.file_path is None:
+                return
+
+            try:
+                if self.file is None:
+                    folder = os.path.dirname(self.file_path)
+                    if folder:
+                        os.makedirs(folder, exist_ok=True)
+                    self.file = open(self.file_path, "a")
+                self.file.write(json.dumps(entry, default=str) + "\n")
+            except OSError as e:
+                print(f"WARNING: Couldnt write the trace, disabling it: {e}")
+                self.file_path = None
+
+    def summary(self):
+        """Summarize every span recorded so far.
+
+        :return: Span names mapped to their count, total time, percentiles
+          and max duration, and throughput (in MB/s) if they carry bytes
+        :rtype: dict
+        """
+        with self.lock:
+            durations = {name: list(values) for name, values in self.durations.items()}
+            sizes = dict(self.bytes)
+
+        summary = {}
+        for name, values in durations.items():
+            stats = {"count": len(values), "total": round(sum(values), 3)}
+            for percent in PERCENTILES:
+                stats[f"p{percent}"] = round(percentile(values, percent), 3)
+            stats["max"] = round(max(values), 3)
+
+            if name in sizes and sum(values):
+                stats["mb_per_s"] = round(sizes[name] / sum(values) / 1e6, 2)
+
+            summary[name] = stats
+
+        return summary
+
+    def print_summary(self):
+        """Print the summary of the run as a table."""
+        summary = self.summary()
+        if not summary:
+            return
+
+        columns = ["count", "total"] + [f"p{percent}" for percent in PERCENTILES] + ["max"]
+        print(f"{'span':<14}" + "".join(f"{column:>10}" for column in columns))
+        for name, stats in summary.items():
+            line = f"{name:<14}" + "".join(f"{stats[column]:>10}" for column in columns)
+            if "mb_per_s" in stats:
+                line += f"  {stats['mb_per_s']} MB/s"
+            print(line)
+
+        if self.file_path:
+            print(f"Trace saved to {self.file_path}")
+
+    def close(self):
+        """Close the trace file."""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
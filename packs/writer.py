@@ -0,0 +1,277 @@
+# Stdlib modules
+import collections
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+# Local modules
+from fileio import CHUNK_SIZE, IncompleteDownloadError, write_stream
+
+
+# When written files are flushed to disk:
+# - "always": every file, before it's renamed to its final path.
+# - "end": all of them at once, when the writer is closed.
+# - "never": whenever the OS decides to.
+FSYNC_POLICIES = ("always", "end", "never")
+
+# Maximum number of received files waiting to be written. Downloads wait
+# for one of them to be written when it's reached.
+WRITE_BACKLOG = 16
+
+# Received files up to this size wait in memory, bigger ones in a
+# temporary file (on the local disk, not in the output folder).
+SPOOL_MEMORY = 4 * 1024 * 1024
+
+
+# File handed over to the writer: future of the written file, bytes
+# received, and seconds spent writing it on the thread receiving it (only
+# without writer threads).
+Received = collections.namedtuple("Received", ["future", "size", "write_time"])
+
+
+class OutputWriter:
+    """Write downloaded files to the output folder on threads of their own.
+
+    When the output folder is slow (e.g: a NAS), writing a file while it's
+    being received slows the download down, which holds the download
+    slot, which in turn delays the next export. With 'workers' threads,
+    files are received into a spool (in memory, or a local temporary file
+    if they're big) and written by the writer threads, so downloads only
+    wait for the network, and for room in the spool if 'backlog' files
+    are already waiting to be written.
+
+    With no workers, files are written as they're received, like before.
+
+    Writes are recorded as "write" spans, apart from the "download" spans
+    of the network, whichever thread they're done on. Files written
+    somewhere else (e.g: copied) can be flushed along with the others
+    ('add'), and slow work on written files (e.g: indexing them) can be
+    left to the writer threads too ('submit'). The writer can be shared
+    by several threads.
+    """
+    def __init__(self, tracer, workers=0, fsync="always", backlog=WRITE_BACKLOG,
+                 spool_memory=SPOOL_MEMORY):
+        """Initialize the writer.
+
+        :param tracer: Tracer the writes are recorded to
+        :type tracer: tracing.Tracer
+
+        :param workers: Number of writer threads (0 to write files on the
+          threads receiving them)
+        :type workers: int
+
+        :param fsync: When files are flushed to disk (see FSYNC_POLICIES)
+        :type fsync: str
+
+        :param backlog: Number of received files that may wait to be written
+        :type backlog: int
+
+        :param spool_memory: Size up to which files wait in memory
+        :type spool_memory: int
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+
+        self.tracer = tracer
+        self.workers = workers
+        self.fsync = fsync
+        self.spool_memory = spool_memory
+
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="write") if workers else None
+        # With no workers, submitted tasks get a thread of their own (it's
+        # only started by the first one).
+        self.tasks = self.pool or ThreadPoolExecutor(1, thread_name_prefix="write")
+        self.slots = threading.BoundedSemaphore(workers + backlog)
+        self.lock = threading.Lock()
+        self.pending = set()
+        # Files to flush to disk when closed ("end" policy).
+        self.unsynced = []
+
+        self.files = 0
+        self.bytes = 0
+        self.waited = 0.0
+
+    def write(self, chunks, path, expected_size=None, index=None):
+        """Receive a file, and write it (in the background, if there are
+        workers).
+
+        :param chunks: Chunks of bytes of the file
+        :type chunks: iterable
+
+        :param path: Final path of the file
+        :type path: str
+
+        :param expected_size: Expected size in bytes (None to skip the check)
+        :type expected_size: int
+
+        :param index: Index of the animation (only used in traces)
+        :type index: int
+
+        :return: Future of the written file (see 'fileio.AtomicFile'), bytes
+          received and seconds spent writing it on this thread
+        :rtype: Received
+
+        :raises IncompleteDownloadError: If the size doesn't match
+        """
+        if self.pool is None:
+            file, write_time = self._write_inline(chunks, path, expected_size, index)
+            future = Future()
+            future.set_result(file)
+            return Received(future, file.size, write_time)
+
+        # Wait for room in the spool.
+        start = time.monotonic()
+        self.slots.acquire()
+        waited = time.monotonic() - start
+
+        try:
+            spool, size = self._spool(chunks, expected_size)
+        except BaseException:
+            self.slots.release()
+            raise
+
+        future = self.pool.submit(self._write_spool, spool, path, index)
+        with self.lock:
+            self.waited += waited
+            self.pending.add(future)
+        future.add_done_callback(self._done)
+
+        return Received(future, size, 0.0)
+
+    def add(self, path):
+        """Let the writer know about a file written somewhere else, so that
+        it's flushed to disk with the others ("end" policy).
+
+        :param path: File path
+        :type path: str
+        """
+        if self.fsync == "end":
+            with self.lock:
+                self.unsynced.append(path)
+
+    def submit(self, function, *args):
+        """Run a task on the writer threads, so that it doesn't hold the
+        thread receiving the files. It's done before the writer is closed.
+
+        :param function: Callable running the task
+        :type function: callable
+
+        :return: Future of its result
+        :rtype: concurrent.futures.Future
+        """
+        future = self.tasks.submit(function, *args)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._task_done)
+        return future
+
+    def close(self):
+        """Wait for every file to be written (and flushed to disk), and for
+        every task submitted.
+
+        :return: Number of files and bytes written, seconds downloads have
+          waited for room in the spool, and files flushed at the end
+        :rtype: dict
+        """
+        # Files written by now may still submit tasks.
+        while True:
+            with self.lock:
+                pending = list(self.pending)
+            if not pending:
+                break
+            wait(pending)
+
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.tasks.shutdown()
+
+        with self.lock:
+            unsynced, self.unsynced = self.unsynced, []
+        flush_files(unsynced)
+
+        return {"files": self.files, "bytes": self.bytes, "waited": self.waited,
+                "synced": len(unsynced)}
+
+    def _spool(self, chunks, expected_size):
+        spool = tempfile.SpooledTemporaryFile(self.spool_memory)
+        size = 0
+
+        try:
+            for chunk in chunks:
+                spool.write(chunk)
+                size += len(chunk)
+
+            if expected_size is not None and size != expected_size:
+                raise IncompleteDownloadError(
+                    f"Got {size} bytes, expected {expected_size}")
+        except BaseException:
+            spool.close()
+            raise
+
+        spool.seek(0)
+        return spool, size
+
+    def _write_inline(self, chunks, path, expected_size, index):
+        # The chunks are received while the file is written, so the time
+        # spent writing is what's left once receiving them is taken out.
+        receive_time = 0.0
+
+        def receive():
+            nonlocal receive_time
+            iterator = iter(chunks)
+            while True:
+                start = time.monotonic()
+                chunk = next(iterator, None)
+                receive_time += time.monotonic() - start
+                if chunk is None:
+                    return
+                yield chunk
+
+        start = time.monotonic()
+        file = self._write(receive(), path, expected_size)
+        write_time = time.monotonic() - start - receive_time
+
+        self.tracer.record("write", write_time, index=index, bytes=file.size)
+        return file, write_time
+
+    def _write_spool(self, spool, path, index):
+        with spool, self.tracer.span("write", index=index) as span:
+            file = self._write(iter(lambda: spool.read(CHUNK_SIZE), b""), path)
+            span["bytes"] = file.size
+            return file
+
+    def _write(self, chunks, path, expected_size=None):
+        file = write_stream(path, chunks, expected_size, fsync=self.fsync == "always")
+
+        with self.lock:
+            self.files += 1
+            self.bytes += file.size
+            if self.fsync == "end":
+                self.unsynced.append(file.path)
+
+        return file
+
+    def _done(self, future):
+        with self.lock:
+            self.pending.discard(future)
+        self.slots.release()
+
+    def _task_done(self, future):
+        with self.lock:
+            self.pending.discard(future)
+
+
+def flush_files(paths):
+    """Flush files written earlier to disk.
+
+    :param paths: File paths
+    :type paths: list
+    """
+    for path in paths:
+        try:
+            with open(path, "r+b") as file:
+                os.fsync(file.fileno())
+        except OSError as e:
+            print(f"WARNING: Couldnt flush {path} to disk: {e}")
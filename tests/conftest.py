@@ -0,0 +1,59 @@
+# Stdlib modules
+import importlib
+import os
+import sys
+
+# Third-party modules
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Downloaders the tests can import modules from.
+VARIANTS = ("anims-only", "packs")
+
+
+def unload_variants():
+    """Forget the modules imported from any downloader.
+
+    Both downloaders have modules of the same names (e.g: 'engine'), so
+    the ones of a downloader must be unloaded before importing the other.
+    """
+    folders = tuple(os.path.join(ROOT, variant) + os.sep for variant in VARIANTS)
+
+    for name, module in list(sys.modules.items()):
+        if (getattr(module, "__file__", None) or "").startswith(folders):
+            del sys.modules[name]
+
+
+@pytest.fixture
+def load_variant(monkeypatch):
+    """Import a module from a downloader, e.g: load_variant("packs", "engine").
+
+    Every module it imports comes from the same downloader.
+    """
+    def load(variant, name):
+        unload_variants()
+        monkeypatch.syspath_prepend(os.path.join(ROOT, variant))
+        return importlib.import_module(name)
+
+    yield load
+    unload_variants()
+
+
+@pytest.fixture
+def make_engine(load_variant, monkeypatch, tmp_path):
+    """Create the engine of a downloader, writing to a temporary folder and
+    keeping its cache and traces in memory.
+    """
+    def make(variant, **kwargs):
+        engine = load_variant(variant, "engine")
+
+        monkeypatch.setattr(engine, "CACHE_FILE", ":memory:")
+        monkeypatch.setattr(engine, "POLL_STATS_FILE", str(tmp_path / "export_latency.json"))
+        monkeypatch.setattr(engine, "TRACE_FOLDER", "")
+
+        worker = engine.MixamoEngine(str(tmp_path / "output"), "all", **kwargs)
+        return engine, worker
+
+    return make
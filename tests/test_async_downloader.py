@@ -0,0 +1,48 @@
+# Stdlib modules
+import asyncio
+import sys
+import threading
+
+# Third-party modules
+import pytest
+
+
+async def iterate(chunks, error=None):
+    for chunk in chunks:
+        yield chunk
+    if error is not None:
+        raise error
+
+
+def test_files_are_written_off_the_event_loop(load_variant, monkeypatch, tmp_path):
+    async_downloader = load_variant("anims-only", "async_downloader")
+    fileio = sys.modules["fileio"]
+    monkeypatch.setattr(async_downloader, "WRITE_BATCH", 4)
+
+    threads = set()
+    write = fileio.AtomicFile.write
+
+    def record_write(file, chunk):
+        threads.add(threading.current_thread())
+        write(file, chunk)
+
+    monkeypatch.setattr(fileio.AtomicFile, "write", record_write)
+
+    path = tmp_path / "1_Walking.fbx"
+    file = asyncio.run(async_downloader.write_stream_async(
+        str(path), iterate([b"wal", b"king", b"!"]), expected_size=8))
+
+    assert path.read_bytes() == b"walking!"
+    assert file.size == 8
+    assert threads and threading.current_thread() not in threads
+
+
+def test_interrupted_downloads_leave_no_file(load_variant, tmp_path):
+    async_downloader = load_variant("anims-only", "async_downloader")
+    path = tmp_path / "1_Walking.fbx"
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(async_downloader.write_stream_async(
+            str(path), iterate([b"walk"], ConnectionError())))
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,63 @@
+# Stdlib modules
+import threading
+import time
+
+# Third-party modules
+import pytest
+
+
+class SlowProvider:
+    """Provider taking a while to get a new token, like a browser would."""
+    def __init__(self, error=None):
+        self.error = error
+        self.refreshes = 0
+
+    def get_token(self):
+        return "old"
+
+    def refresh(self, expired_token):
+        self.refreshes += 1
+        time.sleep(0.1)
+        if self.error is not None:
+            raise self.error
+        return "new"
+
+
+def reject_at_once(manager, count):
+    """Let 'count' requests rejected with the same token handle it at once."""
+    barrier = threading.Barrier(count)
+    results = []
+
+    def reject():
+        barrier.wait()
+        results.append(manager.handle_unauthorized("old"))
+
+    threads = [threading.Thread(target=reject) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_token_is_refreshed_once_for_concurrent_rejections(load_variant):
+    auth = load_variant("anims-only", "auth")
+    headers = {"Authorization": "Bearer old"}
+    provider = SlowProvider()
+    manager = auth.TokenManager(headers, provider)
+
+    assert reject_at_once(manager, 8) == [True] * 8
+    assert provider.refreshes == 1
+    assert headers["Authorization"] == "Bearer new"
+    manager.wait_ready()
+
+
+def test_failed_refresh_fails_every_request(load_variant):
+    auth = load_variant("anims-only", "auth")
+    provider = SlowProvider(auth.AuthenticationError("Nobody logged in"))
+    manager = auth.TokenManager({"Authorization": "Bearer old"}, provider)
+
+    assert reject_at_once(manager, 8) == [False] * 8
+    assert provider.refreshes == 1
+    with pytest.raises(auth.AuthenticationError):
+        manager.wait_ready()
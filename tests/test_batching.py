@@ -0,0 +1,99 @@
+# Stdlib modules
+import json
+import sys
+import time
+import zipfile
+
+
+def make_items(worker, tmp_path, names):
+    folder = tmp_path / "output"
+    folder.mkdir(exist_ok=True)
+    journal = sys.modules["journal"].RunJournal(str(folder))
+    items = []
+
+    for index, name in enumerate(names, 1):
+        payload = json.dumps({
+            "character_id": "character", "product_name": name, "type": "Motion",
+            "preferences": {"format": "fbx7_2019"},
+            "gms_hash": [{"model-id": index, "mirror": False, "trim": [0, 100],
+                          "inplace": False, "arm-space": 0, "params": ""}]})
+        items.append({
+            "index": index, "anim_id": f"anim-{index}", "anim_name": name,
+            "product_name": name, "character_id": "character", "folder": str(folder),
+            "journal": journal, "payload": payload, "queued": time.monotonic(),
+            "export_key": sys.modules["exports"].export_key(payload)})
+
+    return items
+
+
+def fake_exports(worker, monkeypatch, batch_members=None):
+    """Export singles to their own URL, and batches to an archive having
+    'batch_members' (None to reject batches)."""
+    exported = []
+
+    def export_animation(character_id, payload):
+        payload = json.loads(payload)
+        names = [motion.get("name") for motion in payload["gms_hash"]]
+        exported.append(names if payload["type"] == "MotionPack" else payload["product_name"])
+        if payload["type"] != "MotionPack":
+            return f"https://download/{payload['product_name']}"
+        return None if batch_members is None else "https://download/batch"
+
+    def download_file(url, path, index=None):
+        with zipfile.ZipFile(path, "w") as archive:
+            for name in batch_members:
+                archive.writestr(f"Batch/{name}.fbx", name.encode())
+        return type("File", (), {"path": path})
+
+    monkeypatch.setattr(worker, "export_animation", export_animation)
+    monkeypatch.setattr(worker, "download_file", download_file)
+    return exported
+
+
+def test_batch_is_split_into_a_file_per_animation(make_engine, monkeypatch, tmp_path):
+    engine, worker = make_engine("anims-only")
+    items = make_items(worker, tmp_path, ["Walking", "Running", "Jumping"])
+    exported = fake_exports(worker, monkeypatch, ["1_Walking", "2_Running", "3_Jumping"])
+
+    ready = worker.export_batch(items)
+
+    # A single export for the whole batch.
+    assert exported == [["1_Walking", "2_Running", "3_Jumping"]]
+    assert ready == items
+    archive = items[0]["archive"]
+    assert archive.users == 3
+
+    for item in ready:
+        worker.download_item(item)
+        path = tmp_path / "output" / f"{item['index']}_{item['anim_name']}.fbx"
+        assert path.read_bytes() == f"{item['index']}_{item['anim_name']}".encode()
+
+    # The archive is removed once every animation has been extracted.
+    assert not (tmp_path / "output" / ".batch_1.zip").exists()
+
+
+def test_animations_missing_from_the_batch_are_exported_alone(
+        make_engine, monkeypatch, tmp_path):
+    engine, worker = make_engine("anims-only")
+    items = make_items(worker, tmp_path, ["Walking", "Running", "Jumping"])
+    exported = fake_exports(worker, monkeypatch, ["1_Walking", "3_Jumping"])
+
+    ready = worker.export_batch(items)
+
+    assert exported == [["1_Walking", "2_Running", "3_Jumping"], "Running"]
+    assert [item["index"] for item in ready] == [1, 3, 2]
+    assert "archive" not in items[1]
+    assert items[1]["url"] == "https://download/Running"
+
+
+def test_rejected_batch_falls_back_to_single_exports(make_engine, monkeypatch, tmp_path):
+    engine, worker = make_engine("anims-only")
+    items = make_items(worker, tmp_path, ["Walking", "Running"])
+    exported = fake_exports(worker, monkeypatch, batch_members=None)
+
+    ready = worker.export_batch(items)
+
+    assert exported == [["1_Walking", "2_Running"], "Walking", "Running"]
+    assert [item["url"] for item in ready] == [
+        "https://download/Walking", "https://download/Running"]
+    assert not (tmp_path / "output" / ".batch_1.zip").exists()
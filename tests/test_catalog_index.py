@@ -0,0 +1,94 @@
+# Stdlib modules
+import json
+import os
+
+# Third-party modules
+import pytest
+
+
+CATALOG = {
+    "1": "Walk",
+    "2": "Walking Backwards",
+    "3": "Female Walk Back",
+    "4": "Jump",
+    "5": "Leap",
+}
+
+
+def write_json(path, data):
+    with open(path, "w") as file:
+        json.dump(data, file)
+
+
+def test_words_match_tokens_starting_with_them(load_variant):
+    catalog_index = load_variant("anims-only", "catalog_index")
+    index = catalog_index.CatalogIndex.build(CATALOG)
+
+    assert list(index.search("walk")) == ["1", "2", "3"]
+    assert index.search("walk*") == index.search("walk")
+    assert list(index.search("walk back")) == ["2", "3"]
+    assert list(index.search("jump OR leap")) == ["4", "5"]
+    assert index.search("run") == {}
+
+
+def test_index_is_rebuilt_when_the_state_file_changes(load_variant, tmp_path):
+    catalog_index = load_variant("anims-only", "catalog_index")
+    catalog_path = str(tmp_path / "catalog.json")
+    state_path = str(tmp_path / "state.json")
+    write_json(catalog_path, CATALOG)
+
+    index = catalog_index.CatalogIndex.load(catalog_path, "description", state_path)
+    assert index.search("sprint") == {}
+
+    # A catalog refresh adds descriptions and categories to the products.
+    write_json(state_path, {"Motion": {"products": {
+        "4": {"name": "Jump", "description": "Jump", "category": "Sprint"}}}})
+    os.utime(state_path, ns=(1, 1))
+
+    index = catalog_index.CatalogIndex.load(catalog_path, "description", state_path)
+    assert index.search("sprint") == {"4": "Jump"}
+
+
+def test_get_remote_queries(load_variant):
+    catalog_index = load_variant("anims-only", "catalog_index")
+
+    assert catalog_index.get_remote_queries("walk*") == ["walk"]
+    assert catalog_index.get_remote_queries("Walk Back* OR leap OR walk back") == [
+        "walk back", "leap"]
+    assert catalog_index.get_remote_queries("* OR") == ["or"]
+
+
+@pytest.mark.parametrize("variant", ["anims-only", "packs"])
+def test_few_local_matches_are_not_searched_on_mixamo(make_engine, monkeypatch, tmp_path, variant):
+    engine, worker = make_engine(variant)
+    catalog_path = str(tmp_path / "catalog.json")
+    write_json(catalog_path, CATALOG)
+    monkeypatch.setattr(engine, "CATALOG_FILE", catalog_path)
+    monkeypatch.setattr(worker, "get_queried_page", None)
+
+    assert worker.get_queried_animations_data("walk*") == {
+        "1": "Walk", "2": "Walking Backwards", "3": "Female Walk Back"}
+    assert worker.search_catalog("run") is None
+
+
+@pytest.mark.parametrize("variant, field", [("anims-only", "description"), ("packs", "name")])
+def test_mixamo_search_gets_plain_queries(make_engine, monkeypatch, tmp_path, variant, field):
+    engine, worker = make_engine(variant)
+    # No local catalog.
+    monkeypatch.setattr(engine, "CATALOG_FILE", str(tmp_path / "missing.json"))
+
+    results = {"jump": ["4", "6"], "leap": ["5", "6"]}
+    queries = []
+
+    def get_queried_page(query, page_num):
+        queries.append(query)
+        return {"pagination": {"num_pages": 1, "num_results": len(results[query])},
+                "results": [{"id": product_id, field: f"Motion {product_id}"}
+                            for product_id in results[query]]}
+
+    monkeypatch.setattr(worker, "get_queried_page", get_queried_page)
+
+    anim_data = worker.get_queried_animations_data("jump* OR leap")
+
+    assert queries == ["jump", "leap"]
+    assert anim_data == {"4": "Motion 4", "6": "Motion 6", "5": "Motion 5"}
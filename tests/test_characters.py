@@ -0,0 +1,31 @@
+# Third-party modules
+import pytest
+
+
+@pytest.mark.parametrize("variant", ["anims-only", "packs"])
+def test_invalidate_characters_forgets_their_cache(load_variant, monkeypatch, tmp_path, variant):
+    engine = load_variant(variant, "engine")
+    cache_file = str(tmp_path / "mixamo_cache.sqlite")
+    monkeypatch.setattr(engine, "CACHE_FILE", cache_file)
+    monkeypatch.setattr(engine, "character_store", engine.CharacterStore())
+
+    for account, character_id in (("a", "character-a"), ("b", "character-b")):
+        engine.character_store.put(account, {"primary_character_id": character_id})
+
+    cache = engine.ProductCache(cache_file)
+    cache.put_product("character-a", "walk", {"name": "Walking"})
+    cache.put_product("character-b", "walk", {"name": "Walking"})
+
+    engine.invalidate_characters("a")
+
+    assert engine.character_store.lookup("a") is None
+    assert cache.get_product("character-a", "walk") is None
+    # Other accounts keep their character.
+    assert engine.character_store.lookup("b") is not None
+    assert cache.get_product("character-b", "walk") == {"name": "Walking"}
+
+    engine.invalidate_characters()
+
+    assert engine.character_store.lookup("b") is None
+    assert cache.get_product("character-b", "walk") is None
+    cache.close()
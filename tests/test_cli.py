@@ -0,0 +1,122 @@
+# Stdlib modules
+import sys
+
+# Third-party modules
+import pytest
+
+
+def fake_engines(cli, monkeypatch, finish=True):
+    """Replace both backends of the CLI with engines that only record how
+    they were created, and return that record."""
+    created = []
+
+    class FakeEngine:
+        def __init__(self, *args):
+            created.append((type(self).__name__, args))
+            self.stop = False
+            self.total_tasks = cli.engine.Event()
+            self.current_task = cli.engine.Event()
+            self.finished = cli.engine.Event()
+
+        def run(self):
+            if finish:
+                self.finished.emit()
+            else:
+                self.stop = True
+
+    monkeypatch.setattr(cli, "MixamoEngine", type("Threaded", (FakeEngine,), {}))
+    monkeypatch.setattr(cli, "AsyncMixamoEngine", type("Async", (FakeEngine,), {}))
+    monkeypatch.setattr(cli.async_downloader, "is_available", lambda: True)
+    return created
+
+
+@pytest.mark.parametrize("variant", ["anims-only", "packs"])
+@pytest.mark.parametrize("mode", ["all", "new", "tpose"])
+def test_modes_run_the_threaded_engine(load_variant, monkeypatch, tmp_path, variant, mode):
+    cli = load_variant(variant, "cli")
+    created = fake_engines(cli, monkeypatch)
+    output = str(tmp_path / "output")
+
+    assert cli.main(["--token", "token", "--mode", mode, "--output", output]) == 0
+
+    [(backend, args)] = created
+    assert backend == "Threaded"
+    assert args[:5] == (output, mode, None, False, None)
+    assert args[5].get_token() == "token"
+
+
+def test_query_mode_runs_the_async_engine(load_variant, monkeypatch, tmp_path):
+    cli = load_variant("anims-only", "cli")
+    created = fake_engines(cli, monkeypatch)
+    output = str(tmp_path / "output")
+
+    assert cli.main(["--token", "token", "--mode", "query", "--query", "walk*",
+                     "--output", output, "--retry", "--async"]) == 0
+    assert [(backend, args[:4]) for backend, args in created] == [
+        ("Async", (output, "query", "walk*", True))]
+
+
+def test_options_configure_the_engine(load_variant, monkeypatch, tmp_path):
+    cli = load_variant("anims-only", "cli")
+    fake_engines(cli, monkeypatch)
+
+    cli.main(["--token", "token", "--output", str(tmp_path), "--batch-size", "8",
+              "--write-workers", "2", "--fsync", "end", "--trace-folder", "",
+              "--api-url", "http://localhost:8000/api/v1"])
+
+    assert cli.engine.EXPORT_BATCH_SIZE == 8
+    assert cli.engine.WRITE_WORKERS == 2
+    assert cli.engine.FSYNC_POLICY == "end"
+    assert cli.engine.TRACE_FOLDER == ""
+    assert cli.engine.API_URL == "http://localhost:8000/api/v1"
+
+
+def test_stopped_runs_fail(load_variant, monkeypatch, tmp_path):
+    cli = load_variant("anims-only", "cli")
+    fake_engines(cli, monkeypatch, finish=False)
+
+    assert cli.main(["--token", "token", "--output", str(tmp_path)]) == 1
+
+
+@pytest.mark.parametrize("variant, argv", [
+    ("anims-only", ["--mode", "query"]),
+    ("anims-only", ["--mode", "walk"]),
+    ("anims-only", ["--batch-size", "0"]),
+    ("anims-only", ["--async", "--batch-size", "4"]),
+    ("anims-only", ["--async", "--write-workers", "2"]),
+    ("anims-only", ["--use-packs", "--pack-catalog", "missing.json"]),
+    ("anims-only", ["--write-workers", "-1"]),
+    ("anims-only", ["--max-traces", "-1"]),
+    # Packs can't be batched, and single animations can't be extracted.
+    ("packs", ["--batch-size", "4"]),
+    ("packs", ["--async", "--extract"]),
+    ("anims-only", ["--extract"]),
+])
+def test_invalid_arguments_are_rejected(load_variant, monkeypatch, tmp_path, variant, argv):
+    cli = load_variant(variant, "cli")
+    created = fake_engines(cli, monkeypatch)
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(SystemExit) as error:
+        cli.main(["--token", "token", "--output", str(tmp_path)] + argv)
+
+    assert error.value.code == 2
+    assert created == []
+
+
+def test_token_providers_by_order_of_preference(load_variant, monkeypatch, tmp_path):
+    cli = load_variant("anims-only", "cli")
+    auth = sys.modules["auth"]
+    Namespace = cli.argparse.Namespace
+    monkeypatch.setenv(auth.TOKEN_ENV, "environment")
+
+    provider = cli.get_token_provider(Namespace(token="token", token_file="token.txt"))
+    assert isinstance(provider, auth.StaticTokenProvider)
+    provider = cli.get_token_provider(Namespace(token=None, token_file="token.txt"))
+    assert isinstance(provider, auth.FileTokenProvider)
+    provider = cli.get_token_provider(Namespace(token=None, token_file=None))
+    assert isinstance(provider, auth.EnvTokenProvider)
+
+    monkeypatch.delenv(auth.TOKEN_ENV)
+    provider = cli.get_token_provider(Namespace(token=None, token_file=None))
+    assert isinstance(provider, auth.CachedTokenProvider)
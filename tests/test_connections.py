@@ -0,0 +1,94 @@
+# Stdlib modules
+import http.server
+import threading
+
+# Third-party modules
+import pytest
+
+
+class KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    """Answer every request, keeping the connection open, and count the
+    connections opened to the server."""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_origin(load_variant):
+    connections = load_variant("anims-only", "connections")
+    assert connections.get_origin("https://www.mixamo.com/api/v1/products?page=1") == \
+        "https://www.mixamo.com"
+    assert connections.get_origin("http://localhost:8080/api/v1") == "http://localhost:8080"
+
+
+def test_api_and_downloads_have_pools_of_their_own(load_variant):
+    connections = load_variant("anims-only", "connections")
+    session = connections.create_session("https://www.mixamo.com/api/v1",
+                                         api_pool_size=12, download_pool_size=4)
+
+    api = session.get_adapter("https://www.mixamo.com/api/v1/products")
+    download = session.get_adapter("https://cdn.example.com/1_Walking.fbx")
+
+    assert api is not download
+    assert api._pool_maxsize == 12
+    assert download._pool_maxsize == 4
+    # Any other host shares the download pool.
+    assert session.get_adapter("http://other.example.com/file") is download
+
+
+def test_mount_api_keeps_the_existing_pool(load_variant):
+    connections = load_variant("anims-only", "connections")
+    session = connections.create_session()
+    connections.mount_api(session, "http://localhost:8080/api/v1")
+    adapter = session.get_adapter("http://localhost:8080/api/v1/products")
+
+    # Mounting it again (e.g: every engine of a run does) changes nothing.
+    connections.mount_api(session, "http://localhost:8080/api/v1/")
+    assert session.get_adapter("http://localhost:8080/api/v1/products") is adapter
+    assert adapter._pool_maxsize == connections.API_POOL_SIZE
+
+
+def test_api_connections_are_reused(load_variant, server):
+    connections = load_variant("anims-only", "connections")
+    api_url = f"http://127.0.0.1:{server.server_port}/api/v1"
+    session = connections.create_session(api_url)
+
+    for _ in range(10):
+        assert session.get(f"{api_url}/products").json() == {}
+
+    assert server.connections == 1
+    session.close()
+
+
+def test_async_client_gives_the_api_its_own_transport(load_variant):
+    connections = load_variant("anims-only", "connections")
+    if connections.httpx is None:
+        pytest.skip("httpx isn't installed")
+
+    client = connections.create_async_client("https://www.mixamo.com/api/v1", http2=False)
+    api = client._transport_for_url(connections.httpx.URL("https://www.mixamo.com/api/v1/x"))
+    download = client._transport_for_url(connections.httpx.URL("https://cdn.example.com/x"))
+
+    assert api is not download
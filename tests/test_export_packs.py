@@ -0,0 +1,110 @@
+# Stdlib modules
+import json
+import sys
+import zipfile
+from concurrent.futures import Future
+
+
+class InlineExecutor:
+    """Executor running every task as soon as it's submitted, so that an
+    extraction is over before the next one is submitted.
+    """
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, function, *args):
+        future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def map(self, function, *iterables):
+        return [function(*args) for args in zip(*iterables)]
+
+
+def test_export_packs_extracts_several_motions_from_one_archive(
+        make_engine, monkeypatch, tmp_path):
+    engine, worker = make_engine("anims-only")
+    batching = sys.modules["batching"]
+    journal = sys.modules["journal"]
+    monkeypatch.setattr(engine, "ThreadPoolExecutor", InlineExecutor)
+
+    folder = tmp_path / "output"
+    folder.mkdir()
+    motions = {101: "Walking", 102: "Running", 103: "Jumping"}
+    archive_path = folder / ".pack_pack-1.zip"
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        for name in motions.values():
+            archive.writestr(f"Pack/{name}.fbx", name.encode() * 100)
+
+    def get_motion_key(item):
+        item["product_name"] = item["anim_name"]
+        item["export_key"] = item["anim_id"]
+        item["payload"] = json.dumps({"gms_hash": [{"model-id": item["model_id"]}]})
+        return item["model_id"]
+
+    monkeypatch.setattr(worker, "get_pack_motions",
+                        lambda character_id: {"pack-1": ({"name": "Pack"}, motions)})
+    monkeypatch.setattr(worker, "get_motion_key", get_motion_key)
+    monkeypatch.setattr(worker, "build_pack_payload", lambda character_id, product: "{}")
+    monkeypatch.setattr(worker, "download_archive",
+                        lambda *args: batching.BatchArchive(str(archive_path)))
+
+    items = [
+        {"index": index + 1, "anim_id": f"anim-{model_id}", "anim_name": name,
+         "model_id": model_id, "character_id": "character", "folder": str(folder),
+         "journal": journal.RunJournal(str(folder))}
+        for index, (model_id, name) in enumerate(motions.items())]
+
+    assert worker.export_packs(items) == []
+
+    for item in items:
+        path = folder / f"{item['index']}_{item['anim_name']}.fbx"
+        assert path.read_bytes() == item["anim_name"].encode() * 100
+        assert worker.exports.lookup(item["export_key"]) is not None
+
+    # The archive is removed once every motion has been extracted.
+    assert not archive_path.exists()
+
+
+def test_pack_motions_are_matched_on_their_whole_gms_hash(make_engine, monkeypatch, tmp_path):
+    engine, worker = make_engine("anims-only")
+
+    def make_gms_hash(mirror, trim):
+        return {"model-id": 101, "mirror": mirror, "trim": trim, "inplace": False,
+                "arm-space": 0, "params": [["Overdrive", 0.0], ["Emotion", 1.0]]}
+
+    # The pack has the mirrored variant of the motion only.
+    pack = {"name": "Pack", "details": {"motions": [
+        {"name": "Walking Mirror", "gms_hash": make_gms_hash(True, [0.0, 100.0])},
+        {"name": "Walking Short", "gms_hash": make_gms_hash(False, [0.0, 50.0])}]}}
+    pack_catalog = tmp_path / "mixamo_animsPack.json"
+    pack_catalog.write_text(json.dumps({"pack-1": "Pack"}))
+    monkeypatch.setattr(engine, "PACK_CATALOG_FILE", str(pack_catalog))
+    monkeypatch.setattr(worker, "get_pack_product", lambda character_id, pack_id: pack)
+    monkeypatch.setattr(worker, "lookup_item", lambda item: item)
+
+    items = {}
+    for anim_id, gms_hash in (("walk", make_gms_hash(False, [0.0, 100.0])),
+                              ("walk-mirror", make_gms_hash(True, [0.0, 100.0]))):
+        product = {"description": anim_id, "type": "Motion", "details": {"gms_hash": gms_hash}}
+        items[anim_id] = {
+            "anim_id": anim_id, "export_key": anim_id,
+            "payload": worker.build_payload_from_product("character", product)}
+
+    motions = worker.get_pack_motions("character")["pack-1"][1]
+    keys = {anim_id: worker.get_motion_key(item) for anim_id, item in items.items()}
+
+    # Only the mirrored variant can be taken from the pack: the other one
+    # has the same 'model-id', but isn't in it.
+    assert motions[keys["walk-mirror"]] == "Walking Mirror"
+    assert keys["walk"] not in motions
+    assert len(motions) == 2
@@ -0,0 +1,91 @@
+# Third-party modules
+import pytest
+
+
+class FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+        self.text = str(data)
+
+    def json(self):
+        return self.data
+
+
+class FakePoller:
+    """Poller checking the export status right away, a given number of times."""
+    def __init__(self, polls):
+        self.polls = polls
+
+    def delays(self, start=None):
+        return [0] * self.polls
+
+    def record(self, *args):
+        pass
+
+
+def fake_requests(worker, monkeypatch, export, monitor):
+    """Answer the export request, then every request to the monitor in turn."""
+    answers = iter(monitor)
+    requests = []
+
+    def make_request(method, url, **kwargs):
+        requests.append(method)
+        return export if method == "POST" else next(answers)
+
+    monkeypatch.setattr(worker, "make_request", make_request)
+    monkeypatch.setattr(worker, "poller", FakePoller(len(monitor)))
+    return requests
+
+
+@pytest.mark.parametrize("variant", ["anims-only", "packs"])
+def test_export_animation_refused(make_engine, monkeypatch, variant):
+    engine, worker = make_engine(variant)
+    requests = fake_requests(worker, monkeypatch,
+        FakeResponse(400, {"message": "Invalid payload"}),
+        [FakeResponse(200, {"status": "completed", "job_result": "previous"})])
+
+    assert worker.export_animation("character", "{}") is None
+    # The monitor isn't polled: it would report the previous export.
+    assert requests == ["POST"]
+
+
+@pytest.mark.parametrize("variant", ["anims-only", "packs"])
+def test_export_animation_waits_for_its_job(make_engine, monkeypatch, variant):
+    engine, worker = make_engine(variant)
+    fake_requests(worker, monkeypatch,
+        FakeResponse(202, {"status": "processing", "uuid": "job-b"}),
+        [FakeResponse(200, {"status": "completed", "uuid": "job-a", "job_result": "url-a"}),
+         FakeResponse(200, {"status": "processing", "uuid": "job-b"}),
+         FakeResponse(200, {"status": "completed", "uuid": "job-b", "job_result": "url-b"})])
+
+    assert worker.export_animation("character", "{}") == "url-b"
+
+
+@pytest.mark.parametrize("variant", ["anims-only", "packs"])
+def test_export_animation_ignores_other_jobs(make_engine, monkeypatch, variant):
+    engine, worker = make_engine(variant)
+    fake_requests(worker, monkeypatch,
+        FakeResponse(200, {"status": "processing", "uuid": "job-b"}),
+        [FakeResponse(200, {"status": "completed", "uuid": "job-a", "job_result": "url-a"})] * 3)
+
+    assert worker.export_animation("character", "{}") is None
+
+
+def test_export_store_clear(load_variant, tmp_path):
+    cache = load_variant("anims-only", "cache")
+    exports = load_variant("anims-only", "exports")
+
+    path = tmp_path / "1_Walking.fbx"
+    path.write_bytes(b"motion")
+    store = exports.ExportStore(cache.ProductCache(":memory:"))
+    file = type("File", (), {"path": str(path), "size": 6, "sha256": "unused"})
+    for key, character_id in (("a1", "a"), ("a2", "a"), ("b1", "b")):
+        store.complete(key, character_id, file)
+
+    assert store.clear("a") == 2
+    assert store.cache.get_export("a1") is None
+    assert store.cache.get_export("b1") is not None
+    assert store.clear() == 1
+    # The files are left on disk.
+    assert path.exists()
@@ -0,0 +1,91 @@
+# Stdlib modules
+import os
+import sys
+import threading
+import zipfile
+
+
+def make_extractor(make_engine, **kwargs):
+    engine, worker = make_engine("packs")
+    extraction = sys.modules["extraction"]
+    return extraction.PackExtractor(worker.sanitize_filename, worker.tracer, **kwargs)
+
+
+def make_archive(path, members):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return str(path)
+
+
+def test_member_paths_stay_in_their_folder(make_engine, tmp_path):
+    extractor = make_extractor(make_engine)
+    folder = str(tmp_path / "1_Pack")
+
+    assert extractor.get_member_path(folder, "Pack/Walk*ing.fbx") == os.path.join(
+        folder, "Pack", "Walking.fbx")
+    assert extractor.get_member_path(folder, "../../evil.fbx") == os.path.join(
+        folder, "evil.fbx")
+    assert extractor.get_member_path(folder, "C:\\Pack\\Run.fbx") == os.path.join(
+        folder, "C", "Pack", "Run.fbx")
+    assert extractor.get_member_path(folder, "Pack/???.fbx") is None
+    extractor.close()
+
+
+def test_members_with_the_same_path_are_all_extracted(make_engine, tmp_path):
+    extractor = make_extractor(make_engine)
+    path = make_archive(tmp_path / "1_Pack.zip", {
+        "Pack/Walk?.fbx": b"first", "Pack/Walk*.fbx": b"second", "Pack/walk.fbx": b"third"})
+
+    extractor.submit(path)
+    stats = extractor.close()
+
+    folder = tmp_path / "1_Pack" / "Pack"
+    assert stats["files"] == 3
+    assert {entry.name: entry.read_bytes() for entry in folder.iterdir()} == {
+        "Walk.fbx": b"first", "Walk_2.fbx": b"second", "walk_3.fbx": b"third"}
+
+
+def test_archives_past_the_backlog_are_extracted_when_closed(make_engine, tmp_path):
+    extractor = make_extractor(make_engine, workers=1, backlog=1)
+    release = threading.Event()
+    extract_members = extractor._extract_members
+
+    def slow_extract_members(path):
+        release.wait()
+        return extract_members(path)
+
+    extractor._extract_members = slow_extract_members
+    paths = [make_archive(tmp_path / f"{index}_Pack.zip", {"Walk.fbx": b"walk"})
+             for index in range(4)]
+
+    # Submitting never blocks: one archive is extracted, one waits for the
+    # thread, and the others wait for the downloads to be over.
+    for path in paths:
+        extractor.submit(path)
+    assert extractor.deferred == paths[2:]
+
+    release.set()
+    stats = extractor.close()
+
+    assert (stats["archives"], stats["deferred"], stats["failed"]) == (4, 2, 0)
+    for index in range(4):
+        assert (tmp_path / f"{index}_Pack" / "Walk.fbx").read_bytes() == b"walk"
+
+
+def test_deferred_archives_are_skipped_when_cancelled(make_engine, tmp_path):
+    extractor = make_extractor(make_engine, workers=1, backlog=0)
+    release = threading.Event()
+    extract_members = extractor._extract_members
+    extractor._extract_members = lambda path: release.wait() and extract_members(path)
+
+    paths = [make_archive(tmp_path / f"{index}_Pack.zip", {"Walk.fbx": b"walk"})
+             for index in range(3)]
+    for path in paths:
+        extractor.submit(path)
+
+    release.set()
+    stats = extractor.close(cancel=True)
+
+    assert (stats["archives"], stats["deferred"]) == (1, 2)
+    assert not (tmp_path / "2_Pack").exists()
@@ -0,0 +1,78 @@
+# Stdlib modules
+import hashlib
+
+# Third-party modules
+import pytest
+
+
+def list_folder(folder):
+    return sorted(entry.name for entry in folder.iterdir())
+
+
+def test_complete_files_replace_the_old_ones(load_variant, tmp_path):
+    fileio = load_variant("anims-only", "fileio")
+    path = tmp_path / "1_Walking.fbx"
+    path.write_bytes(b"old")
+
+    file = fileio.write_stream(str(path), [b"new ", b"motion"], expected_size=10)
+
+    assert path.read_bytes() == b"new motion"
+    assert (file.size, file.sha256) == (10, hashlib.sha256(b"new motion").hexdigest())
+    assert list_folder(tmp_path) == ["1_Walking.fbx"]
+
+
+def test_failed_writes_keep_the_old_file(load_variant, tmp_path):
+    fileio = load_variant("anims-only", "fileio")
+    path = tmp_path / "1_Walking.fbx"
+    path.write_bytes(b"old")
+
+    def chunks():
+        yield b"partial"
+        raise ConnectionError("Connection reset")
+
+    with pytest.raises(ConnectionError):
+        fileio.write_stream(str(path), chunks())
+
+    assert path.read_bytes() == b"old"
+    assert list_folder(tmp_path) == ["1_Walking.fbx"]
+
+
+@pytest.mark.parametrize("old", [b"old", None])
+def test_incomplete_downloads_are_dropped(load_variant, tmp_path, old):
+    fileio = load_variant("anims-only", "fileio")
+    path = tmp_path / "1_Walking.fbx"
+    if old is not None:
+        path.write_bytes(old)
+
+    with pytest.raises(fileio.IncompleteDownloadError):
+        fileio.write_stream(str(path), [b"truncated"], expected_size=1024)
+
+    assert list_folder(tmp_path) == (["1_Walking.fbx"] if old else [])
+    if old is not None:
+        assert path.read_bytes() == old
+
+
+def test_failed_renames_leave_no_partial_file(load_variant, monkeypatch, tmp_path):
+    fileio = load_variant("anims-only", "fileio")
+    path = tmp_path / "1_Walking.fbx"
+
+    def replace(source, destination):
+        raise PermissionError(f"{destination} is open elsewhere")
+
+    monkeypatch.setattr(fileio.os, "replace", replace)
+    with pytest.raises(PermissionError):
+        fileio.write_stream(str(path), [b"motion"], fsync=False)
+
+    assert list_folder(tmp_path) == []
+
+
+def test_files_can_be_copied_onto_themselves(load_variant, tmp_path):
+    fileio = load_variant("anims-only", "fileio")
+    path = tmp_path / "1_Walking.fbx"
+    path.write_bytes(b"motion")
+
+    file = fileio.copy_file(str(path), str(path), expected_size=6)
+
+    assert path.read_bytes() == b"motion"
+    assert file.sha256 == hashlib.sha256(b"motion").hexdigest()
+    assert list_folder(tmp_path) == ["1_Walking.fbx"]
@@ -0,0 +1,106 @@
+# Stdlib modules
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+
+def make_product(id, name):
+    return {"id": id, "name": name, "description": f"{name} description"}
+
+
+def serve_pages(getids, monkeypatch, pages, not_modified=()):
+    """Answer listing requests with the given pages of products, and count
+    how many times every page is requested."""
+    requests = collections.Counter()
+
+    def get_page_conditional(product_type, page_num, page_state):
+        requests[page_num] += 1
+        if page_num in not_modified:
+            return None, {"etag": f"etag-{page_num}", "last_modified": None}
+        data = {"results": pages[page_num], "pagination": {"num_pages": len(pages) - 1}}
+        return data, {"etag": f"etag-{page_num}", "last_modified": None}
+
+    monkeypatch.setattr(getids, "get_page_conditional", get_page_conditional)
+    return requests
+
+
+def make_state(product_type, pages):
+    return {product_type: {
+        "num_pages": len(pages) - 1,
+        "pages": {str(page_num): {"ids": [product["id"] for product in products]}
+                  for page_num, products in enumerate(pages)},
+        "products": {product["id"]: product for products in pages for product in products},
+    }}
+
+
+def refresh(getids, product_type, state, workers=2):
+    """Refresh the catalog in a single pass, reading 'workers' pages at a time."""
+    with ThreadPoolExecutor(workers) as pool:
+        return getids.refresh_products_data(product_type, state, pool, workers,
+                                            max_passes=1)
+
+
+def test_refresh_stops_at_the_first_unchanged_page(load_variant, monkeypatch):
+    getids = load_variant("anims-only", "getids")
+    old_pages = [[make_product(f"a{page}{index}", f"Anim {page}{index}") for index in range(2)]
+                 for page in range(6)]
+    state = make_state("Motion", old_pages)
+
+    # Two products have been added, which shifts the first pages.
+    added = [make_product("new1", "New 1"), make_product("new2", "New 2")]
+    products = added + [product for products in old_pages for product in products]
+    requests = serve_pages(getids, monkeypatch, [products[i:i+2] for i in range(0, 14, 2)])
+
+    diff, catalog = refresh(getids, "Motion", state)
+
+    # Page 1 only has known products, so it's the last one read, and page
+    # 0 is only requested once.
+    assert dict(requests) == {0: 1, 1: 1}
+    assert diff == {"added": {"new1": "New 1 description", "new2": "New 2 description"},
+                    "removed": {}, "renamed": {}}
+    # The pages that weren't read keep their products.
+    assert set(catalog) == {product["id"] for product in products}
+    assert state["Motion"]["pages"]["5"]["ids"] == ["a50", "a51"]
+
+
+def test_refresh_of_unmodified_catalog_reads_one_page(load_variant, monkeypatch):
+    getids = load_variant("anims-only", "getids")
+    pages = [[make_product(f"a{page}", f"Anim {page}")] for page in range(4)]
+    state = make_state("Motion", pages)
+    requests = serve_pages(getids, monkeypatch, pages, not_modified={0})
+
+    diff, catalog = refresh(getids, "Motion", state, workers=1)
+
+    assert dict(requests) == {0: 1}
+    assert diff == {"added": {}, "removed": {}, "renamed": {}}
+    assert set(catalog) == {"a0", "a1", "a2", "a3"}
+
+
+def test_removed_products_are_found_by_reading_every_page(load_variant, monkeypatch):
+    getids = load_variant("anims-only", "getids")
+    old_pages = [[make_product("a0", "Anim 0")], [make_product("a1", "Anim 1")]]
+    state = make_state("MotionPack", old_pages)
+    # Every page has changed: one pack has been renamed, another removed.
+    requests = serve_pages(getids, monkeypatch, [
+        [make_product("new", "New pack")], [make_product("a0", "Pack 0")]])
+
+    diff, catalog = refresh(getids, "MotionPack", state)
+
+    assert sum(requests.values()) == 2
+    # Packs are named after their name, not their description.
+    assert diff == {"added": {"new": "New pack"},
+                    "removed": {"a1": "Anim 1"},
+                    "renamed": {"a0": {"old": "Anim 0", "new": "Pack 0"}}}
+    assert set(catalog) == {"new", "a0"}
+
+
+def test_first_refresh_starts_from_the_shipped_catalog(load_variant, monkeypatch, tmp_path):
+    getids = load_variant("anims-only", "getids")
+    catalog_file = tmp_path / "mixamo_anims.json"
+    catalog_file.write_text('{"a0": "Anim 0 description"}')
+    monkeypatch.setitem(getids.CATALOG_FILES, "Motion", str(catalog_file))
+    serve_pages(getids, monkeypatch, [
+        [make_product("new", "New"), make_product("a0", "Anim 0")]])
+
+    diff, _ = refresh(getids, "Motion", {})
+
+    assert diff == {"added": {"new": "New description"}, "removed": {}, "renamed": {}}
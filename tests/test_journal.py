@@ -0,0 +1,37 @@
+# Stdlib modules
+import json
+
+# Third-party modules
+import pytest
+
+
+@pytest.mark.parametrize("variant, extension", [("anims-only", "fbx"), ("packs", "zip")])
+def test_retry_without_journal_skips_files_on_disk(make_engine, tmp_path, variant, extension):
+    engine, worker = make_engine(variant, is_retry=True)
+    folder = tmp_path / "output"
+    folder.mkdir()
+
+    # Downloaded by an older version, which didn't keep a journal.
+    (folder / f"1_Walking.{extension}").write_bytes(b"motion")
+    # Left empty by an interrupted download.
+    (folder / f"2_Running.{extension}").write_bytes(b"")
+
+    anim_data = {"walk": "Walking", "run": "Running", "jump": "Jumping"}
+    items = worker.get_character_items("character", str(folder), anim_data)
+
+    assert [item["anim_id"] for item in items] == ["run", "jump"]
+
+    # The file found is recorded, so later runs trust the journal.
+    journal = read_journal(folder)
+    assert journal == {"walk": {"status": "completed", "size": 6, "index": 1,
+                                "file": str(folder / f"1_Walking.{extension}")}}
+
+
+def read_journal(folder):
+    entries = {}
+    with open(folder / ".mixamo_journal.jsonl") as file:
+        for line in file:
+            entry = json.loads(line)
+            del entry["time"]
+            entries[entry.pop("anim_id")] = entry
+    return entries
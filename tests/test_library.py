@@ -0,0 +1,139 @@
+# Stdlib modules
+import os
+import sqlite3
+import sys
+import threading
+
+# Third-party modules
+import pytest
+
+
+def make_gms_hash(mirror):
+    return {"model-id": 101, "mirror": mirror, "trim": [0.0, 100.0], "inplace": False,
+            "arm-space": 0, "params": [["Overdrive", 0.0], ["Emotion", 1.0]]}
+
+
+def count_hashes(monkeypatch):
+    """Count the files hashed by the library and the export store."""
+    fileio = sys.modules["fileio"]
+    hashed = []
+
+    def hash_file(path):
+        hashed.append(path)
+        return original(path)
+
+    original = fileio.hash_file
+    monkeypatch.setattr(fileio, "hash_file", hash_file)
+    return hashed
+
+
+def write_motion(path, content):
+    with open(path, "wb") as file:
+        file.write(content)
+    return type("File", (), {"path": str(path), "size": len(content),
+                             "sha256": sys.modules["fileio"].hash_file(str(path))})
+
+
+def test_variants_of_a_motion_are_told_apart(load_variant, tmp_path):
+    library = load_variant("anims-only", "library")
+    batching = load_variant("anims-only", "batching")
+    index = library.ContentIndex(str(tmp_path / library.LIBRARY_FILE))
+
+    mirrored = batching.get_gms_hash_key(make_gms_hash(True))
+    # The built 'gms_hash' of a payload has the same key as the original.
+    assert mirrored == batching.get_gms_hash_key(batching.build_gms_hash(make_gms_hash(True)))
+
+    index.add_file("character", mirrored, write_motion(tmp_path / "1_Mirror.fbx", b"mirror"))
+
+    key = batching.get_gms_hash_key(make_gms_hash(False))
+    assert index.obtain("character", key, str(tmp_path / "2_Walking.fbx")) is None
+    assert index.obtain("character", mirrored, str(tmp_path / "3_Mirror.fbx")) is not None
+    index.close()
+
+
+def test_unchanged_files_are_not_hashed_again(load_variant, monkeypatch, tmp_path):
+    library = load_variant("anims-only", "library")
+    index = library.ContentIndex(str(tmp_path / library.LIBRARY_FILE))
+    path = tmp_path / "1_Walking.fbx"
+    index.add_file("character", "key", write_motion(path, b"motion"))
+    hashed = count_hashes(monkeypatch)
+
+    assert index.obtain("character", "key", str(path)) is not None
+    assert hashed == []
+
+    # Touched, but not changed.
+    os.utime(path, ns=(1, 1))
+    assert index.obtain("character", "key", str(path)) is not None
+    assert hashed == [str(path)]
+
+    # Changed, keeping the same size.
+    path.write_bytes(b"MOTION")
+    assert index.obtain("character", "key", str(path)) is None
+    index.close()
+
+
+def test_export_store_only_hashes_modified_files(load_variant, monkeypatch, tmp_path):
+    cache = load_variant("anims-only", "cache")
+    exports = load_variant("anims-only", "exports")
+    store = exports.ExportStore(cache.ProductCache(":memory:"))
+    path = tmp_path / "1_Walking.fbx"
+    store.complete("key", "character", write_motion(path, b"motion"))
+    hashed = count_hashes(monkeypatch)
+
+    assert store.lookup("key") is not None
+    assert hashed == []
+
+    path.write_bytes(b"MOTION")
+    os.utime(path, ns=(1, 1))
+    assert store.lookup("key") is None
+    assert hashed == [str(path)]
+
+
+@pytest.mark.parametrize("version", [0, 1])
+def test_older_libraries_are_rebuilt(load_variant, tmp_path, version):
+    library = load_variant("anims-only", "library")
+    file_path = str(tmp_path / library.LIBRARY_FILE)
+
+    db = sqlite3.connect(file_path)
+    db.execute("CREATE TABLE motions (character_id TEXT, model_id TEXT, path TEXT, "
+               "member TEXT, size INTEGER, sha256 TEXT, created REAL)")
+    db.execute(f"PRAGMA user_version = {version}")
+    db.commit()
+    db.close()
+
+    index = library.ContentIndex(file_path)
+    index.add_file("character", "key", write_motion(tmp_path / "1_Walking.fbx", b"motion"))
+    assert len(index.find("character", "key")) == 1
+    index.close()
+
+
+def test_engine_opens_and_closes_its_state(make_engine, monkeypatch, tmp_path):
+    engine, worker = make_engine("packs")
+    # Nothing is created before it's needed.
+    assert not (tmp_path / "output").exists()
+
+    opened = []
+    monkeypatch.setattr(worker.tokens, "ensure_token", lambda: None)
+    monkeypatch.setattr(worker, "runImpl", lambda: opened.extend([worker.cache, worker.library]))
+    worker.run()
+
+    assert (tmp_path / "output" / sys.modules["library"].LIBRARY_FILE).exists()
+    for database in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            database.db.execute("SELECT 1")
+
+
+def test_packs_are_indexed_on_the_writer_threads(make_engine, monkeypatch, tmp_path):
+    engine, worker = make_engine("packs")
+    journal = sys.modules["journal"]
+    threads = []
+    monkeypatch.setattr(worker, "add_to_library",
+                        lambda item, file: threads.append(threading.current_thread()))
+
+    worker.writer = sys.modules["writer"].OutputWriter(worker.tracer)
+    item = {"index": 1, "anim_id": "pack-1", "journal": journal.RunJournal(str(tmp_path))}
+    worker.finish_item(item, write_motion(tmp_path / "1_Pack.zip", b"pack"))
+    worker.writer.close()
+
+    assert len(threads) == 1
+    assert threads[0] is not threading.current_thread()
@@ -0,0 +1,78 @@
+# Stdlib modules
+import copy
+import json
+
+# Third-party modules
+import pytest
+
+
+def make_motion(name, model_id):
+    return {"name": name, "gms_hash": {
+        "model-id": model_id, "mirror": False, "trim": [0.0, 100.0], "inplace": False,
+        "arm-space": 0, "params": [["Overdrive", 0.0], ["Emotion", 1.0]]}}
+
+
+@pytest.mark.parametrize("variant", ["anims-only", "packs"])
+def test_build_motion_gms_hash(load_variant, variant):
+    batching = load_variant(variant, "batching")
+    motion = make_motion("Walking", 101)
+    original = copy.deepcopy(motion)
+
+    gms_hash = batching.build_motion_gms_hash(motion)
+
+    assert gms_hash == {
+        "model-id": 101, "mirror": False, "trim": [0.0, 100.0], "inplace": False,
+        "arm-space": 0, "params": "0,1", "name": "Walking", "overdrive": 0}
+    # The motion is left untouched, so it can be built again.
+    assert motion == original
+    assert batching.build_motion_gms_hash(motion) == gms_hash
+
+
+@pytest.mark.parametrize("variant", ["anims-only", "packs"])
+def test_build_gms_hash_without_name(load_variant, variant):
+    batching = load_variant(variant, "batching")
+    motion = make_motion("Walking", 101)
+
+    gms_hash = batching.build_gms_hash(motion["gms_hash"])
+
+    assert "name" not in gms_hash
+    assert gms_hash["params"] == "0,1"
+    assert gms_hash["overdrive"] == 0
+    assert isinstance(motion["gms_hash"]["params"], list)
+
+
+def test_build_payload_from_product_anims_only(make_engine):
+    engine, worker = make_engine("anims-only")
+    product = {"description": "Walking Forward", "type": "Motion",
+               "details": {"gms_hash": make_motion("Walking", 101)["gms_hash"]}}
+    original = copy.deepcopy(product)
+
+    payload = worker.build_payload_from_product("character", product)
+
+    assert json.loads(payload) == {
+        "character_id": "character",
+        "product_name": "Walking Forward",
+        "type": "Motion",
+        "preferences": {"format": "fbx7_2019", "skin": False, "fps": "60", "reducekf": "0"},
+        "gms_hash": [{"model-id": 101, "mirror": False, "trim": [0, 100], "inplace": False,
+                      "arm-space": 0, "params": "0,1", "overdrive": 0}]}
+    # The product details are left untouched, so the payload can be built
+    # again from them (e.g: after the cached one has expired).
+    assert product == original
+    assert worker.build_payload_from_product("character", product) == payload
+
+
+def test_build_payload_from_product_packs(make_engine):
+    engine, worker = make_engine("packs")
+    motions = [make_motion("Walking", 101), make_motion("Running", 102)]
+    product = {"name": "Locomotion Pack", "type": "MotionPack",
+               "details": {"motions": motions}}
+    original = copy.deepcopy(product)
+
+    payload = worker.build_payload_from_product("character", product)
+
+    assert json.loads(payload)["gms_hash"] == [
+        {**motion["gms_hash"], "params": "0,1", "name": motion["name"], "overdrive": 0}
+        for motion in motions]
+    assert product == original
+    assert worker.build_payload_from_product("character", product) == payload
@@ -0,0 +1,42 @@
+# Stdlib modules
+import threading
+from concurrent.futures import Future
+
+
+def test_items_are_done_once_their_file_is_written(load_variant):
+    pipeline = load_variant("anims-only", "pipeline")
+    written = Future()
+    done = []
+
+    def download(item):
+        # Left to a writer, which writes it once the pipeline is drained.
+        return written
+
+    runner = pipeline.DownloadPipeline(
+        lookup=lambda item: item, export=lambda item: item, download=download,
+        on_done=done.append, on_error=lambda item, error: done.append(error))
+    runner.run([{"anim_id": "walk"}])
+    assert done == []
+
+    written.set_result("1_Walk.fbx")
+    assert done == [{"anim_id": "walk"}]
+
+
+def test_items_whose_file_cant_be_written_fail(load_variant):
+    pipeline = load_variant("anims-only", "pipeline")
+    written = Future()
+    errors, done = [], []
+
+    runner = pipeline.DownloadPipeline(
+        lookup=lambda item: item, export=lambda item: item,
+        download=lambda item: written, on_done=done.append,
+        on_error=lambda item, error: errors.append(error))
+    runner.run([{"anim_id": "walk"}])
+
+    error = OSError("Disk full")
+    thread = threading.Thread(target=written.set_exception, args=(error,))
+    thread.start()
+    thread.join()
+
+    assert errors == [error]
+    assert done == [{"anim_id": "walk"}]
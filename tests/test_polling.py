@@ -0,0 +1,80 @@
+# Stdlib modules
+import time
+
+
+class FakeClock:
+    """Stand-in for the 'time' module of the poller, only moving forward
+    when told to."""
+    strftime = staticmethod(time.strftime)
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_deadline_counts_the_time_spent_checking(load_variant, monkeypatch):
+    polling = load_variant("anims-only", "polling")
+    clock = FakeClock()
+    monkeypatch.setattr(polling, "time", clock)
+    monkeypatch.setattr(polling, "JITTER", 0)
+
+    poller = polling.AdaptivePoller(deadline=10)
+    start = clock.now
+    delays = []
+    for delay in poller.delays(start):
+        delays.append(delay)
+        # Waiting, then a status check taking 2 seconds.
+        clock.now += delay + 2
+
+    # Without the checks, the delays would add up to the deadline.
+    assert sum(delays) < 10
+    assert clock.now - start <= 10 + 2
+    # The last check is done right before the deadline.
+    assert clock.now - start - 2 - delays[-1] < 10
+
+
+def test_deadline_is_counted_from_the_export_request(load_variant, monkeypatch):
+    polling = load_variant("anims-only", "polling")
+    clock = FakeClock()
+    monkeypatch.setattr(polling, "time", clock)
+    monkeypatch.setattr(polling, "JITTER", 0)
+
+    poller = polling.AdaptivePoller(deadline=10)
+    assert list(poller.delays(clock.now - 10)) == []
+
+    # Sending the export took most of the time left.
+    delays = poller.delays(clock.now - 9.5)
+    assert next(delays) == 0.5
+    clock.now += 0.5
+    assert list(delays) == []
+
+
+def test_failed_exports_are_not_timeouts(load_variant):
+    polling = load_variant("anims-only", "polling")
+    poller = polling.AdaptivePoller()
+
+    poller.record(3.0, polls=2, status="completed", last_delay=1.0)
+    poller.record(2.0, polls=1, status="failed", last_delay=1.0)
+    poller.record(120.0, polls=30, status=None, last_delay=5.0)
+
+    stats = poller.stats()
+    assert (stats["exports"], stats["failures"], stats["timeouts"]) == (1, 1, 1)
+    # Only the completed export is learned from.
+    assert poller.latencies == [2.5]
+
+
+def test_first_delay_is_learned_across_runs(load_variant, tmp_path):
+    polling = load_variant("anims-only", "polling")
+    file_path = str(tmp_path / "export_latency.json")
+
+    poller = polling.AdaptivePoller.load(file_path)
+    assert poller.first_delay() == polling.DEFAULT_FIRST_DELAY
+
+    for latency in (1.0, 2.0, 3.0, 4.0, 5.0):
+        poller.record(latency)
+    poller.save(file_path)
+
+    poller = polling.AdaptivePoller.load(file_path)
+    assert poller.first_delay() == 2.0
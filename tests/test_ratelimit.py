@@ -0,0 +1,127 @@
+# Stdlib modules
+import asyncio
+import io
+import sys
+import time
+
+# Third-party modules
+import httpx
+import pytest
+import requests
+
+
+def in_flight(limiter, endpoint="download"):
+    return limiter.limits[endpoint].in_flight
+
+
+def make_response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(b"motion")
+    return response
+
+
+def test_release_on_close(load_variant):
+    ratelimit = load_variant("anims-only", "ratelimit")
+    limiter = ratelimit.RateLimiter()
+    response = make_response(200)
+
+    limiter.acquire("download")
+    limiter.release_on_close(response, "download")
+    # The body hasn't been read yet.
+    assert in_flight(limiter) == 1
+
+    with response:
+        pass
+    assert in_flight(limiter) == 0
+    # Closing it again doesn't release another request's slot.
+    response.close()
+    assert in_flight(limiter) == 0
+    assert limiter.stats()["requests"] == 1
+
+
+def test_release_on_close_async(load_variant):
+    ratelimit = load_variant("anims-only", "ratelimit")
+    limiter = ratelimit.RateLimiter()
+    response = httpx.Response(200, content=b"motion")
+
+    async def download():
+        await limiter.acquire_async("download")
+        limiter.release_on_close(response, "download")
+        assert in_flight(limiter) == 1
+        await response.aclose()
+        await response.aclose()
+
+    asyncio.run(download())
+    assert in_flight(limiter) == 0
+
+
+@pytest.mark.parametrize("variant", ["anims-only", "packs"])
+def test_streamed_requests_hold_their_slot(make_engine, monkeypatch, variant):
+    engine, worker = make_engine(variant)
+    monkeypatch.setattr(engine, "limiter", engine.RateLimiter())
+
+    monkeypatch.setattr(engine.session, "request",
+                        lambda method, url, **kwargs: make_response(200))
+
+    response = worker.make_request("GET", "https://cdn.example.com/file.fbx", stream=True)
+    assert in_flight(engine.limiter) == 1
+    response.close()
+    assert in_flight(engine.limiter) == 0
+
+    worker.make_request("GET", "https://cdn.example.com/file.fbx")
+    assert in_flight(engine.limiter) == 0
+
+
+@pytest.mark.parametrize("variant", ["anims-only", "packs"])
+def test_retries_are_given_up_after_max_retry_time(make_engine, monkeypatch, variant):
+    engine, worker = make_engine(variant)
+
+    # Time only goes by while waiting to retry.
+    clock = [0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(time, "sleep", lambda delay: clock.__setitem__(0, clock[0] + delay))
+    monkeypatch.setattr(engine, "limiter", engine.RateLimiter())
+
+    attempts = []
+
+    def request(method, url, **kwargs):
+        attempts.append(clock[0])
+        raise requests.exceptions.ConnectionError("offline")
+
+    monkeypatch.setattr(engine.session, "request", request)
+
+    with pytest.raises(Exception) as error:
+        worker.make_request("GET", "https://cdn.example.com/file.fbx")
+    assert f"after {len(attempts)} attempts" in str(error.value)
+
+    ratelimit = sys.modules["ratelimit"]
+    assert 1 < len(attempts) < ratelimit.MAX_RETRIES
+    assert clock[0] <= ratelimit.MAX_RETRY_TIME
+
+
+@pytest.mark.parametrize("variant", ["anims-only", "packs"])
+def test_timed_out_requests_are_retried(make_engine, monkeypatch, variant):
+    engine, worker = make_engine(variant)
+
+    clock = [0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(time, "sleep", lambda delay: clock.__setitem__(0, clock[0] + delay))
+    monkeypatch.setattr(engine, "limiter", engine.RateLimiter())
+
+    attempts = []
+
+    def request(method, url, timeout=None, **kwargs):
+        attempts.append(clock[0])
+        if len(attempts) == 1:
+            # The first attempt waits for the whole timeout.
+            clock[0] += timeout
+            raise requests.exceptions.ReadTimeout("timed out")
+        return make_response(200)
+
+    monkeypatch.setattr(engine.session, "request", request)
+
+    response = worker.make_request("GET", "https://cdn.example.com/file.fbx")
+
+    assert response.status_code == 200
+    assert len(attempts) == 2
@@ -0,0 +1,76 @@
+# Stdlib modules
+import collections
+import threading
+
+# Third-party modules
+import pytest
+
+
+def serve_search(worker, monkeypatch, pages, field="description"):
+    """Answer the search with the given pages of product IDs (the first one
+    is page 1), and count how many times every page is requested."""
+    requests = collections.Counter()
+    lock = threading.Lock()
+
+    def get_queried_page(query, page_num):
+        with lock:
+            requests[page_num] += 1
+        return {"pagination": {"num_pages": len(pages),
+                               "num_results": sum(len(page) for page in pages)},
+                "results": [{"id": product_id, field: f"Motion {product_id}"}
+                            for product_id in pages[page_num - 1]]}
+
+    monkeypatch.setattr(worker, "get_queried_page", get_queried_page)
+    return requests
+
+
+@pytest.mark.parametrize("variant, field", [("anims-only", "description"), ("packs", "name")])
+def test_every_page_is_fetched_once(make_engine, monkeypatch, variant, field):
+    engine, worker = make_engine(variant)
+    pages = [[f"{page}-{index}" for index in range(3)] for page in range(1, 6)]
+    requests = serve_search(worker, monkeypatch, pages, field)
+
+    anim_data = dict(worker.iter_queried_animations("walk"))
+
+    assert dict(requests) == {page: 1 for page in range(1, 6)}
+    assert anim_data == {
+        product_id: f"Motion {product_id}" for page in pages for product_id in page}
+
+
+def test_single_page_search_sends_one_request(make_engine, monkeypatch):
+    engine, worker = make_engine("anims-only")
+    requests = serve_search(worker, monkeypatch, [["1", "2"]])
+
+    assert list(worker.iter_queried_animations("walk")) == [
+        ("1", "Motion 1"), ("2", "Motion 2")]
+    assert dict(requests) == {1: 1}
+
+
+def test_empty_search_ends(make_engine, monkeypatch):
+    engine, worker = make_engine("anims-only")
+    requests = serve_search(worker, monkeypatch, [[]])
+
+    assert list(worker.iter_queried_animations("nothing")) == []
+    assert dict(requests) == {1: 1}
+
+
+def test_first_page_is_yielded_before_the_others_are_fetched(make_engine, monkeypatch):
+    engine, worker = make_engine("anims-only")
+    requests = serve_search(worker, monkeypatch, [["1"], ["2"], ["3"]])
+
+    animations = worker.iter_queried_animations("walk")
+    assert next(animations) == ("1", "Motion 1")
+    assert dict(requests) == {1: 1}
+
+    assert sorted(animations) == [("2", "Motion 2"), ("3", "Motion 3")]
+
+
+def test_total_is_corrected_once_duplicates_are_dropped(make_engine, monkeypatch):
+    engine, worker = make_engine("anims-only")
+    # Mixamo lists some products on several pages.
+    serve_search(worker, monkeypatch, [["1", "2"], ["2", "3"]])
+    totals = []
+    worker.total_tasks.connect(totals.append)
+
+    assert len(list(worker.iter_queried_animations("walk"))) == 3
+    assert totals == [4, 3]
@@ -0,0 +1,32 @@
+def make_traces(folder, count):
+    folder.mkdir(exist_ok=True)
+    names = [f"trace_20260101_{index:06d}_1.jsonl" for index in range(count)]
+    for name in names:
+        (folder / name).write_text("{}\n")
+    return names
+
+
+def test_get_trace_path_removes_the_oldest_traces(load_variant, tmp_path):
+    tracing = load_variant("anims-only", "tracing")
+    folder = tmp_path / "traces"
+    names = make_traces(folder, 5)
+    (folder / "notes.txt").write_text("kept")
+
+    path = tracing.get_trace_path(str(folder), keep=3)
+
+    # Two traces are left, and the new one makes three.
+    assert sorted(entry.name for entry in folder.iterdir()) == ["notes.txt"] + names[3:]
+    assert path.startswith(str(folder))
+    assert path.endswith(".jsonl")
+
+
+def test_get_trace_path_keeps_every_trace(load_variant, tmp_path):
+    tracing = load_variant("anims-only", "tracing")
+    folder = tmp_path / "traces"
+    names = make_traces(folder, 5)
+
+    tracing.get_trace_path(str(folder), keep=0)
+    # A folder that doesn't exist yet has nothing to remove.
+    tracing.get_trace_path(str(tmp_path / "missing"), keep=3)
+
+    assert sorted(entry.name for entry in folder.iterdir()) == names
@@ -0,0 +1,32 @@
+# Third-party modules
+import pytest
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_writes_are_traced_apart_from_downloads(load_variant, tmp_path, workers):
+    writer_module = load_variant("anims-only", "writer")
+    tracing = load_variant("anims-only", "tracing")
+    tracer = tracing.Tracer()
+
+    writer = writer_module.OutputWriter(tracer, workers, fsync="never")
+    received = writer.write([b"mo", b"tion"], str(tmp_path / "1_Walk.fbx"), 6, index=1)
+
+    assert received.size == 6
+    assert received.future.result().size == 6
+    assert writer.close()["files"] == 1
+    assert tracer.summary()["write"]["count"] == 1
+    assert (tmp_path / "1_Walk.fbx").read_bytes() == b"motion"
+
+
+def test_files_written_elsewhere_are_flushed_at_the_end(load_variant, tmp_path, monkeypatch):
+    writer_module = load_variant("anims-only", "writer")
+    tracing = load_variant("anims-only", "tracing")
+    flushed = []
+    monkeypatch.setattr(writer_module, "flush_files", flushed.extend)
+
+    writer = writer_module.OutputWriter(tracing.Tracer(), fsync="end")
+    writer.write([b"motion"], str(tmp_path / "1_Walk.fbx"))
+    writer.add(str(tmp_path / "2_Walk.fbx"))
+
+    assert writer.close()["synced"] == 2
+    assert flushed == [str(tmp_path / "1_Walk.fbx"), str(tmp_path / "2_Walk.fbx")]